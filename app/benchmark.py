@@ -1,7 +1,9 @@
 #!/usr/bin/python3
 
 import pathlib
+import resource
 import signal
+import socket
 import subprocess
 import os
 import sys
@@ -9,9 +11,13 @@ import time
 import traceback
 from enum import Enum
 import argparse
-from typing import Dict, Final, List
-from multiprocessing import Process
+import functools
+from typing import Dict, Final, List, Optional, Tuple
+import multiprocessing.synchronize
+from multiprocessing import Event, Process
+from shared.cluster import Node
 from shared.utils import ask_y_n, has_key
+from shared import cluster, convergence, plan, processes, sampler, snapshot, stresslog, supervisor, topology, warmup, workload
 
 class CassandraVars:
     _instance = None
@@ -22,12 +28,42 @@ class CassandraVars:
         return cls._instance
 
     base_dir: Final[str] = os.path.dirname(os.path.realpath(__file__))
-    workload: Final[str] = "cqlstress-insanity-example.yaml"
+    # see shared/workload.py, set by configure
+    workload: Dict = {}
+    workload_spec: str = "default"
     cassandra_bin: Final[str] = base_dir + "/bin/cassandra"
     nodetool_bin: Final[str] = base_dir + "/bin/nodetool"
     cassanadra_stress_bin: Final[str] = base_dir + \
         "/tools/bin/cassandra-stress"
+    cqlsh_bin: Final[str] = base_dir + "/bin/cqlsh"
+    conf_dir: Final[str] = base_dir + "/conf"
+    cluster_dir: Final[str] = base_dir + "/cluster"
+    profile_dir: Final[str] = base_dir + "/profiles"
+    # 100000000
+    population: Final[int] = int(100000000 / 8)
+    cql_host: Final[str] = "127.0.0.1"
+    cql_port: Final[int] = 9042
+    ready_marker: Final[str] = "Starting listening for CQL clients"
+    boot_timeout: int = 300
+    # seconds the client may go without printing an interval before it counts as hung
+    stall_timeout: int = 60
+    shutdown_timeout: int = 120
+    # on top of the stress duration, for the client JVM to start, create the schema and print its summary
+    stress_grace: Final[int] = 120
+    # launcher of every server node by node directory, the server JVM stays in its process group
+    server_processes: Dict = {}
+    # JVM of every server node by node directory, kept once read as Cassandra deletes the pid file on exit
+    server_pids: Dict[str, int] = {}
+    # system.log of every server node by node directory and its size at launch, logback appends to it across runs
+    server_logs: Dict[str, Tuple[str, int]] = {}
+    # every process group started, whatever is left of them is stopped on exit
+    process_groups: List[int] = []
+    # when the server nodes were sent SIGTERM
+    shutdown_start: float = 0.0
+    # run directory with the logs of the running server
+    server_path: str = ""
     perf: str = ""
+    perf_interval: int = 0
     perf_file: Final[str] = base_dir + "/bin/PERF"
     time_file: Final[str] = base_dir + "/bin/TIME"
     java_dir: Dict = {"client": "", "server": ""}
@@ -36,12 +72,50 @@ class CassandraVars:
     user_jvm_client_args: str = ""
     old_java_home: str = ""
     duration: str = ""
+    # stop the workload once the confidence intervals are within +-converge %, duration is the maximum then
+    converge: float = 0.0
+    min_duration: int = 120
+    # seconds of workload before each measured one, or "auto" until throughput and JIT compilation have settled
+    warmup: str = ""
+    warmup_max: int = 600
+    # wall clock first so that server, client and phases can be lined up
+    gc_decorations: Final[str] = "time,uptime,level,tags"
+    # JFR settings (default, profile or a .jfc file) the server records the measured window with, "" disables
+    jfr: str = ""
     threads: str = ""
     old_jvm_opts: str = ""
     tag: str = ""
     skew: int = 0
     cpu_count: int = 0
-    kill_java_on_exit: bool = True
+    cpu_policy: str = "split"
+    housekeeping: int = 0
+    numa_bind: bool = False
+    # set by init from the CPU topology before anything is started
+    layout: topology.Layout
+    nodes: int = 1
+    replication_factor: int = 1
+    # overrides the consistency level of the workload when set
+    consistency: str = ""
+    # cluster.Node per node when nodes > 1
+    cluster: List[Node] = []
+    sample_interval: float = 0.0
+    timestamp_output: bool = False
+    # helper processes that live for the whole server lifetime, their CPU time is read from /proc
+    helpers: List[Process] = []
+    sampler_process: Optional[Process] = None
+    sampler_stop: Optional[multiprocessing.synchronize.Event] = None
+    prepopulate_shards: int = 4
+    warm_iterations: int = 1
+    truncate_between: bool = False
+    search: str = ""
+    search_slo_p99: float = 0.0
+    search_low: int = 0
+    search_high: int = 0
+    search_steps: int = 6
+    search_duration: str = ""
+    restore_method: str = "auto"
+    restore_stats: Dict = {}
+    validated_jvms: set = set()
     debug: bool = False
 
 
@@ -85,54 +159,461 @@ def write_configuration(result_path: str) -> None:
         writeFile.write("\n== Cassandra info ==\n")
         writeFile.write("Client threads: " + CassandraVars.threads + "\n")
         writeFile.write("Duration: " + CassandraVars.duration + "\n")
-        writeFile.write("Workload: " + CassandraVars.workload + "\n")
+        if len(CassandraVars.warmup) > 0:
+            writeFile.write("Warmup: " + (CassandraVars.warmup + " s" if CassandraVars.warmup != "auto" else
+                                          "until settled, at most " + str(CassandraVars.warmup_max) + " s") + "\n")
+        if len(CassandraVars.jfr) > 0:
+            writeFile.write("Flight recorder: settings " + CassandraVars.jfr + ", measured window\n")
+        if CassandraVars.converge > 0:
+            writeFile.write("Convergence: 95% CI of op rate and p99 latency within +-" + "{:g}".format(CassandraVars.converge) +
+                            "%, at least " + str(CassandraVars.min_duration) + " s, at most " + CassandraVars.duration + "\n")
+        writeFile.write("Nodes: " + str(CassandraVars.nodes) + ", replication factor " + str(CassandraVars.replication_factor) +
+                        ", consistency " + get_consistency() + "\n")
+        for node in CassandraVars.cluster:
+            writeFile.write(cluster.node_name(node.number) + ": " + node.address + ", CPUs " + topology.format_cpulist(node.cpus) +
+                            ", JMX port " + str(node.jmx_port) + "\n")
+        writeFile.write("\n== Workload ==\n")
+        for l in workload.describe(dict(CassandraVars.workload, consistency=get_consistency())):
+            writeFile.write(l + "\n")
+        writeFile.write("\n== CPU layout ==\n")
+        for l in topology.describe(CassandraVars.layout):
+            writeFile.write(l + "\n")
+        writeFile.write("NUMA memory binding: " + ("server " + topology.format_cpulist(CassandraVars.layout.server_nodes) +
+                        ", client " + topology.format_cpulist(CassandraVars.layout.client_nodes)
+                        if CassandraVars.numa_bind else "off") + "\n")
+        if len(CassandraVars.search) > 0:
+            writeFile.write("Search: " + CassandraVars.search + " " + str(CassandraVars.search_low) + ".." +
+                            str(CassandraVars.search_high) + " p99 SLO " + str(CassandraVars.search_slo_p99) +
+                            " ms, " + CassandraVars.search_duration + " per probe\n")
+
+
+def write_restore_log(result_path: str) -> None:
+    if len(CassandraVars.restore_stats) == 0:
+        return
+    with open(os.path.join(result_path, "restore.log"), "w") as writeFile:
+        for (key, val) in CassandraVars.restore_stats.items():
+            writeFile.write(key + ": " + val + "\n")
+
+
+def write_in_new_process(path: str, read_fd: int, write_fd: int) -> None:
+    # prefixes every line with the time it was read, runs on the housekeeping CPUs like the rest of the orchestrator
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as readFile, open(path, "wb") as writeFile:
+        for l in readFile:
+            writeFile.write(b"[%.3f] " % time.time() + l)
+            writeFile.flush()
+
+
+def get_marked_env(env=None) -> Dict[str, str]:
+    # finds what benchmark.py started again if it was killed itself, see check_for_leftovers
+    env = dict(os.environ if env is None else env)
+    env[processes.MARKER] = CassandraVars.base_dir
+    return env
+
+
+def start_group(x: str, stdout, env=None) -> subprocess.Popen:
+    # every command gets its own process group so that it can be stopped with everything it started
+    app = subprocess.Popen(x, shell=True, stdout=stdout, stderr=subprocess.STDOUT, env=get_marked_env(env), start_new_session=True)
+    CassandraVars.process_groups.append(app.pid)
+    return app
+
+
+def start_logged(x: str, path: str, env=None) -> Tuple[subprocess.Popen, Optional[Process]]:
+    # output goes straight from the child to the file, nothing is copied by the orchestrator unless it is timestamped
+    if not CassandraVars.timestamp_output:
+        with open(path, "wb") as writeFile:
+            return start_group(x, writeFile, env), None
+    (read_fd, write_fd) = os.pipe()
+    p = Process(target=write_in_new_process, args=[path, read_fd, write_fd], name="timestamper", daemon=True)
+    p.start()
+    os.close(read_fd)
+    app = start_group(x, write_fd, env)
+    os.close(write_fd)
+    return app, p
+
+
+def get_server_pid_file(result_path: str) -> str:
+    return os.path.join(result_path, "server.pid")
+
 
+def get_error_file(result_path: str) -> str:
+    # where the JVM writes its fatal error report, hs_err_pid<pid>.log in the working directory otherwise
+    return os.path.join(result_path, "hs_err.log")
 
-def write_in_new_process(result_path, app) -> None:
-    with open(os.path.join(result_path, "server.log"), "w") as writeFile:
-        for l in app.stdout:  # type: ignore
-            writeFile.write(l)
+
+def get_system_log(node: Optional[Node] = None) -> str:
+    # a daemonized server closes stdout once started, everything after that only goes to system.log
+    if node is not None:
+        return os.path.join(cluster.log_dir(node), "system.log")
+    return os.path.join(os.environ.get("CASSANDRA_LOG_DIR", os.path.join(CassandraVars.base_dir, "logs")), "system.log")
+
+
+def get_file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def write_perf_file(result_path: str) -> None:
+    # read by the patched bin/cassandra, see patch_files/bin/cassandra
+    with open(CassandraVars.perf_file, "w") as writeFile:
+        writeFile.write(CassandraVars.perf + "\n")
+        writeFile.write(os.path.join(result_path, "server.perf.csv") + "\n")
+        if CassandraVars.perf_interval > 0:
+            writeFile.write(str(CassandraVars.perf_interval) + "\n")
+
+
+def get_node_paths(result_path: str) -> List[Tuple[Optional[Node], str]]:
+    # a single node keeps its server files in the run directory itself, cluster nodes get a subdirectory each
+    if CassandraVars.nodes == 1:
+        return [(None, result_path)]
+    return [(node, os.path.join(result_path, cluster.node_name(node.number))) for node in CassandraVars.cluster]
+
+
+def get_nodetool(node: Optional[Node] = None) -> List[str]:
+    # nodetool talks JMX on 127.0.0.1, cluster nodes only differ by port
+    if node is None and CassandraVars.nodes > 1:
+        node = CassandraVars.cluster[0]
+    if node is None:
+        return [CassandraVars.nodetool_bin]
+    return [CassandraVars.nodetool_bin, "-h", "127.0.0.1", "-p", str(node.jmx_port)]
 
 
 def run_cassandra_server(result_path: str) -> None:
+    CassandraVars.server_path = result_path
+    if CassandraVars.nodes == 1:
+        run_cassandra_node(result_path)
+        return
+    # nodes have to join the ring one at a time
+    for node in CassandraVars.cluster:
+        path = os.path.join(result_path, cluster.node_name(node.number))
+        pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+        run_cassandra_node(path, node)
+        block_until_node_ready(path, node.address, cluster.node_name(node.number))
+
+
+def run_cassandra_node(result_path: str, node: Optional[Node] = None) -> None:
     os.environ["JAVA_HOME"] = CassandraVars.java_dir["server"]
+    if len(CassandraVars.perf) > 0:
+        write_perf_file(result_path)
     init_user_jvm_args()
     add_jvm_option(CassandraVars.user_jvm_server_args)
-    add_jvm_option("".join(["-Xlog:gc*:file=", result_path, "/server.gc"]))
+    add_jvm_option("".join(["-Xlog:gc*:file=", result_path, "/server.gc:", CassandraVars.gc_decorations]))
+    if CassandraVars.warmup == "auto":
+        add_jvm_option("".join(["-Xlog:jit+compilation=debug:file=", result_path, "/server.jit:time,uptime"]))
     add_jvm_option("".join(["-Xlog:gc+stats=debug:file=", result_path, "/server.stats.gc"]))
-    x = " ".join(["taskset -c", get_server_cpu_affinity_group(),
-                  CassandraVars.cassandra_bin])
-    app = subprocess.Popen(x, shell=True, stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT, universal_newlines=True)
-
-    p = Process(target=write_in_new_process, args=[result_path, app])
-    p.start()
-    time.sleep(15)
+    env = None
+    pinning = get_server_pinning()
+    if node is not None:
+        env = dict(os.environ)
+        env["CASSANDRA_CONF"] = cluster.conf_dir(node)
+        env["CASSANDRA_LOG_DIR"] = cluster.log_dir(node)
+        pinning = get_pinning(topology.format_cpulist(node.cpus), CassandraVars.layout.server_nodes)
+    system_log = get_system_log(node)
+    CassandraVars.server_logs[result_path] = (system_log, get_file_size(system_log))
+    x = " ".join([pinning, CassandraVars.cassandra_bin, "-p", get_server_pid_file(result_path), "-E", get_error_file(result_path)])
+    app, p = start_logged(x, os.path.join(result_path, "server.log"), env)
+    CassandraVars.server_processes[result_path] = app
+    CassandraVars.server_pids.pop(result_path, None)
+    if p is not None:
+        CassandraVars.helpers.append(p)
 
     restore_jvm_opts()
 
 
-def run_cassandra_stress(duration: str, threads: str, result_path: str) -> None:
+def start_sampler(result_path: str) -> None:
+    if CassandraVars.sample_interval <= 0:
+        return
+    CassandraVars.sampler_stop = Event()
+    # in a cluster only the first node is sampled
+    p = Process(target=sampler.run, args=[os.path.join(result_path, "resources.bin"), get_server_pid_file(get_node_paths(result_path)[0][1]),
+                                          os.getpid(), CassandraVars.sample_interval, CassandraVars.layout.housekeeping,
+                                          CassandraVars.sampler_stop], name="sampler", daemon=True)
+    p.start()
+    CassandraVars.sampler_process = p
+    CassandraVars.helpers.append(p)
+
+
+def stop_sampler() -> None:
+    if CassandraVars.sampler_process is None or CassandraVars.sampler_stop is None:
+        return
+    CassandraVars.sampler_stop.set()
+    CassandraVars.sampler_process.join()
+    CassandraVars.sampler_process = None
+
+
+def stop_helpers() -> None:
+    stop_sampler()
+    # the timestamper ends by itself once the server has closed its end of the pipe
+    for p in CassandraVars.helpers:
+        p.join()
+    CassandraVars.helpers = []
+
+
+def orchestrator_cpu() -> Tuple[float, float, float]:
+    # (own, waited children, long-lived helpers) CPU seconds
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    helpers = 0.0
+    for p in CassandraVars.helpers:
+        values = sampler.sample(p.pid) if p.pid is not None else None
+        if values is not None:
+            helpers += values[0] + values[1]
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime, helpers
+
+
+def write_orchestrator_usage(result_path: str, before: Tuple[float, float, float], workload_cpu: float, wall: float) -> None:
+    after = orchestrator_cpu()
+    own = after[0] - before[0]
+    # the client JVM is a waited child as well, its share is taken out again
+    helpers = (after[1] - before[1] - workload_cpu) + (after[2] - before[2])
+    with open(os.path.join(result_path, "orchestrator.cpu"), "w") as writeFile:
+        writeFile.write("Orchestrator CPU (s): " + "{:.3f}".format(own) + "\n")
+        writeFile.write("Helper CPU (s): " + "{:.3f}".format(helpers) + "\n")
+        writeFile.write("Client CPU (s): " + "{:.3f}".format(workload_cpu) + "\n")
+        writeFile.write("Wall time (s): " + "{:.3f}".format(wall) + "\n")
+        writeFile.write("Housekeeping CPUs: " + (topology.format_cpulist(CassandraVars.layout.housekeeping)
+                                                 if len(CassandraVars.layout.housekeeping) > 0 else "none") + "\n")
+
+
+def run_cassandra_stress(duration: str, threads: str, result_path: str, rate: str = "", stop_when=None) -> None:
     os.environ["JAVA_HOME"] = CassandraVars.java_dir["client"]
     print("Running workload")
     init_user_jvm_args()
     add_jvm_option(CassandraVars.user_jvm_client_args)
-    add_jvm_option("".join(["-Xlog:gc*:file=", result_path, "/client.gc"]))
-    conf = "user profile="+CassandraVars.base_dir + \
-        "/tools/" + CassandraVars.workload + " ops\(insert=3,simple1=7\) duration=" + duration + \
-        " no-warmup cl=ONE -pop dist=UNIFORM\(1..100000000\) -mode native cql3 -rate threads=" + threads
-    x = " ".join(["taskset -c " + get_client_cpu_affinity_group(),
+    add_jvm_option("".join(["-Xlog:gc*:file=", result_path, "/client.gc:", CassandraVars.gc_decorations]))
+    conf = "user profile=" + get_workload_profile() + " ops\\(" + CassandraVars.workload["ops"] + "\\) duration=" + duration + \
+        " no-warmup cl=" + get_consistency() + " -pop dist=" + workload.distribution(CassandraVars.workload).replace("(", "\\(").replace(")", "\\)") + \
+        " -mode native cql3" + get_stress_nodes() + " -rate threads=" + threads
+    if len(rate) > 0:
+        conf += " fixed=" + rate + "/s"
+    # full latency distribution, the summary only has a few percentiles that cannot be merged across runs
+    conf += " -log hdrfile=" + os.path.join(result_path, "client.hdr")
+    x = " ".join([get_client_pinning(),
                   CassandraVars.cassanadra_stress_bin, conf])
-    app = subprocess.Popen(x, stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT, shell=True, universal_newlines=True)
+    before = orchestrator_cpu()
+    start = time.monotonic()
+    app, p = start_logged(x, os.path.join(result_path, "client.log"))
+    stopped: List[float] = list()
+
+    def stop() -> None:
+        # SIGINT lets cassandra-stress end like at the end of its duration
+        stopped.append(time.monotonic() - start)
+        interrupt_process_group(app)
+
+    # stop_when(result_path, stop) returns what gets every line of client.log and decides when to stop
+    observe = stop_when(result_path, stop) if stop_when is not None else None
+    try:
+        workload_cpu = supervisor.run(lambda: block_until_workload_is_done(app), lambda: kill_process_group(app),
+                                      get_supervised_components(result_path, observe),
+                                      get_duration_seconds(duration) + CassandraVars.stress_grace, "client", "stress")
+    finally:
+        if p is not None:
+            p.join()
+    if len(stopped) == 0 and app.returncode != 0:
+        raise supervisor.Failure("client", "exited with status " + str(app.returncode), "stress")
+    write_orchestrator_usage(result_path, before, workload_cpu, time.monotonic() - start)
+    restore_jvm_opts()
 
-    with open(os.path.join(result_path, "client.log"), "w") as writeFile:
-        for l in app.stdout:  # type: ignore
-            writeFile.write(l)
 
-    block_until_process_is_done(app)
-    restore_jvm_opts()
-    request_graceful_server_exit()
+def get_supervised_components(result_path: str, observe=None) -> List[supervisor.Component]:
+    # the client has to keep printing intervals, the server nodes and the helpers have to outlive it
+    components = [supervisor.Component("client", None, os.path.join(result_path, "client.log"), CassandraVars.stall_timeout, observe)]
+    for (node, path) in get_node_paths(CassandraVars.server_path):
+        name = "server" if node is None else cluster.node_name(node.number)
+        components.append(supervisor.Component(name, functools.partial(is_server_alive, path), os.path.join(path, "server.log")))
+        # a daemonized server only logs to system.log, a crash of the JVM itself only shows in its error file
+        (system_log, offset) = CassandraVars.server_logs[path]
+        components.append(supervisor.Component(name, None, system_log, offset=offset))
+        components.append(supervisor.Component(name, None, get_error_file(path)))
+    for p in CassandraVars.helpers:
+        components.append(supervisor.Component(p.name, p.is_alive))
+    return components
+
+
+def get_duration_seconds(duration: str) -> int:
+    # cassandra-stress durations as built by configure and --searchDuration
+    units = {"s": 1, "m": 60, "h": 3600}
+    return int(duration[:-1]) * units[duration[-1]]
+
+
+def kill_process_group(app) -> None:
+    try:
+        os.killpg(app.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def interrupt_process_group(app) -> None:
+    try:
+        os.killpg(app.pid, signal.SIGINT)
+    except ProcessLookupError:
+        pass
+
+
+def get_interval_op() -> object:
+    # with several operation types only their total has to converge or settle
+    return stresslog.TOTAL if len(CassandraVars.workload["ops"].split(",")) > 1 else None
+
+
+def get_convergence_observer(result_path: str, stop):
+    parser = stresslog.IntervalParser()
+    tracker = convergence.Tracker(os.path.join(result_path, "convergence.csv"), CassandraVars.converge, CassandraVars.min_duration)
+    op = get_interval_op()
+
+    def observe(line: str) -> None:
+        parsed = parser.feed(line)
+        if parsed is None or tracker.converged or (op is not None and parsed[0] != op):
+            return
+        if tracker.add(parsed[1]):
+            print("Converged after " + "{:.0f}".format(parsed[1]["time"]) + " s", flush=True)
+            stop()
+    return observe
+
+
+def get_warmup_observer(result_path: str, stop):
+    # compilations are counted from the new lines of server.jit of every node at each client interval
+    parser = stresslog.IntervalParser()
+    detector = warmup.Detector(os.path.join(result_path, "warmup.csv"))
+    op = get_interval_op()
+    offsets = {os.path.join(path, "server.jit"): 0 for (_, path) in get_node_paths(CassandraVars.server_path)}
+
+    def observe(line: str) -> None:
+        parsed = parser.feed(line)
+        if parsed is None or detector.settled or (op is not None and parsed[0] != op):
+            return
+        if detector.add(parsed[1], count_new_lines(offsets)):
+            print("Warmup settled after " + "{:.0f}".format(parsed[1]["time"]) + " s", flush=True)
+            stop()
+    return observe
+
+
+def count_new_lines(offsets: Dict[str, int]) -> int:
+    count = 0
+    for (path, offset) in offsets.items():
+        try:
+            with open(path, "rb") as readFile:
+                readFile.seek(offset)
+                data = readFile.read()
+        except OSError:
+            continue
+        # a partial last line is counted with the next read
+        end = data.rfind(b"\n") + 1
+        offsets[path] = offset + end
+        count += data.count(b"\n", 0, end)
+    return count
+
+
+def run_warmup(threads: str, result_path: str) -> None:
+    # the warmup workload gets its own client JVM and logs in warmup/, the server keeps what it compiled and sized
+    path = os.path.join(result_path, warmup.WARMUP)
+    pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+    auto = CassandraVars.warmup == "auto"
+    print("Warming up " + ("until throughput and JIT compilation have settled" if auto else "for " + CassandraVars.warmup + " s"), flush=True)
+    start = time.time()
+    run_cassandra_stress(str(CassandraVars.warmup_max if auto else CassandraVars.warmup) + "s", threads, path,
+                         stop_when=get_warmup_observer if auto else None)
+    warmup.write_phase(os.path.join(result_path, warmup.PHASES_FILE), warmup.WARMUP, start, time.time())
+
+
+def run_jcmd(pid: int, args: List[str]) -> None:
+    jcmd = os.path.join(CassandraVars.java_dir["server"], "bin", "jcmd")
+    result = subprocess.run([jcmd, str(pid)] + args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if result.returncode != 0:
+        print(result.stdout)
+        raise Exception("jcmd " + " ".join(args) + " failed for pid " + str(pid))
+
+
+def get_recorded_jvms(result_path: str) -> List[Tuple[int, str]]:
+    # the JVMs run from CassandraVars.server_path, which is an earlier run directory of a warm server
+    jvms = []
+    for ((_, server_dir), (_, node_path)) in zip(get_node_paths(CassandraVars.server_path), get_node_paths(result_path)):
+        pid = sampler.resolve_java(read_server_pid(server_dir))
+        if pid == 0:
+            raise supervisor.Failure("server", "has no JVM to record (" + server_dir + ")", "stress")
+        jvms.append((pid, node_path))
+    return jvms
+
+
+def start_recording(result_path: str) -> None:
+    for (pid, node_path) in get_recorded_jvms(result_path):
+        os.makedirs(node_path, exist_ok=True)
+        run_jcmd(pid, ["JFR.start", "name=benchmark", "settings=" + CassandraVars.jfr,
+                       "filename=" + os.path.join(node_path, "server.jfr")])
+
+
+def stop_recording(result_path: str) -> None:
+    # JFR.stop writes the recording to the filename given at start
+    for (pid, _) in get_recorded_jvms(result_path):
+        run_jcmd(pid, ["JFR.stop", "name=benchmark"])
+
+
+def run_measured(threads: str, result_path: str) -> None:
+    if len(CassandraVars.warmup) > 0:
+        run_warmup(threads, result_path)
+    if len(CassandraVars.jfr) > 0:
+        start_recording(result_path)
+    start = time.time()
+    run_cassandra_stress(CassandraVars.duration, threads, result_path,
+                         stop_when=get_convergence_observer if CassandraVars.converge > 0 else None)
+    if len(CassandraVars.jfr) > 0:
+        stop_recording(result_path)
+    # the report only considers the server logs of this window
+    warmup.write_phase(os.path.join(result_path, warmup.PHASES_FILE), warmup.MEASURED, start, time.time())
+
+
+def get_consistency() -> str:
+    return CassandraVars.consistency if len(CassandraVars.consistency) > 0 else CassandraVars.workload["consistency"]
+
+
+def get_profile_source() -> str:
+    # profiles shipped with cassandra-stress are found by name
+    profile = CassandraVars.workload["profile"]
+    if os.path.isfile(profile):
+        return os.path.abspath(profile)
+    return os.path.join(CassandraVars.base_dir, "tools", profile)
+
+
+def get_workload_profile() -> str:
+    if CassandraVars.replication_factor == 1 and CassandraVars.workload["columnSize"] == 0:
+        return get_profile_source()
+    # generated by write_workload_profile
+    name = os.path.splitext(os.path.basename(get_profile_source()))[0]
+    return os.path.join(CassandraVars.profile_dir, name + ".rf" + str(CassandraVars.replication_factor) + ".c" +
+                        str(CassandraVars.workload["columnSize"]) + ".yaml")
+
+
+def write_workload_profile() -> None:
+    if not os.path.isfile(get_profile_source()):
+        print("Could not find cassandra-stress profile '" + get_profile_source() + "'")
+        raise Exception()
+    if get_workload_profile() == get_profile_source():
+        return
+    with open(get_profile_source(), "r") as readFile:
+        text = readFile.read()
+    if CassandraVars.replication_factor > 1:
+        text = cluster.render_profile(text, CassandraVars.replication_factor)
+    if CassandraVars.workload["columnSize"] > 0:
+        text = workload.render_profile(text, CassandraVars.workload["columnSize"])
+    pathlib.Path(CassandraVars.profile_dir).mkdir(parents=True, exist_ok=True)
+    with open(get_workload_profile(), "w") as writeFile:
+        writeFile.write(text)
+
+
+def set_workload(spec: str) -> None:
+    try:
+        CassandraVars.workload = workload.load(spec)
+    except Exception as e:
+        print("Invalid workload: " + str(e))
+        raise Exception()
+    write_workload_profile()
+
+
+def get_stress_nodes() -> str:
+    if CassandraVars.nodes == 1:
+        return ""
+    return " -node " + ",".join(node.address for node in CassandraVars.cluster)
 
 
 def block_until_process_is_done(app) -> int:
@@ -140,20 +621,47 @@ def block_until_process_is_done(app) -> int:
     return app.returncode
 
 
+def block_until_workload_is_done(app) -> float:
+    # waits with wait4 so that the CPU time of the client can be told apart from that of the helpers
+    (_, status, usage) = os.wait4(app.pid, 0)
+    app.returncode = os.waitstatus_to_exitcode(status)
+    return usage.ru_utime + usage.ru_stime
+
+
 def get_server_cpu_affinity_group_raw() -> List[int]:
-    lo: int = 0
-    hi: int = int(CassandraVars.cpu_count/2) - 1 - CassandraVars.skew
-    return [lo, hi]
+    return CassandraVars.layout.server
 
 
 def get_server_cpu_affinity_group() -> str:
-    return "-".join(str(elem) for elem in get_server_cpu_affinity_group_raw())
+    return topology.format_cpulist(get_server_cpu_affinity_group_raw())
+
+
+def get_client_cpu_affinity_group_raw() -> List[int]:
+    return CassandraVars.layout.client
 
 
 def get_client_cpu_affinity_group() -> str:
-    lo: str = str(int(CassandraVars.cpu_count/2) - CassandraVars.skew)
-    hi: str = str(CassandraVars.cpu_count - 1)
-    return "-".join([lo, hi])
+    return topology.format_cpulist(get_client_cpu_affinity_group_raw())
+
+
+def get_pinning(cpus: str, nodes: List[int]) -> str:
+    if CassandraVars.numa_bind:
+        return "numactl --membind=" + topology.format_cpulist(nodes) + " taskset -c " + cpus
+    return "taskset -c " + cpus
+
+
+def get_server_pinning() -> str:
+    return get_pinning(get_server_cpu_affinity_group(), CassandraVars.layout.server_nodes)
+
+
+def get_client_pinning() -> str:
+    return get_pinning(get_client_cpu_affinity_group(), CassandraVars.layout.client_nodes)
+
+
+def split_cpu_affinity_group(cpus: List[int], parts: int) -> List[str]:
+    size = max(1, len(cpus) // parts)
+    chunks = [cpus[i * size:(i + 1) * size] for i in range(parts - 1)] + [cpus[(parts - 1) * size:]]
+    return [topology.format_cpulist(e) if len(e) > 0 else str(cpus[-1]) for e in chunks]
 
 
 def validate_XmxXms_pair(jvmArgs: str) -> None:
@@ -162,10 +670,23 @@ def validate_XmxXms_pair(jvmArgs: str) -> None:
         raise Exception()
 
 
+def validate_numactl() -> None:
+    x = " ".join([get_server_pinning(), "echo"])
+    app = subprocess.Popen(x, shell=True, stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT, universal_newlines=True)
+    current = ""
+    for l in app.stdout:  # type: ignore
+        current += l
+    if block_until_process_is_done(app) != 0:
+        print("Validation failed: could not bind memory with numactl (is it installed?)", flush=True)
+        print(current)
+        raise Exception()
+
+
 def validate_perf() -> None:
     if len(CassandraVars.perf) == 0:
         raise Exception()
-    x = " ".join(["perf stat -e", CassandraVars.perf, "echo"])
+    x = " ".join(["perf stat -x, -e", CassandraVars.perf, "echo"])
     app = subprocess.Popen(x, shell=True, stdout=subprocess.PIPE,
                            stderr=subprocess.STDOUT, universal_newlines=True)
     current = ""
@@ -264,17 +785,18 @@ def restore_jvm_opts() -> None:
 def prepopulate_tasks() -> None:
     path = get_init_path()
     run_cassandra_server(path)
-    block_until_ready()
+    block_until_ready(path)
 
     # 100000000
-    prepopulate_database(int(100000000 / 8), path)
+    prepopulate_database(CassandraVars.population, path)
 
     request_graceful_server_exit()
-    block_until_dead()
+    block_until_dead(path)
+    stop_helpers()
 
-    copy = subprocess.Popen(" ".join(["cp -r", os.path.join(CassandraVars.base_dir, "data"), os.path.join(
-        CassandraVars.base_dir, "pre_data")]), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-    block_until_process_is_done(copy)
+    # pre_data must be a real copy, data is hardlinked or cloned from it later on
+    for (pre_data, data) in get_data_dirs():
+        snapshot.restore(data, pre_data, "copy", CassandraVars.cpu_count)
     restore_jvm_opts()
 
 
@@ -284,16 +806,39 @@ def prepare_yes():
     exit(0)
 
 
-def prepare_database() -> None:
-    x = " ".join(["rm -rf", os.path.join(CassandraVars.base_dir, "data")])
-    delete = subprocess.Popen(x, shell=True)
-    block_until_process_is_done(delete)
+def get_pre_data_dir() -> str:
+    # the prepopulated data depends on the cluster, the profile and its column sizes
+    name = "pre_data"
+    if CassandraVars.nodes > 1:
+        name += "." + str(CassandraVars.nodes) + "nodes.rf" + str(CassandraVars.replication_factor)
+    if CassandraVars.workload["profile"] != workload.DEFAULT_PROFILE:
+        name += "." + os.path.splitext(os.path.basename(get_profile_source()))[0]
+    if CassandraVars.workload["columnSize"] > 0:
+        name += ".c" + str(CassandraVars.workload["columnSize"])
+    return os.path.join(CassandraVars.base_dir, name)
+
+
+def get_data_dirs() -> List[Tuple[str, str]]:
+    # (prepopulated, live) data directory per node
+    if CassandraVars.nodes == 1:
+        return [(get_pre_data_dir(), os.path.join(CassandraVars.base_dir, "data"))]
+    return [(os.path.join(get_pre_data_dir(), cluster.node_name(node.number)), cluster.data_dir(node)) for node in CassandraVars.cluster]
 
-    if os.path.exists(os.path.join(CassandraVars.base_dir, "pre_data")):
-        copy = subprocess.Popen(" ".join(["cp -r", os.path.join(CassandraVars.base_dir, "pre_data"), os.path.join(
-            CassandraVars.base_dir, "data")]), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-        block_until_process_is_done(copy)
+
+def prepare_database() -> None:
+    if os.path.exists(get_pre_data_dir()):
+        stats = [snapshot.restore(pre_data, data, CassandraVars.restore_method, CassandraVars.cpu_count)
+                 for (pre_data, data) in get_data_dirs()]
+        CassandraVars.restore_stats = dict(stats[0])
+        for key in ["files", "hardlinked", "cloned", "copied", "bytes"]:
+            CassandraVars.restore_stats[key] = str(sum(int(e[key]) for e in stats))
+        CassandraVars.restore_stats["seconds"] = "{:.3f}".format(sum(float(e["seconds"]) for e in stats))
+        CassandraVars.restore_stats["method"] = ",".join(sorted(set(e["method"] for e in stats)))
+        print("Restored data using " + CassandraVars.restore_stats["method"] + " in " +
+              CassandraVars.restore_stats["seconds"] + " s")
         return
+    for (_, data) in get_data_dirs():
+        snapshot.remove(data)
 
     ask_y_n("It seems that you don't have a prepopulated database which is needed for stable benchmark results. Do you want to generate it now? It takes about 20 minutes and will use about 4 GB of hard drive space.", prepare_yes, exit_on_no)
 
@@ -301,27 +846,63 @@ def prepare_database() -> None:
 def prepopulate_database(N: int, path: str) -> None:
     init_user_jvm_args()
 
-    taskset_server = get_server_cpu_affinity_group_raw()
-    threads = str(int(taskset_server[1]) - int(taskset_server[0]) + 1)
-    print(f"Using {threads} threads to initialize data")
-
-    conf = "user profile="+CassandraVars.base_dir+"/tools/" + CassandraVars.workload + " ops\(insert=1\) no-warmup cl=ONE n=" + str(
-        int(N))+" -mode native cql3 -pop seq=1.."+str(N)+" -rate threads=" + threads
-    add_jvm_option("".join(["-Xlog:gc*:file=", path, "/client.gc"]))
-    x = " ".join(["taskset -c " + get_client_cpu_affinity_group(),
-                  CassandraVars.cassanadra_stress_bin, conf])
-    app = subprocess.Popen(x, stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT, shell=True, universal_newlines=True)
+    threads = len(get_server_cpu_affinity_group_raw())
+    taskset_client = get_client_cpu_affinity_group_raw()
+    shards = max(1, min(CassandraVars.prepopulate_shards, len(taskset_client), N))
+    shard_threads = str(max(1, threads // shards))
+    print(f"Using {shards} loaders with {shard_threads} threads each to initialize data")
+
+    jvm_opts = os.environ.get("JVM_OPTS", "")
+    apps = list()
+    step = N // shards
+    for (i, cpus) in enumerate(split_cpu_affinity_group(taskset_client, shards)):
+        lo = i * step + 1
+        hi = N if i == shards - 1 else (i + 1) * step
+        conf = "user profile=" + get_workload_profile() + " ops\(insert=1\) no-warmup cl=ONE n=" + str(
+            hi - lo + 1)+" -mode native cql3" + get_stress_nodes() + " -pop seq="+str(lo)+".."+str(hi)+" -rate threads=" + shard_threads
+        env = dict(os.environ)
+        env["JVM_OPTS"] = " ".join([jvm_opts, "".join(["-Xlog:gc*:file=", path, "/client.", str(i), ".gc"])]).strip()
+        x = " ".join([get_pinning(cpus, CassandraVars.layout.client_nodes), CassandraVars.cassanadra_stress_bin, conf])
+        with open(os.path.join(path, "client." + str(i) + ".log"), "w") as writeFile:
+            apps.append((start_group(x, writeFile, env),
+                         "seq=" + str(lo) + ".." + str(hi) + " on CPUs [" + cpus + "]"))
+
+    failed = [desc for (app, desc) in apps if block_until_process_is_done(app) != 0]
     with open(os.path.join(path, "client.log"), "w") as writeFile:
-        for l in app.stdout:  # type: ignore
-            writeFile.write(l)
+        for (i, (_, desc)) in enumerate(apps):
+            writeFile.write("== Loader " + str(i) + ": " + desc + " ==\n")
+            with open(os.path.join(path, "client." + str(i) + ".log"), "r") as readFile:
+                for l in readFile:
+                    writeFile.write(l)
+    if len(failed) > 0:
+        print("Prepopulation failed for " + ", ".join(failed) + ", check " + path, flush=True)
+        raise Exception()
 
-    block_until_process_is_done(app)
+    flush_and_wait_for_compactions()
     restore_jvm_opts()
 
 
+def flush_and_wait_for_compactions() -> None:
+    print("Flushing memtables and waiting for compactions: ", end="", flush=True)
+    nodes: List[Optional[Node]] = list(CassandraVars.cluster) if CassandraVars.nodes > 1 else [None]
+    for node in nodes:
+        app = subprocess.Popen(get_nodetool(node) + ["flush"],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        block_until_process_is_done(app)
+    for node in nodes:
+        while True:
+            stats = subprocess.Popen(get_nodetool(node) + ["compactionstats"],
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+            output, _ = stats.communicate()
+            if stats.returncode != 0 or "pending tasks: 0" in output:
+                break
+            print(".", end="", flush=True)
+            time.sleep(5)
+    print(" done", flush=True)
+
+
 def nodetool_status() -> ServerStatus:
-    app = subprocess.Popen([CassandraVars.nodetool_bin, "status"],
+    app = subprocess.Popen(get_nodetool() + ["status"],
                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
     block_until_process_is_done(app)
     status_code = app.returncode
@@ -335,37 +916,164 @@ def nodetool_status() -> ServerStatus:
         raise Exception("Unkown nodetool status code")
 
 
+def get_server_group(result_path: str) -> int:
+    app = CassandraVars.server_processes.get(result_path)
+    return app.pid if app is not None else 0
+
+
+def signal_server(result_path: str, sig: int) -> None:
+    # SIGTERM goes to the JVM only, a wrapper such as perf has to see it exit. SIGKILL goes to the whole process group
+    pid = read_server_pid(result_path)
+    pgid = get_server_group(result_path)
+    if pgid > 0 and (sig == signal.SIGKILL or pid == 0):
+        processes.signal_group(pgid, sig)
+    elif pid > 0:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+
+def wait_for_server(result_path: str, timeout: float) -> bool:
+    # the JVM is in the process group of the launcher, which has exited long ago
+    pgid = get_server_group(result_path)
+    if pgid > 0:
+        return processes.wait_group(pgid, timeout)
+    pid = read_server_pid(result_path)
+    return pid == 0 or processes.wait(pid, timeout)
+
+
 def request_graceful_server_exit() -> None:
-    app = subprocess.Popen([CassandraVars.nodetool_bin, "stopdaemon"],
-                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    block_until_process_is_done(app)
+    # SIGTERM runs the same shutdown hook as nodetool stopdaemon, without starting a JVM per node to send it
+    CassandraVars.shutdown_start = time.monotonic()
+    for (_, path) in get_node_paths(CassandraVars.server_path):
+        signal_server(path, signal.SIGTERM)
 
 
-def block_until(status) -> None:
-    while True:
-        time.sleep(5)
-        nodetool_code = nodetool_status()
-        if nodetool_code == status:
-            print(" done", flush=True)
+def read_server_pid(result_path: str) -> int:
+    if result_path in CassandraVars.server_pids:
+        return CassandraVars.server_pids[result_path]
+    try:
+        with open(get_server_pid_file(result_path), "r") as readFile:
+            pid = int(readFile.read().strip())
+    except (OSError, ValueError):
+        return 0
+    if pid > 0:
+        CassandraVars.server_pids[result_path] = pid
+    return pid
+
+
+def is_server_alive(result_path: str) -> bool:
+    pid = read_server_pid(result_path)
+    if pid == 0:
+        # JVM not forked yet or pid file not written, the launcher exits once the JVM is daemonized but the JVM
+        # stays in its process group
+        pgid = get_server_group(result_path)
+        return pgid > 0 and len(processes.group_members(pgid)) > 0
+    return processes.is_alive(pid)
+
+
+def is_cql_port_open(host: str) -> bool:
+    try:
+        with socket.create_connection((host, CassandraVars.cql_port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def scan_for_marker(path: str, offset: int, carry: str) -> Tuple[bool, int, str]:
+    # carry is the tail of the previous read so that markers split across reads are found
+    try:
+        with open(path, "r", errors="replace") as readFile:
+            readFile.seek(offset)
+            chunk = readFile.read()
+            offset = readFile.tell()
+    except OSError:
+        return False, offset, carry
+    text = carry + chunk
+    return CassandraVars.ready_marker in text, offset, text[-len(CassandraVars.ready_marker):]
+
+
+def block_until_ready(result_path: str) -> None:
+    if CassandraVars.nodes == 1:
+        block_until_node_ready(result_path, CassandraVars.cql_host)
+    else:
+        # every node is already listening for CQL clients, see run_cassandra_server
+        block_until_ring()
+
+
+def block_until_node_ready(result_path: str, host: str, name: str = "server") -> None:
+    print("Blocking until " + name + " is ready: ", end="", flush=True)
+    start = time.monotonic()
+    deadline = start + CassandraVars.boot_timeout
+    (log_path, offset) = CassandraVars.server_logs[result_path]
+    carry = ""
+    delay = 0.05
+    while time.monotonic() < deadline:
+        found, offset, carry = scan_for_marker(log_path, offset, carry)
+        if found or is_cql_port_open(host):
+            print(" done (" + "{:.1f}".format(time.monotonic() - start) + " s)", flush=True)
             return
-        elif nodetool_code == ServerStatus.DEAD:
+        if not is_server_alive(result_path):
             print(
-                "\nCassandra crashed, checks the logs for more info. Aborting...", flush=True)
-            exit(1)
+                "\nCassandra crashed during startup, checks the logs for more info. Aborting...", flush=True)
+            raise supervisor.Failure(name, "died during startup", "boot")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+    # no readiness event, ask nodetool before giving up
+    if nodetool_status() == ServerStatus.READY:
+        print(" done", flush=True)
+        return
+    print("\nCassandra did not become ready within " + str(CassandraVars.boot_timeout) + " s. Aborting...", flush=True)
+    raise supervisor.Failure(name, "not ready within " + str(CassandraVars.boot_timeout) + " s", "boot")
+
+
+def block_until_ring() -> None:
+    print("Blocking until all " + str(CassandraVars.nodes) + " nodes are up: ", end="", flush=True)
+    start = time.monotonic()
+    up = 0
+    while time.monotonic() < start + CassandraVars.boot_timeout:
+        app = subprocess.Popen(get_nodetool() + ["status"],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        output, _ = app.communicate()
+        up = cluster.count_up(output) if app.returncode == 0 else 0
+        if up == CassandraVars.nodes:
+            print(" done (" + "{:.1f}".format(time.monotonic() - start) + " s)", flush=True)
+            return
         print(".", end="", flush=True)
+        time.sleep(2)
+    print("\nOnly " + str(up) + " of " + str(CassandraVars.nodes) + " nodes are up after " +
+          str(CassandraVars.boot_timeout) + " s. Aborting...", flush=True)
+    raise supervisor.Failure("cluster", "only " + str(up) + " of " + str(CassandraVars.nodes) + " nodes up", "boot")
 
 
-def block_until_ready() -> None:
-    print("Blocking until server is ready: ", end="", flush=True)
-    block_until(ServerStatus.READY)
+def block_until_dead(result_path: str) -> None:
+    for (_, path) in get_node_paths(result_path):
+        block_until_node_dead(path)
 
 
-def block_until_dead() -> None:
+def block_until_node_dead(result_path: str) -> None:
     print("Blocking until server is dead: ", end="", flush=True)
-    block_until(ServerStatus.DEAD)
-
-
-def init() -> None:
+    sent = "SIGTERM"
+    if not wait_for_server(result_path, CassandraVars.shutdown_start + CassandraVars.shutdown_timeout - time.monotonic()):
+        # the run has been measured completely, it is kept
+        print("\nCassandra is still running " + str(CassandraVars.shutdown_timeout) + " s after SIGTERM, sending SIGKILL: ", end="", flush=True)
+        sent = "SIGKILL"
+        signal_server(result_path, signal.SIGKILL)
+        if not wait_for_server(result_path, processes.KILL_TIMEOUT):
+            raise supervisor.Failure("server", "survived SIGKILL", "shutdown")
+    seconds = time.monotonic() - CassandraVars.shutdown_start
+    write_shutdown_log(result_path, sent, seconds)
+    print(" done (" + "{:.1f}".format(seconds) + " s)", flush=True)
+
+
+def write_shutdown_log(result_path: str, sent: str, seconds: float) -> None:
+    with open(os.path.join(result_path, "shutdown.log"), "w") as writeFile:
+        writeFile.write("signal: " + sent + "\n")
+        writeFile.write("seconds: " + "{:.3f}".format(seconds) + "\n")
+
+
+def init():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--jdk", help="path to JDK, use same for client and server")
@@ -373,15 +1081,49 @@ def init() -> None:
         "--jdkServer", help="path to JDK to be used for server")
     parser.add_argument(
         "--jdkClient", help="path to JDK to be used for client")
-    parser.add_argument("--tag", help="tag name", required=True)
+    parser.add_argument("--tag", help="tag name")
+    parser.add_argument(
+        "--plan", help="JSON/YAML experiment matrix to run as a resumable queue instead of a single configuration")
+    parser.add_argument(
+        "--workload", help="workload preset (" + ", ".join(workload.PRESETS) + ") or JSON/YAML file with op mix, key distribution, consistency, population and column size (default default)", default="default")
     parser.add_argument(
         "--duration", help="duration in minutes (default 1)", default=1)
+    parser.add_argument(
+        "--converge", help="stop the workload once the 95%% confidence intervals of op rate and p99 latency are within +-PERCENT of their mean, --duration becomes the maximum (default disabled)", default=0)
+    parser.add_argument(
+        "--minDuration", help="with --converge, seconds the workload runs at least (default 120)", default=120)
+    parser.add_argument(
+        "--warmup", help="run the workload for N seconds before each measured one, or 'auto' until client throughput and server JIT compilation have settled, logs are kept in warmup/ (default disabled)")
+    parser.add_argument(
+        "--warmupMax", help="with --warmup=auto, seconds the warmup runs at most (default 600)", default=600)
+    parser.add_argument(
+        "--jfr", help="record the measured window of the server JVM with Java Flight Recorder into server.jfr, SETTINGS is default (low overhead), profile or a .jfc file (default disabled, default settings if given without value)",
+        nargs="?", const="default", metavar="SETTINGS")
     parser.add_argument(
         "--threads", help="client threads (default 1)", default=1)
     parser.add_argument(
         "--skew", help="skew CPU partitioning (default 0)", default=0)
     parser.add_argument(
-        "--perf", help="arguments to perf stat -e (default None)")
+        "--cpuPolicy", help="how CPUs are divided between server and client: contiguous halves, halves of the physical cores, or one socket each (default split)",
+        choices=topology.POLICIES, default="split")
+    parser.add_argument(
+        "--housekeeping", help="CPUs reserved for the orchestrator and other helpers, taken as whole cores from CPU 0 (default 0)", default=0)
+    parser.add_argument(
+        "--sampleInterval", help="sample CPU, memory, context switches, faults and disk I/O of server and client from /proc every N ms into resources.bin (default disabled)", default=0)
+    parser.add_argument(
+        "--timestampOutput", help="prefix every line of server.log and client.log with the wall clock time, done on the housekeeping CPUs", action='store_true')
+    parser.add_argument(
+        "--nodes", help="run a local cluster of N server nodes on 127.0.0.1..N, each with its own slice of the server CPUs (default 1)", default=1)
+    parser.add_argument(
+        "--replicationFactor", help="replication factor of the workload keyspace, at most --nodes (default 1)", default=1)
+    parser.add_argument(
+        "--consistency", help="consistency level of the cassandra-stress workload, overrides the one of --workload", choices=workload.CONSISTENCY_LEVELS)
+    parser.add_argument(
+        "--numaBind", help="bind the memory of server and client to the NUMA nodes of their CPUs using numactl", action='store_true')
+    parser.add_argument(
+        "--perf", help="arguments to perf stat -e, counters are written to server.perf.csv (default None)")
+    parser.add_argument(
+        "--perfInterval", help="with --perf, also print counters every N ms (perf stat -I) for time series (default disabled)", default=0)
     parser.add_argument(
         "--timeVerbose", help="pipe server into time --verbose (default disabled)", action='store_true')
     parser.add_argument(
@@ -390,18 +1132,43 @@ def init() -> None:
                         help="args to client JVM (e.g. \"-XX:+UseG1GC\")")
     parser.add_argument("--jvmServerArgs",
                         help="args to server JVM (e.g. \"-XX:+UseZGC\")")
-    parser.add_argument("--autoKillJava", help="automatically kill any previously running Java processess before starting server", action='store_true')
+    parser.add_argument(
+        "--bootTimeout", help="seconds to wait for the server to accept CQL clients (default 300)", default=300)
+    parser.add_argument(
+        "--stallTimeout", help="seconds without client output after which a run is aborted as hung (default 60)", default=60)
+    parser.add_argument(
+        "--shutdownTimeout", help="seconds to wait for the server to stop after the workload (default 120)", default=120)
+    parser.add_argument(
+        "--restore", help="how to restore data from pre_data before each run (default auto)", choices=snapshot.METHODS, default="auto")
+    parser.add_argument(
+        "--prepopulateShards", help="concurrent cassandra-stress loaders used to prepopulate the database (default 4)", default=4)
+    parser.add_argument(
+        "--warmServer", help="run N client workloads against one server JVM, each in its own result directory (default 1)", default=1)
+    parser.add_argument(
+        "--truncateBetween", help="with --warmServer, truncate and reload the keyspace between client workloads", action='store_true')
+    parser.add_argument(
+        "--search", help="search for the highest open-loop rate or thread count that meets --sloP99", choices=["rate", "threads"])
+    parser.add_argument(
+        "--sloP99", help="p99 latency SLO in ms used by --search")
+    parser.add_argument(
+        "--searchLow", help="first rate (op/s) or thread count probed by --search (default 1000 or 1)")
+    parser.add_argument(
+        "--searchHigh", help="highest rate (op/s) or thread count probed by --search (default 1000000 or 1024)")
+    parser.add_argument(
+        "--searchSteps", help="bisection steps after the SLO is first violated (default 6)", default=6)
+    parser.add_argument(
+        "--searchDuration", help="duration of each --search probe in seconds (default 60)", default=60)
+    parser.add_argument("--autoKillJava", help="stop processes left running by an earlier benchmark.py in this directory without asking", action='store_true')
     parser.add_argument("--debug", help="debug this tool", action='store_true')
     args = parser.parse_args()
 
-    if args.autoKillJava:
-        check_if_java_is_running_non_interactive()
-    else:
-        check_if_java_is_running_interactive()
-
-    if args.jdk is None and args.jdkServer is None and args.jdkClient is None:
-        print("Must specify either jdk or jdkServer/jdkClient")
-        raise Exception()
+    if args.plan is None:
+        if args.tag is None:
+            print("Must specify either tag or plan")
+            raise Exception()
+        if args.jdk is None and args.jdkServer is None and args.jdkClient is None:
+            print("Must specify either jdk or jdkServer/jdkClient")
+            raise Exception()
 
     if args.jdk is not None:
         if args.jdkServer is not None or args.jdkClient is not None:
@@ -417,109 +1184,404 @@ def init() -> None:
         CassandraVars.java_dir["client"] = os.path.expanduser(args.jdkClient)
         CassandraVars.java_dir["server"] = os.path.expanduser(args.jdkServer)
 
-    if len(CassandraVars.java_dir["client"]) == 0 or len(CassandraVars.java_dir["server"]) == 0:
-        raise Exception()
-
-    cpu_count = os.cpu_count()
-    if cpu_count is None or cpu_count == 0:
+    cpus = topology.read_topology()
+    if len(cpus) == 0:
         raise Exception()
-    CassandraVars.cpu_count = int(cpu_count)
-
-    if args.jvmArgs is not None:
-        validate_XmxXms_pair(args.jvmArgs)
-        CassandraVars.user_jvm_args = args.jvmArgs
-
-    if args.jvmClientArgs is not None:
-        validate_XmxXms_pair(args.jvmClientArgs)
-        CassandraVars.user_jvm_client_args = args.jvmClientArgs
+    CassandraVars.cpu_count = len(cpus)
 
-    if args.jvmServerArgs is not None:
-        validate_XmxXms_pair(args.jvmServerArgs)
-        CassandraVars.user_jvm_server_args = args.jvmServerArgs
-
-    CassandraVars.tag = args.tag
     if args.debug:
         CassandraVars.debug = True
     else:
         sys.tracebacklimit = 0
 
     CassandraVars.skew = int(args.skew)
-    if abs(CassandraVars.skew) > CassandraVars.cpu_count/2 - 1:
-        print("Invalid skew value. Must have room for both server and client")
+    CassandraVars.cpu_policy = args.cpuPolicy
+    CassandraVars.housekeeping = int(args.housekeeping)
+    CassandraVars.sample_interval = float(args.sampleInterval) / 1000
+    if CassandraVars.sample_interval > 0 and CassandraVars.housekeeping == 0:
+        # the sampler reads /proc of both JVMs every interval, on their CPUs it would disturb what it measures
+        print("Reserving the first core for housekeeping, the sampler must not run on the measured CPUs")
+        CassandraVars.housekeeping = 1
+    try:
+        CassandraVars.layout = topology.partition(cpus, CassandraVars.cpu_policy,
+                                                  CassandraVars.housekeeping, CassandraVars.skew)
+    except Exception as e:
+        print("Invalid CPU layout: " + str(e))
         raise Exception()
-    print("Using CPUs [" + get_server_cpu_affinity_group() + "] for server")
-    print("Using CPUs [" + get_client_cpu_affinity_group() + "] for client")
-
-    for x in [CassandraVars.cassandra_bin, CassandraVars.cassanadra_stress_bin, CassandraVars.nodetool_bin, CassandraVars.java_dir["client"] + "/bin/java", CassandraVars.java_dir["server"] + "/bin/java"]:
+    CassandraVars.nodes = int(args.nodes)
+    CassandraVars.replication_factor = int(args.replicationFactor)
+    CassandraVars.consistency = args.consistency if args.consistency is not None else ""
+    CassandraVars.workload_spec = args.workload
+    if CassandraVars.nodes < 1 or CassandraVars.replication_factor < 1 or CassandraVars.replication_factor > CassandraVars.nodes:
+        print("Invalid cluster: need at least one node and a replication factor between 1 and the number of nodes")
+        raise Exception()
+    CassandraVars.numa_bind = args.numaBind
+    if CassandraVars.numa_bind:
+        validate_numactl()
+    CassandraVars.timestamp_output = args.timestampOutput
+    if len(CassandraVars.layout.housekeeping) == 0:
+        print("Warning: no housekeeping CPUs, the orchestrator and its helpers share CPUs with server and client (see --housekeeping)")
+    for l in topology.describe(CassandraVars.layout):
+        print(l)
+    if len(CassandraVars.layout.housekeeping) > 0:
+        # nodetool, cqlsh, the sampler and log timestamping inherit this, server and client are pinned explicitly
+        os.sched_setaffinity(0, CassandraVars.layout.housekeeping)
+
+    for x in [CassandraVars.cassandra_bin, CassandraVars.cassanadra_stress_bin, CassandraVars.nodetool_bin]:
         if not os.path.isfile(x):
             print("Could not find '" + x + "' binary. Check your configuration")
             raise Exception()
+    if CassandraVars.nodes > 1:
+        setup_cluster()
 
-    CassandraVars.duration = str(args.duration) + "m"
-    CassandraVars.threads = str(int(args.threads))
-    validate_jvm_args()
+    CassandraVars.converge = float(args.converge)
+    CassandraVars.min_duration = int(args.minDuration)
+    if CassandraVars.converge < 0 or CassandraVars.min_duration < 0:
+        print("Invalid convergence target or minimum duration")
+        raise Exception()
+    if args.warmup is not None:
+        if args.warmup != "auto" and (not args.warmup.isdigit() or int(args.warmup) == 0):
+            print("Invalid warmup, expected a number of seconds or auto")
+            raise Exception()
+        CassandraVars.warmup = args.warmup
+    CassandraVars.warmup_max = int(args.warmupMax)
+    if args.jfr is not None:
+        if args.jfr not in ("default", "profile") and not (args.jfr.endswith(".jfc") and os.path.isfile(args.jfr)):
+            print("Invalid JFR settings, expected default, profile or an existing .jfc file")
+            raise Exception()
+        CassandraVars.jfr = os.path.abspath(args.jfr) if args.jfr.endswith(".jfc") else args.jfr
+    CassandraVars.boot_timeout = int(args.bootTimeout)
+    CassandraVars.stall_timeout = int(args.stallTimeout)
+    CassandraVars.shutdown_timeout = int(args.shutdownTimeout)
+    check_for_leftovers(args.autoKillJava)
+    CassandraVars.restore_method = args.restore
+    CassandraVars.prepopulate_shards = int(args.prepopulateShards)
+    CassandraVars.warm_iterations = int(args.warmServer)
+    CassandraVars.truncate_between = args.truncateBetween
+    if CassandraVars.warm_iterations < 1:
+        print("Invalid warmServer value. Must run at least one workload")
+        raise Exception()
+    if args.search is not None:
+        if args.sloP99 is None:
+            print("Must specify sloP99 when using search")
+            raise Exception()
+        CassandraVars.search = args.search
+        CassandraVars.search_slo_p99 = float(args.sloP99)
+        default_low, default_high = (1000, 1000000) if args.search == "rate" else (1, 1024)
+        CassandraVars.search_low = int(args.searchLow) if args.searchLow is not None else default_low
+        CassandraVars.search_high = int(args.searchHigh) if args.searchHigh is not None else default_high
+        CassandraVars.search_steps = int(args.searchSteps)
+        CassandraVars.search_duration = str(int(args.searchDuration)) + "s"
+        if CassandraVars.search_low < 1 or CassandraVars.search_high < CassandraVars.search_low:
+            print("Invalid search range")
+            raise Exception()
 
     clear_cassandra_meta_conf()
     if args.perf is not None:
         CassandraVars.perf = args.perf
+        CassandraVars.perf_interval = int(args.perfInterval)
         validate_perf()
-        with open(CassandraVars.perf_file, "w") as writeFile:
-            writeFile.write(args.perf)
     if args.timeVerbose:
         validate_time()
         with open(CassandraVars.time_file, "w") as writeFile:
             writeFile.write("using time")
 
+    if args.plan is None:
+        configure(args.tag, args.duration, args.threads,
+                  args.jvmArgs, args.jvmServerArgs, args.jvmClientArgs, args.workload)
+    return args
+
+
+def setup_cluster() -> None:
+    try:
+        cpus = cluster.split_cpus(CassandraVars.layout.server, CassandraVars.nodes)
+    except Exception as e:
+        print("Invalid CPU layout: " + str(e))
+        raise Exception()
+    CassandraVars.cluster = cluster.make_nodes(CassandraVars.nodes, CassandraVars.cluster_dir, cpus)
+    for node in CassandraVars.cluster:
+        cluster.write_node_conf(CassandraVars.conf_dir, node, CassandraVars.cluster[0])
+        print(cluster.node_name(node.number) + ": " + node.address + ", CPUs " + topology.format_cpulist(node.cpus) +
+              ", JMX port " + str(node.jmx_port))
+
+
+def configure(tag: str, duration: str, threads: str, jvm_args, jvm_server_args, jvm_client_args, workload_spec: str) -> None:
+    # java_dir must already be set, validation is only done once per JVM configuration
+    if len(CassandraVars.java_dir["client"]) == 0 or len(CassandraVars.java_dir["server"]) == 0:
+        raise Exception()
+    CassandraVars.tag = tag
+    set_workload(workload_spec)
+    CassandraVars.duration = str(duration) + "m"
+    CassandraVars.threads = str(int(threads))
+    CassandraVars.user_jvm_args = ""
+    CassandraVars.user_jvm_server_args = ""
+    CassandraVars.user_jvm_client_args = ""
+
+    if jvm_args is not None:
+        validate_XmxXms_pair(jvm_args)
+        CassandraVars.user_jvm_args = jvm_args
+
+    if jvm_client_args is not None:
+        validate_XmxXms_pair(jvm_client_args)
+        CassandraVars.user_jvm_client_args = jvm_client_args
+
+    if jvm_server_args is not None:
+        validate_XmxXms_pair(jvm_server_args)
+        CassandraVars.user_jvm_server_args = jvm_server_args
+
+    key = (CassandraVars.java_dir["server"], CassandraVars.java_dir["client"], CassandraVars.user_jvm_args,
+           CassandraVars.user_jvm_server_args, CassandraVars.user_jvm_client_args)
+    if key in CassandraVars.validated_jvms:
+        return
+    for x in [CassandraVars.java_dir["client"] + "/bin/java", CassandraVars.java_dir["server"] + "/bin/java"]:
+        if not os.path.isfile(x):
+            print("Could not find '" + x + "' binary. Check your configuration")
+            raise Exception()
+    validate_jvm_args()
+    CassandraVars.validated_jvms.add(key)
+
 def exit_on_no():
     print("OK. Exiting...")
-    CassandraVars.kill_java_on_exit = False
     exit(1)
 
 
-def check_if_java_is_running_yes():
-    app = subprocess.Popen(["pkill java"], stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL, shell=True)
-    print("Killing all Java processes...")
-    block_until_process_is_done(app)
-    time.sleep(5)
-    check_if_java_is_running_non_interactive()
+def stop_leftovers(groups: List[int]) -> None:
+    print("Stopping process groups " + ", ".join(str(e) for e in groups) + "...", flush=True)
+    if not processes.terminate(groups, CassandraVars.shutdown_timeout):
+        print("Some of them had to be killed with SIGKILL", flush=True)
 
 
-def check_if_java_is_running():
-    app = subprocess.Popen(["pgrep java"], stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL, shell=True)
-    return block_until_process_is_done(app)
+def check_for_leftovers(stop: bool) -> None:
+    # only processes started by a benchmark.py in this directory that was killed itself, other JVMs are none of its business
+    groups = processes.marked(CassandraVars.base_dir)
+    if len(groups) == 0:
+        return
+    if stop:
+        stop_leftovers(groups)
+    else:
+        ask_y_n("Processes started by an earlier benchmark.py in " + CassandraVars.base_dir + " are still running. Do you want to stop them?",
+                lambda: stop_leftovers(groups), exit_on_no)
+
+
+def stop_process_groups() -> None:
+    # whatever is left of the processes started by this invocation after a failure, SIGKILL if SIGTERM is not enough
+    # a group id that was freed and taken by an unrelated process lacks the marker
+    marked = processes.marked(CassandraVars.base_dir)
+    groups = [e for e in CassandraVars.process_groups if e in marked]
+    CassandraVars.process_groups = []
+    CassandraVars.server_processes = {}
+    CassandraVars.server_pids = {}
+    if len(groups) == 0:
+        return
+    print("\nStopping " + str(len(groups)) + " remaining process groups", flush=True)
+    processes.terminate(groups, CassandraVars.shutdown_timeout)
+
+def read_workload_schema() -> Tuple[str, str]:
+    keyspace = ""
+    table = ""
+    with open(get_workload_profile(), "r") as readFile:
+        for l in readFile:
+            if l.startswith("keyspace:"):
+                keyspace = l.split(":", 1)[1].strip()
+            elif l.startswith("table:"):
+                table = l.split(":", 1)[1].strip()
+    if len(keyspace) == 0 or len(table) == 0:
+        print("Could not find keyspace and table in " + get_workload_profile())
+        raise Exception()
+    return keyspace, table
 
 
-def check_if_java_is_running_interactive():
-    if check_if_java_is_running() != 1:
-        ask_y_n("Java processes are already running. Do you want to kill them?",
-                check_if_java_is_running_yes, exit_on_no)
+def reload_keyspace(result_path: str) -> None:
+    keyspace, table = read_workload_schema()
+    print("Truncating " + keyspace + "." + table + " and reloading it")
+    app = subprocess.Popen([CassandraVars.cqlsh_bin, CassandraVars.cql_host, str(CassandraVars.cql_port),
+                            "-e", "TRUNCATE " + keyspace + "." + table],
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if block_until_process_is_done(app) != 0:
+        print("Could not truncate " + keyspace + "." + table)
+        raise Exception()
+    path = os.path.join(result_path, "reload")
+    pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+    prepopulate_database(CassandraVars.population, path)
 
-def check_if_java_is_running_non_interactive():
-    while check_if_java_is_running() != 1:
-        app = subprocess.Popen(["pkill java"], stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL, shell=True)
-        block_until_process_is_done(app)
-        time.sleep(5)
 
-def main() -> None:
-    if has_key(os.environ, "JAVA_HOME"):
-        CassandraVars.old_java_home = os.environ["JAVA_HOME"]
+def run_search_probe(result_path: str, probe: int, target: int) -> Dict[str, float]:
+    path = os.path.join(result_path, "search", str(probe))
+    pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+    if CassandraVars.search == "rate":
+        print("Probing " + str(target) + " op/s: ", end="", flush=True)
+        run_cassandra_stress(CassandraVars.search_duration, CassandraVars.threads, path, str(target))
+    else:
+        print("Probing " + str(target) + " threads: ", end="", flush=True)
+        run_cassandra_stress(CassandraVars.search_duration, str(target), path)
+    summary = stresslog.read_summary(os.path.join(path, "client.log"))
+    op_rate = summary.get("Op rate", 0.0)
+    p99 = summary.get("Latency 99th percentile", float("inf"))
+    # an open-loop probe that cannot keep up with its target rate is saturated regardless of latency
+    passed = p99 <= CassandraVars.search_slo_p99 and (
+        CassandraVars.search != "rate" or op_rate >= 0.95 * target)
+    print(str(int(op_rate)) + " op/s, p99 " + str(p99) + " ms" + (" ok" if passed else " violates SLO"), flush=True)
+    summary["passed"] = 1.0 if passed else 0.0
+    return summary
+
+
+def run_search(result_path: str) -> None:
+    # ramp up by doubling until the SLO is violated, then bisect between the last passing and first failing target
+    columns = ["probe", "target", "Op rate", "Latency median", "Latency 99th percentile",
+               "Latency 99.9th percentile", "Latency max", "SLO p99", "passed"]
+    probes: Dict[int, bool] = dict()
+    with open(os.path.join(result_path, "search.csv"), "w") as writeFile:
+        writeFile.write(",".join(columns) + "\n")
+
+        def probe(target: int) -> bool:
+            summary = run_search_probe(result_path, len(probes), target)
+            summary["probe"] = len(probes)
+            summary["target"] = target
+            summary["SLO p99"] = CassandraVars.search_slo_p99
+            writeFile.write(",".join(str(summary.get(e, float("nan"))) for e in columns) + "\n")
+            writeFile.flush()
+            probes[target] = summary["passed"] == 1.0
+            return probes[target]
+
+        lo = 0
+        hi = 0
+        target = CassandraVars.search_low
+        while True:
+            if probe(target):
+                lo = target
+                if target >= CassandraVars.search_high:
+                    break
+                target = min(target * 2, CassandraVars.search_high)
+            else:
+                hi = target
+                break
+        for _ in range(CassandraVars.search_steps):
+            if hi == 0:
+                break
+            mid = (lo + hi) // 2
+            if mid in (lo, hi) or mid in probes:
+                break
+            if probe(mid):
+                lo = mid
+            else:
+                hi = mid
+
+    unit = " op/s" if CassandraVars.search == "rate" else " threads"
+    with open(os.path.join(result_path, "search.result"), "w") as writeFile:
+        writeFile.write("Highest " + CassandraVars.search + " meeting p99 <= " + str(CassandraVars.search_slo_p99) +
+                        " ms: " + (str(lo) + unit if lo > 0 else "none") + "\n")
+    print("Highest " + CassandraVars.search + " meeting the SLO: " + (str(lo) + unit if lo > 0 else "none"))
+
+
+def write_warm_server_info(result_path: str, server_path: str, iteration: int) -> None:
+    with open(os.path.join(result_path, "configuration"), "a") as writeFile:
+        writeFile.write("Warm server iteration: " + str(iteration + 1) + " of " +
+                        str(CassandraVars.warm_iterations) + "\n")
+        writeFile.write("Server logs: " + server_path + "\n")
+
+
+def run_benchmark() -> None:
+    prepare_database()
+    result_path = get_result_path()
+
+    write_configuration(result_path)
+    write_restore_log(result_path)
+
     try:
-        init()
-        prepare_database()
-        result_path = get_result_path()
+        run_cassandra_server(result_path)
+        start_sampler(result_path)
+        block_until_ready(result_path)
+
+        server_path = result_path
+        if len(CassandraVars.search) > 0:
+            run_search(result_path)
+            print("Results stored in: " + result_path)
+        for iteration in range(CassandraVars.warm_iterations if len(CassandraVars.search) == 0 else 0):
+            if iteration > 0:
+                result_path = get_result_path()
+                write_configuration(result_path)
+                if CassandraVars.truncate_between:
+                    reload_keyspace(result_path)
+            if CassandraVars.warm_iterations > 1:
+                write_warm_server_info(result_path, server_path, iteration)
+            run_measured(CassandraVars.threads, result_path)
+            print("Results stored in: " + result_path)
+
+        request_graceful_server_exit()
+        block_until_dead(server_path)
+        stop_helpers()
+    except supervisor.Failure as e:
+        # a server that does not stop in time has still been measured completely
+        if e.phase != "shutdown":
+            supervisor.mark_failed(result_path, e)
+        print("\nRun aborted during " + e.phase + ": " + str(e) + (", marked " + result_path + " as failed" if e.phase != "shutdown" else ""),
+              flush=True)
+        # the timestampers end with the processes that are killed on exit
+        stop_sampler()
+        CassandraVars.helpers = []
+        raise Exception()
 
-        write_configuration(result_path)
 
-        run_cassandra_server(result_path)
-        block_until_ready()
+def configure_plan_entry(entry: Dict) -> None:
+    configure(entry["tag"], entry["duration"], entry["threads"], entry["jvmArgsValue"] or None,
+              entry["jvmServerArgsValue"] or None, entry["jvmClientArgsValue"] or None, get_entry_workload(entry))
+
+
+def get_entry_workload(entry: Dict) -> str:
+    # plans without a workload axis run the workload given on the command line
+    return entry.get("workloadValue") or CassandraVars.workload_spec
+
+
+def run_plan(plan_path: str) -> None:
+    matrix = plan.load_plan(plan_path)
+    queue = plan.load_queue(plan_path, matrix)
+    path = plan.queue_path(plan_path)
+    print("Plan queue " + path + ": " + plan.progress(queue))
+    for spec in sorted(set(get_entry_workload(e) for e in queue)):
+        # a broken workload file fails the whole plan up front instead of every entry that uses it
+        set_workload(spec)
+    while True:
+        entry = plan.next_entry(queue)
+        if entry is None:
+            break
+        print("\n== Plan entry " + str(entry["id"] + 1) + "/" + str(len(queue)) + ": " + entry["tag"] +
+              " (repetition " + str(entry["repetition"] + 1) + ") ==", flush=True)
+        CassandraVars.java_dir["server"] = entry["jdkServer"]
+        CassandraVars.java_dir["client"] = entry["jdkClient"]
+        set_workload(get_entry_workload(entry))
+        if not os.path.exists(get_pre_data_dir()):
+            # prepopulating exits, the queue resumes from here on the next invocation
+            configure_plan_entry(entry)
+            prepare_database()
+        entry["status"] = plan.RUNNING
+        entry["attempts"] += 1
+        plan.save_queue(path, matrix["fingerprint"], queue)
+        try:
+            configure_plan_entry(entry)
+            run_benchmark()
+            entry["status"] = plan.DONE
+        except Exception:
+            # exit() and Ctrl-C stop the whole plan, the entry stays running and is resumed on the next invocation
+            if CassandraVars.debug:
+                print(traceback.format_exc())
+            print("Plan entry " + str(entry["id"] + 1) + " failed", flush=True)
+            entry["status"] = plan.FAILED
+            stop_process_groups()
+        finally:
+            restore_jvm_opts()
+        plan.save_queue(path, matrix["fingerprint"], queue)
+    print("Plan finished: " + plan.progress(queue))
 
-        run_cassandra_stress(CassandraVars.duration,
-                             CassandraVars.threads, result_path)
-        block_until_dead()
-        print("Results stored in: " + result_path)
+
+def main() -> None:
+    if has_key(os.environ, "JAVA_HOME"):
+        CassandraVars.old_java_home = os.environ["JAVA_HOME"]
+    try:
+        args = init()
+        if args.plan is not None:
+            run_plan(args.plan)
+        else:
+            run_benchmark()
     except Exception:
         if CassandraVars.debug:
             print(traceback.format_exc())
@@ -528,11 +1590,7 @@ def main() -> None:
         if len(CassandraVars.old_java_home) > 0:
             os.environ["JAVA_HOME"] = CassandraVars.old_java_home
         restore_jvm_opts()
-        if CassandraVars.kill_java_on_exit:
-            print("\nWorkload has finished, killing any remaining Java processes")
-            # forcefully kill since we might have failed doing a graceful exit
-            subprocess.Popen(["pkill java"], stdout=subprocess.DEVNULL,
-                             stderr=subprocess.DEVNULL, shell=True)
+        stop_process_groups()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,23 @@
 #!/usr/bin/python3
 
-from typing import Dict, Final, List
+from typing import Callable, Dict, Final, List, Optional, Tuple
+import argparse
+import html
+import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import seaborn as sns
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import os
+import pathlib
+import re
 import unicodedata
 import markdown
 import textwrap
-from shared.utils import has_key
+from shared import compare, convergence, gccorrelation, gclog, hdrlog, jfrlog, perfstat, sampler, stresslog, supervisor, warehouse, warmup, workload
 
 class ReportVars:
   _instance = None
@@ -28,7 +37,55 @@ class ReportVars:
   TOTAL_GC_MINOR_COUNT: Final[str] = "Total minor GC count"
   TOTAL_GC_MAJOR_COUNT: Final[str] = "Total major GC count"
 
-  column_names: Final[List[str]] = [OP_RATE, ROW_RATE, LATENCY_MEAN, LATENCY_MEDIAN, LATENCY_95, LATENCY_99, LATENCY_999, LATENCY_MAX, TOTAL_GC_MINOR_COUNT, TOTAL_GC_MAJOR_COUNT]
+  SERVER_GC: Final[List[str]] = ["Server " + e for e in gclog.SUMMARY_NAMES]
+  CLIENT_GC: Final[List[str]] = ["Client " + e for e in gclog.SUMMARY_NAMES]
+  # exact percentiles of each run from client.hdr, the summary percentiles above are rounded by cassandra-stress
+  HDR_PERCENTILES: Final[List[float]] = [50.0, 99.0, 99.9, 99.99, 100.0]
+  HDR: Final[List[str]] = ["HDR latency " + ("max" if e == 100.0 else "p" + "{:g}".format(e)) + " (ms)" for e in HDR_PERCENTILES]
+  # percentiles of the distribution merged over all runs of a tag
+  HDR_AGGREGATE_PERCENTILES: Final[List[float]] = [50.0, 90.0, 99.0, 99.9, 99.99, 99.999, 100.0]
+
+  # derived from server.perf.csv, raw event totals are only kept in the warehouse as "Server perf <event>"
+  SERVER_PERF: Final[List[str]] = ["Server " + e for e in perfstat.SUMMARY_NAMES]
+  SERVER_RESOURCES: Final[List[str]] = ["Server " + e for e in sampler.SUMMARY_NAMES]
+  CLIENT_RESOURCES: Final[List[str]] = ["Client " + e for e in sampler.SUMMARY_NAMES]
+  # server.jfr of benchmark.py --jfr, the tables are kept per run as JSON attributes "jfr <table>"
+  SERVER_JFR: Final[List[str]] = ["Server JFR " + e for e in jfrlog.SUMMARY_NAMES]
+  JFR_TOP: Final[int] = 20
+
+  # orchestrator.cpu, CPU time spent by benchmark.py and its helpers while the workload ran
+  ORCHESTRATOR_CPU: Final[str] = "Orchestrator CPU (s)"
+  HELPER_CPU: Final[str] = "Helper CPU (s)"
+  ORCHESTRATOR_SHARE: Final[str] = "Orchestrator and helper CPU relative to client (%)"
+  ORCHESTRATOR: Final[List[str]] = [ORCHESTRATOR_CPU, HELPER_CPU, ORCHESTRATOR_SHARE]
+
+  # cluster runs (benchmark.py --nodes) keep every node in node<i>/, the Server columns cover all nodes and
+  # "Node <i> <metric>" holds the GC summary of each node
+  NODE_GC: Final[List[str]] = ["pause count", "pause total (ms)", "pause p99 (ms)", "pause max (ms)",
+                               "heap after GC mean (MB)", "allocation rate mean (MB/s)"]
+
+  # client intervals lined up with the GC events of both JVMs by wall clock time
+  GC_CORRELATION: Final[List[str]] = [e[0].upper() + e[1:] for e in gccorrelation.SUMMARY_NAMES]
+
+  THROUGHPUT_CV: Final[str] = "Op rate CV in steady state (%)"
+  LATENCY_99_CV: Final[str] = "Latency 99th percentile CV in steady state (%)"
+  STABILITY: Final[List[str]] = [THROUGHPUT_CV, LATENCY_99_CV]
+  # last row of convergence.csv, written by benchmark.py --converge
+  MEASURED_TIME: Final[str] = "Measured time (s)"
+  CONVERGENCE: Final[List[str]] = [MEASURED_TIME] + [e + " CI half-width (%)" for e in convergence.METRICS.values()]
+  # phases written by benchmark.py, server GC and resource samples are limited to the measured phase when it is known
+  WARMUP_TIME: Final[str] = "Warmup time (s)"
+  WARMUP_OP_RATE: Final[str] = "Warmup op rate in last interval (op/s)"
+  WARMUP: Final[List[str]] = [WARMUP_TIME, WARMUP_OP_RATE]
+
+  MAX_SUSTAINABLE_RATE: Final[str] = "Max sustainable op rate at p99 SLO (op/s)"
+  SEARCH_SLO_P99: Final[str] = "Search p99 SLO (ms)"
+  SEARCH: Final[List[str]] = [MAX_SUSTAINABLE_RATE, SEARCH_SLO_P99]
+  # columns of search.csv written by benchmark.py --search, kept as series prefixed with "search "
+  SEARCH_COLUMNS: Final[List[str]] = ["target", "Op rate", "Latency 99th percentile", "passed"]
+
+  workload_columns: Final[List[str]] = [OP_RATE, ROW_RATE, LATENCY_MEAN, LATENCY_MEDIAN, LATENCY_95, LATENCY_99, LATENCY_999, LATENCY_MAX, TOTAL_GC_MINOR_COUNT, TOTAL_GC_MAJOR_COUNT]
+  column_names: Final[List[str]] = workload_columns + HDR + SERVER_PERF + STABILITY + CONVERGENCE + WARMUP + SEARCH + SERVER_GC + CLIENT_GC + GC_CORRELATION + SERVER_RESOURCES + CLIENT_RESOURCES + SERVER_JFR + ORCHESTRATOR
   types: Dict[str, str] = {
     OP_RATE: "float64",
     ROW_RATE: "float64",
@@ -41,11 +98,26 @@ class ReportVars:
     TOTAL_GC_MINOR_COUNT: "float64",
     TOTAL_GC_MAJOR_COUNT: "float64"
   }
+  types.update({e: "float64" for e in HDR + SERVER_PERF + STABILITY + CONVERGENCE + WARMUP + SEARCH + SERVER_GC + CLIENT_GC + GC_CORRELATION + SERVER_RESOURCES + CLIENT_RESOURCES + SERVER_JFR + ORCHESTRATOR})
+
+  THREADS: Final[str] = "threads"
+  WORKLOAD: Final[str] = "workload"
+  WORKLOAD_FINGERPRINT: Final[str] = "workload fingerprint"
+  # runs of a tag with different workloads are reported separately in <tag>/workload.<name>/
+  WORKLOAD_DIR_PREFIX: Final[str] = "workload."
+  HDR_KIND: Final[str] = "hdr kind"
+  SERVER_JDK: Final[str] = "server jdk"
+  DURATION: Final[str] = "duration"
 
   base_dir: Final[str] = os.path.join(os.path.dirname(os.path.realpath(__file__)), "results")
-  threads: int = 0
-  duration: int = 0
+  # bump whenever parse_run changes so that the warehouse gets rebuilt
+  parser_version: Final[int] = 15
+  # fraction of the intervals at the start of a run that is not considered steady state
+  steady_state_skip: Final[float] = 0.2
   data: Dict[str, pd.DataFrame] = dict()
+  metrics: Dict[str, Dict[str, Dict[str, float]]] = dict()
+  attributes: Dict[str, Dict[str, Dict[str, str]]] = dict()
+  series: Dict[str, Dict[str, Dict[str, np.ndarray]]] = dict()
 
 ReportVars()
 
@@ -64,23 +136,184 @@ def format_columns(df) -> pd.DataFrame:
   df[ReportVars.ROW_RATE] = df[ReportVars.ROW_RATE].astype(float).map("{: .0f}".format)
   return df
 
+def format_float_columns(df) -> pd.DataFrame:
+  for e in df.columns:
+    df[e] = df[e].astype(float).map(("{: .0f}" if e.endswith("count") else "{: .2f}").format)
+  return df
+
 def find_tags() -> List[str]:
   return next(os.walk(ReportVars.base_dir))[1]
 
 def find_runs(tag: str) -> List[str]:
-  return next(os.walk(os.path.join(ReportVars.base_dir, tag)))[1]
-
-def get_dataframe(tag: str):
-  if not has_key(ReportVars.data, tag):
-    df = pd.DataFrame(columns=ReportVars.column_names)
-    df = df.astype(dtype = ReportVars.types)
-    df.name = tag
-    ReportVars.data[tag] = df
-  return ReportVars.data[tag]
-
-def process_run(tag: str, run: str) -> None:
-  df: pd.DataFrame = get_dataframe(tag)
-  new_row = {
+  runs = [e for e in next(os.walk(os.path.join(ReportVars.base_dir, tag)))[1] if not e.startswith(ReportVars.WORKLOAD_DIR_PREFIX)]
+  # runs aborted by the supervisor of benchmark.py measured a dying or hung component
+  failed = sorted(e for e in runs if supervisor.is_failed(os.path.join(ReportVars.base_dir, tag, e)))
+  if len(failed) > 0:
+    print(tag + ": skipping failed runs " + ", ".join(failed))
+  return [e for e in runs if e not in failed]
+
+def build_dataframe(tag: str, rows: List[Dict[str, float]]) -> pd.DataFrame:
+  nodes = sorted(set(e for row in rows for e in row if e.startswith("Node ")))
+  df = pd.DataFrame.from_records(rows, columns=ReportVars.column_names + nodes)
+  df = df.astype(dtype = dict(ReportVars.types, **{e: "float64" for e in nodes}))
+  df.name = tag
+  ReportVars.data[tag] = df
+  return df
+
+def coefficient_of_variation(values: np.ndarray) -> float:
+  values = values[int(len(values) * ReportVars.steady_state_skip):]
+  if len(values) < 2 or np.mean(values) == 0:
+    return float("nan")
+  return float(np.std(values, ddof=1) / np.mean(values) * 100)
+
+def parse_run(run: str) -> Tuple[Dict[str, float], Dict[str, str], Dict[str, bytes]]:
+  # columns missing from new_row (e.g. no server.gc, or no client.log for a saturation search) become NaN
+  new_row: Dict[str, float] = dict()
+  attributes: Dict[str, str] = dict()
+  series: Dict[str, bytes] = dict()
+  parse_configuration(run, attributes)
+  if os.path.exists(os.path.join(run, "client.log")):
+    parse_client_log(run, new_row, attributes, series)
+  client = None
+  if os.path.exists(os.path.join(run, "client.gc")):
+    client = gclog.parse_gc_log(os.path.join(run, "client.gc"))
+    new_row[ReportVars.TOTAL_GC_MINOR_COUNT] = client.minor_count
+    new_row[ReportVars.TOTAL_GC_MAJOR_COUNT] = client.major_count
+    for (name, value) in gclog.summarize(client).items():
+      new_row["Client " + name] = value
+
+  phases = warmup.read_phases(os.path.join(run, warmup.PHASES_FILE)) if os.path.exists(os.path.join(run, warmup.PHASES_FILE)) else dict()
+  if warmup.WARMUP in phases:
+    parse_warmup(run, phases[warmup.WARMUP], new_row)
+
+  nodes = warehouse.node_dirs(run)
+  server_dirs = [os.path.join(run, e) for e in nodes] if len(nodes) > 0 else [run]
+  servers = list()
+  for (i, path) in enumerate(server_dirs):
+    if not os.path.exists(os.path.join(path, "server.gc")):
+      continue
+    stats = os.path.join(path, "server.stats.gc")
+    servers.append(gclog.parse_gc_log(os.path.join(path, "server.gc"), stats if os.path.exists(stats) else None))
+    if warmup.MEASURED in phases:
+      # boot, prepopulation, warmup and shutdown are left out
+      servers[-1] = gclog.trim(servers[-1], *phases[warmup.MEASURED])
+    if len(nodes) > 0:
+      for (name, value) in gclog.summarize(servers[-1]).items():
+        new_row["Node " + str(i + 1) + " " + name] = value
+  if len(servers) > 0:
+    for (name, value) in gclog.summarize_all(servers).items():
+      new_row["Server " + name] = value
+
+  if "time" in series:
+    parse_gc_correlation(series, servers, client, phases[warmup.MEASURED][1] if warmup.MEASURED in phases else float("nan"), new_row)
+
+  if os.path.exists(os.path.join(run, "search.csv")):
+    parse_search(run, new_row, series)
+
+  if os.path.exists(os.path.join(run, "convergence.csv")):
+    parse_convergence(run, new_row)
+
+  if os.path.exists(os.path.join(run, "client.hdr")):
+    parse_hdr(run, new_row, attributes, series)
+
+  perfs = [perfstat.parse_perf_csv(os.path.join(e, "server.perf.csv")) for e in server_dirs if os.path.exists(os.path.join(e, "server.perf.csv"))]
+  if len(perfs) > 0:
+    perf = perfstat.merge(perfs)
+    for (name, value) in perfstat.summarize(perf).items():
+      new_row["Server " + name] = value
+    for (name, value) in perf.totals.items():
+      new_row["Server perf " + name] = value
+    if len(perf.time) > 0:
+      series["perf time"] = perf.time.tobytes()
+      series["perf IPC"] = perfstat.interval_ratio(perf, "IPC").tobytes()
+
+  if os.path.exists(os.path.join(run, "resources.bin")):
+    samples = sampler.read_samples(os.path.join(run, "resources.bin"))
+    if warmup.MEASURED in phases:
+      (start, end) = phases[warmup.MEASURED]
+      samples = samples[(samples["time"] >= start) & (samples["time"] <= end)]
+    for (side, name) in sampler.SIDES.items():
+      for (metric, value) in sampler.summarize(samples, side).items():
+        new_row[name + " " + metric] = value
+
+  recordings = [os.path.join(e, "server.jfr") for e in server_dirs if os.path.exists(os.path.join(e, "server.jfr"))]
+  if len(recordings) > 0:
+    parse_jfr(recordings, attributes.get(ReportVars.SERVER_JDK, ""), new_row, attributes)
+
+  if os.path.exists(os.path.join(run, "orchestrator.cpu")):
+    parse_orchestrator(run, new_row)
+
+  return new_row, attributes, series
+
+def parse_configuration(run: str, attributes: Dict[str, str]) -> None:
+  # runs from before workloads could be chosen did not record one and always ran the default workload
+  default = workload.load("default")
+  attributes[ReportVars.WORKLOAD] = default["name"]
+  attributes[ReportVars.WORKLOAD_FINGERPRINT] = workload.fingerprint(default)
+  if not os.path.exists(os.path.join(run, "configuration")):
+    return
+  with open(os.path.join(run, "configuration"), "r", errors="replace") as readFile:
+    lines = [e.rstrip("\n") for e in readFile]
+  for line in lines:
+    if line.startswith("Path to server jdk: "):
+      attributes[ReportVars.SERVER_JDK] = line[len("Path to server jdk: "):]
+  if not any(e.startswith("Workload fingerprint: ") for e in lines):
+    return
+  for line in lines:
+    if line.startswith("Workload: "):
+      attributes[ReportVars.WORKLOAD] = line[len("Workload: "):]
+    elif line.startswith("Workload fingerprint: "):
+      attributes[ReportVars.WORKLOAD_FINGERPRINT] = line[len("Workload fingerprint: "):]
+
+def parse_jfr(recordings: List[str], jdk: str, new_row: Dict[str, float], attributes: Dict[str, str]) -> None:
+  tool = jfrlog.find_tool(jdk)
+  if tool is None:
+    print("No jfr tool in the server JDK, JAVA_HOME or PATH, skipping " + ", ".join(recordings) + " (parse again with --rebuild)")
+    return
+  profile = jfrlog.merge([jfrlog.read_profile(tool, e) for e in recordings])
+  for (name, value) in profile.values.items():
+    new_row["Server JFR " + name] = value
+  for (table, entries) in profile.top().items():
+    attributes["jfr " + table] = json.dumps(entries)
+
+def describe_profile(tag: str, runs: List[str]) -> str:
+  # top entries over the recordings of all runs, as mean per run and share of the recorded total
+  recorded = [run for run in runs if "jfr hot methods" in ReportVars.attributes[tag].get(run, dict())]
+  text = ""
+  for table in jfrlog.TABLES:
+    entries: Dict[str, float] = dict()
+    for run in recorded:
+      for (key, value) in json.loads(ReportVars.attributes[tag][run].get("jfr " + table, "{}")).items():
+        entries[key] = entries.get(key, 0.0) + value
+    if len(entries) == 0:
+      continue
+    total = sum(ReportVars.metrics[tag].get(run, dict()).get("Server JFR " + e, 0.0) for run in recorded for e in jfrlog.TABLE_TOTALS[table])
+    top = sorted(entries.items(), key=lambda e: -e[1])[:ReportVars.JFR_TOP]
+    df = pd.DataFrame({"mean per run": [value / len(recorded) for (_, value) in top],
+                       "share (%)": [value / total * 100 if total > 0 else float("nan") for (_, value) in top]},
+                      index=[html.escape(key) for (key, _) in top])
+    text += "<h3>" + table[0].upper() + table[1:] + "</h3>"
+    text += markdown.markdown(df.to_markdown(floatfmt=".2f"), extensions=['markdown.extensions.tables'])
+  return text
+
+def parse_orchestrator(run: str, new_row: Dict[str, float]) -> None:
+  values: Dict[str, float] = dict()
+  with open(os.path.join(run, "orchestrator.cpu"), "r") as readFile:
+    for line in readFile:
+      (key, _, value) = line.partition(":")
+      try:
+        values[key.strip()] = float(value)
+      except ValueError:
+        continue
+  own = values.get(ReportVars.ORCHESTRATOR_CPU, float("nan"))
+  helpers = values.get(ReportVars.HELPER_CPU, float("nan"))
+  client = values.get("Client CPU (s)", float("nan"))
+  new_row[ReportVars.ORCHESTRATOR_CPU] = own
+  new_row[ReportVars.HELPER_CPU] = helpers
+  new_row[ReportVars.ORCHESTRATOR_SHARE] = (own + helpers) / client * 100 if client > 0 else float("nan")
+
+def parse_client_log(run: str, new_row: Dict[str, float], attributes: Dict[str, str], series: Dict[str, bytes]) -> None:
+  new_row.update({
     ReportVars.OP_RATE: 0,
     ReportVars.ROW_RATE: 0,
     ReportVars.LATENCY_MEAN: 0.0,
@@ -91,16 +324,17 @@ def process_run(tag: str, run: str) -> None:
     ReportVars.LATENCY_MAX: 0.0,
     ReportVars.TOTAL_GC_MINOR_COUNT: 0,
     ReportVars.TOTAL_GC_MAJOR_COUNT: 0
-  }
-  global duration, threads
+  })
   with open(os.path.join(run, "client.log"), 'r') as readFile:
     float_check = [ReportVars.LATENCY_MEAN, ReportVars.LATENCY_MEDIAN, ReportVars.LATENCY_95, ReportVars.LATENCY_99, ReportVars.LATENCY_999, ReportVars.LATENCY_MAX]
+    summarized = False
     for line in readFile:
       if "threads" in line:
-        ReportVars.threads = int(line.split("threads")[0].split("with ")[1])
-        ReportVars.duration = int(line.split("threads")[1].split("minutes")[0])
+        attributes[ReportVars.THREADS] = str(int(line.split("threads")[0].split("with ")[1]))
+        attributes[ReportVars.DURATION] = str(int(line.split("threads")[1].split("minutes")[0]))
         continue
       if "Op rate" in line:
+        summarized = True
         new_row[ReportVars.OP_RATE] = int(unicodedata.normalize("NFKD", line).split(':')[1].split('op/s')[0].replace(" ", "").replace(",", ""))
         continue
       if "Row rate" in line:
@@ -113,65 +347,490 @@ def process_run(tag: str, run: str) -> None:
           )
           continue
 
-    count_minor = 0
-    count_major = 0
-    with open(os.path.join(run, "client.gc"), 'r') as readFile:
-      for line in readFile:
-        if "[gc,start" in line:
-          if "Major" in line:
-            count_major += 1
-          elif "Minor" in line:
-            count_minor += 1
-    new_row[ReportVars.TOTAL_GC_MINOR_COUNT] = count_minor
-    new_row[ReportVars.TOTAL_GC_MAJOR_COUNT] = count_major
+  intervals = {name: np.asarray(values, dtype=np.float64) for (name, values) in stresslog.read_intervals(os.path.join(run, "client.log")).items()}
+  if not summarized and len(intervals["op/s"]) > 0:
+    # a client stopped by --converge may not get to print its summary, only what the intervals determine exactly
+    # is filled in, the percentiles come from client.hdr
+    new_row[ReportVars.OP_RATE] = float(np.mean(intervals["op/s"]))
+    new_row[ReportVars.ROW_RATE] = float(np.mean(intervals["row/s"]))
+    new_row[ReportVars.LATENCY_MEAN] = float(np.sum(intervals["mean"] * intervals["op/s"]) / np.sum(intervals["op/s"])) if np.sum(intervals["op/s"]) > 0 else float("nan")
+    new_row[ReportVars.LATENCY_MAX] = float(np.max(intervals["max"]))
+    for name in [ReportVars.LATENCY_MEDIAN, ReportVars.LATENCY_95, ReportVars.LATENCY_99, ReportVars.LATENCY_999]:
+      new_row[name] = float("nan")
+  new_row[ReportVars.THROUGHPUT_CV] = coefficient_of_variation(intervals["op/s"])
+  new_row[ReportVars.LATENCY_99_CV] = coefficient_of_variation(intervals[".99"])
+  series.update({name: values.tobytes() for (name, values) in intervals.items()})
 
-  df.loc[len(df)] = new_row
+def has_wall_time(log: gclog.GCLog) -> bool:
+  return not np.isnan(log.pause_time).all() or not np.isnan(log.heap_time).all()
 
-def produce_violin_plot(df, tags, path):
+def parse_gc_correlation(series: Dict[str, bytes], servers: List[gclog.GCLog], client: Optional[gclog.GCLog], measured_end: float,
+                         new_row: Dict[str, float]) -> None:
+  # the events are kept as series too, for the timeline plot of every run
+  intervals = {name: np.frombuffer(series[name], dtype=np.float64) for name in ["time", stresslog.WALL] + list(gccorrelation.LATENCIES)}
+  (start, end) = gccorrelation.interval_bounds(intervals["time"], intervals[stresslog.WALL], measured_end)
+  if len(start) == 0:
+    return
+  events: Dict[str, Tuple[np.ndarray, np.ndarray]] = dict()
+  if len(servers) > 0 and any(has_wall_time(e) for e in servers):
+    server = gclog.merge(servers)
+    events["server pause"] = gccorrelation.events(server.pause_time, server.pause_ms)
+    events["server concurrent"] = gccorrelation.events(server.concurrent_time, server.concurrent_ms)
+  if client is not None and has_wall_time(client):
+    events["client pause"] = gccorrelation.events(client.pause_time, client.pause_ms)
+  summary = gccorrelation.correlate(start, end, intervals, {e: events[e + " pause"] for e in gccorrelation.SIDES if e + " pause" in events},
+                                    events.get("server concurrent", (np.empty(0), np.empty(0))))
+  for (name, value) in summary.items():
+    new_row[name[0].upper() + name[1:]] = value
+  series["gc interval start"] = start.tobytes()
+  series["gc interval end"] = end.tobytes()
+  for (name, (event_start, event_end)) in events.items():
+    series["gc " + name + " start"] = event_start.tobytes()
+    series["gc " + name + " end"] = event_end.tobytes()
+
+def parse_hdr(run: str, new_row: Dict[str, float], attributes: Dict[str, str], series: Dict[str, bytes]) -> None:
+  log = hdrlog.read_log(os.path.join(run, "client.hdr"))
+  if log.layout is None:
+    return
+  for (name, value) in zip(ReportVars.HDR, hdrlog.percentiles(log.layout, log.counts, ReportVars.HDR_PERCENTILES)):
+    new_row[name] = float(value)
+  attributes[ReportVars.HDR_KIND] = log.kind
+  # kept so that the runs of a tag can be merged into one distribution
+  series["hdr layout"] = np.asarray([log.layout.digits, log.layout.lowest, log.kind == hdrlog.RESPONSE_TIME], dtype=np.float64).tobytes()
+  series["hdr counts"] = log.counts.astype(np.float64).tobytes()
+  series["hdr time"] = log.time.tobytes()
+  for (q, values) in log.intervals.items():
+    series["hdr " + "{:g}".format(q)] = values.tobytes()
+
+def merge_hdr(series: Dict[str, Dict[str, np.ndarray]]) -> Tuple[Optional[hdrlog.Layout], np.ndarray]:
+  layout: Optional[hdrlog.Layout] = None
+  counts = np.zeros(0)
+  for run in series.values():
+    if "hdr counts" not in run:
+      continue
+    run_layout = hdrlog.Layout(int(run["hdr layout"][0]), int(run["hdr layout"][1]))
+    if layout is not None and layout.key() != run_layout.key():
+      print("Skipping HDR histograms with different precision")
+      continue
+    layout = run_layout
+    counts = hdrlog.add(counts, run["hdr counts"])
+  return layout, counts
+
+def parse_warmup(run: str, phase: Tuple[float, float], new_row: Dict[str, float]) -> None:
+  new_row[ReportVars.WARMUP_TIME] = phase[1] - phase[0]
+  if os.path.exists(os.path.join(run, warmup.WARMUP, "client.log")):
+    intervals = stresslog.read_intervals(os.path.join(run, warmup.WARMUP, "client.log"))
+    if len(intervals["op/s"]) > 0:
+      new_row[ReportVars.WARMUP_OP_RATE] = intervals["op/s"][-1]
+
+def parse_convergence(run: str, new_row: Dict[str, float]) -> None:
+  history = pd.read_csv(os.path.join(run, "convergence.csv"))
+  if len(history) == 0:
+    return
+  last = history.iloc[-1]
+  new_row[ReportVars.MEASURED_TIME] = float(last["time"])
+  for (name, column) in zip(ReportVars.CONVERGENCE[1:], convergence.METRICS.values()):
+    new_row[name] = float(last[column + " CI (%)"])
+
+def parse_search(run: str, new_row: Dict[str, float], series: Dict[str, bytes]) -> None:
+  with open(os.path.join(run, "search.csv"), "r") as readFile:
+    header = readFile.readline().strip().split(",")
+    rows = [[float(e) for e in line.strip().split(",")] for line in readFile if len(line.strip()) > 0]
+  probes = {name: np.asarray([row[header.index(name)] for row in rows], dtype=np.float64) for name in ReportVars.SEARCH_COLUMNS + ["SLO p99"]}
+  passed = probes["passed"] == 1.0
+  new_row[ReportVars.MAX_SUSTAINABLE_RATE] = float(np.max(probes["Op rate"][passed])) if passed.any() else float("nan")
+  new_row[ReportVars.SEARCH_SLO_P99] = float(probes["SLO p99"][0]) if len(rows) > 0 else float("nan")
+  for name in ReportVars.SEARCH_COLUMNS:
+    series["search " + name] = probes[name].tobytes()
+
+def parse_run_record(tag: str, run: str, signature: str) -> warehouse.RunRecord:
+  new_row, attributes, series = parse_run(os.path.join(ReportVars.base_dir, tag, run))
+  return (tag, run, signature, new_row, attributes, series)
+
+def sync_tags(conn, tag_runs: Dict[str, List[str]], jobs: int) -> None:
+  work: List[Tuple[str, str, str]] = list()
+  for (tag, runs) in tag_runs.items():
+    stale = warehouse.stale_runs(conn, tag, runs, ReportVars.base_dir)
+    if len(stale) > 0:
+      print(tag + ": parsing " + str(len(stale)) + " new or changed runs out of " + str(len(runs)))
+    work.extend([(tag, run, signature) for (run, signature) in stale])
+  if jobs > 1 and len(work) > 1:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+      records = list(executor.map(parse_run_record, *zip(*work), chunksize=max(1, int(len(work) / (jobs * 4)))))
+  else:
+    records = [parse_run_record(tag, run, signature) for (tag, run, signature) in work]
+  warehouse.store_runs(conn, records)
+
+def load_tag(conn, tag: str, runs: List[str]) -> pd.DataFrame:
+  metrics = warehouse.load_metrics(conn, tag)
+  attributes = warehouse.load_attributes(conn, tag)
+  ReportVars.metrics[tag] = metrics
+  ReportVars.attributes[tag] = attributes
+  ReportVars.series[tag] = {run: {name: np.frombuffer(data, dtype=np.float64) for (name, data) in series.items()}
+                            for (run, series) in warehouse.load_series(conn, tag).items()}
+  return build_dataframe(tag, [metrics.get(run, dict()) for run in runs])
+
+def workload_groups(tag: str, runs: List[str]) -> Dict[str, Tuple[str, List[str]]]:
+  # fingerprint -> (workload name, runs), runs of different workloads must never be pooled
+  groups: Dict[str, Tuple[str, List[str]]] = dict()
+  for run in runs:
+    attributes = ReportVars.attributes[tag].get(run, dict())
+    key = attributes.get(ReportVars.WORKLOAD_FINGERPRINT, "")
+    groups.setdefault(key, (attributes.get(ReportVars.WORKLOAD, "unknown"), list()))[1].append(run)
+  return groups
+
+def workload_dir(name: str, key: str) -> str:
+  return ReportVars.WORKLOAD_DIR_PREFIX + re.sub(r"[^\w.-]", "_", name) + "-" + key
+
+def write_workload_index(tag: str, groups: Dict[str, Tuple[str, List[str]]]) -> None:
+  with open(os.path.join(ReportVars.base_dir, tag, "summary.html"), "w") as writeFile:
+    writeFile.write("<h2>"+tag+"</h2>")
+    writeFile.write("The runs of this tag used different workloads and are reported separately<br/><ul>")
+    for (key, (name, runs)) in groups.items():
+      writeFile.write("<li><a href=\"" + workload_dir(name, key) + "/summary.html\">" + name + " (" + key + ")</a>: runs " +
+                      ", ".join(sorted(runs, key=lambda e: int(e) if e.isdigit() else 0)) + "</li>")
+    writeFile.write("</ul>")
+
+def tag_attribute(tag: str, runs: List[str], name: str) -> str:
+  value = ""
+  for run in runs:
+    value = ReportVars.attributes[tag].get(run, dict()).get(name, value)
+  return value
+
+def save_plot(path: str, name: str, draw: Callable[[plt.Axes], None]) -> str:
+    # one figure with a single axes that draw fills, written to <name>.png
     fig, ax = plt.subplots()
+    draw(ax)
+    plt.tight_layout()
+    fig.savefig(os.path.join(path, name))
+    plt.close(fig)
+    return name + ".png"
+
+def produce_violin_plot(df, tags, path):
     sub_df = df[tags]
-    sns.violinplot(data=sub_df, orient='h', ax=ax)
-    ax.set_yticklabels([textwrap.fill(e, 10) for e in list(sub_df.columns)])
+
+    def draw(ax: plt.Axes) -> None:
+      sns.violinplot(data=sub_df, orient='h', ax=ax)
+      ax.set_yticklabels([textwrap.fill(e, 10) for e in list(sub_df.columns)])
+    return save_plot(path, "".join(e.replace(".", "_").replace("/", "_") for e in tags), draw)
+
+def produce_timeseries_plot(series: Dict[str, Dict[str, np.ndarray]], column: str, label: str, path: str, time: str = "time"):
+    def draw(ax: plt.Axes) -> None:
+      for run in sorted(series, key=lambda e: int(e) if e.isdigit() else e):
+        if len(series[run].get(column, [])) > 0:
+          ax.plot(series[run][time], series[run][column], linewidth=0.8, label=run)
+      ax.set_xlabel("Time (s)")
+      ax.set_ylabel(label)
+      if len(series) <= 10:
+        ax.legend(title="Run", fontsize="small")
+    return save_plot(path, label.replace(".", "_").replace("/", "_") + " over time", draw)
+
+def produce_gc_timeline(run: str, series: Dict[str, np.ndarray], path: str):
+    # client latency per interval above the pauses of both JVMs, seconds since the first interval started
+    origin = series["gc interval start"][0]
+    fig, axes = plt.subplots(3, 1, sharex=True, figsize=(10, 6), gridspec_kw={"height_ratios": [3, 1, 1]})
+    for (column, name) in gccorrelation.LATENCIES.items():
+      line = axes[0].step(series["gc interval end"] - origin, series[column], where="pre", linewidth=0.8, label=name)[0]
+      spiked = gccorrelation.spikes(series[column])
+      axes[0].plot(series["gc interval end"][spiked] - origin, series[column][spiked], "o", markersize=3, color=line.get_color())
+    axes[0].set_yscale("log")
+    axes[0].set_ylabel("Latency (ms)")
+    axes[0].legend(title="Interval, spikes marked", fontsize="small")
+    for (ax, side) in zip(axes[1:], gccorrelation.SIDES):
+      if "gc " + side + " concurrent start" in series:
+        starts = series["gc " + side + " concurrent start"] - origin
+        ends = series["gc " + side + " concurrent end"] - origin
+        ax.broken_barh(list(zip(starts, ends - starts)), (0, 1), transform=ax.get_xaxis_transform(), color="tab:green", alpha=0.2, label="concurrent")
+      if "gc " + side + " pause start" in series:
+        starts = series["gc " + side + " pause start"]
+        ax.vlines(starts - origin, 0, (series["gc " + side + " pause end"] - starts) * 1000, color="tab:red", linewidth=1, label="pause")
+      else:
+        ax.text(0.5, 0.5, "no wall clock GC log", transform=ax.transAxes, ha="center", va="center", fontsize="small")
+      ax.set_ylabel(side.capitalize() + " GC (ms)")
+    axes[-1].set_xlabel("Time (s)")
     plt.tight_layout()
-    name = ""
-    for e in tags:
-      name += e.replace(".", "_").replace("/", "_")
-    file = os.path.join(path, name)
-    ax.figure.savefig(file)
+    name = "GC timeline run " + run
+    fig.savefig(os.path.join(path, name))
+    plt.close(fig)
     return name + ".png"
 
+def produce_search_plot(series: Dict[str, Dict[str, np.ndarray]], slo_p99: float, path: str):
+    def draw(ax: plt.Axes) -> None:
+      for run in sorted(series, key=lambda e: int(e) if e.isdigit() else e):
+        if len(series[run].get("search Op rate", [])) > 0:
+          order = np.argsort(series[run]["search Op rate"])
+          ax.plot(series[run]["search Op rate"][order], series[run]["search Latency 99th percentile"][order],
+                  marker="o", markersize=3, linewidth=0.8, label=run)
+      ax.axhline(slo_p99, color="red", linestyle="--", linewidth=0.8, label="SLO")
+      ax.set_xlabel(ReportVars.OP_RATE)
+      ax.set_ylabel(ReportVars.LATENCY_99)
+      ax.set_yscale("log")
+      if len(series) <= 10:
+        ax.legend(title="Run", fontsize="small")
+    return save_plot(path, "Saturation search", draw)
+
+def produce_percentile_plot(series: Dict[str, Dict[str, np.ndarray]], layout: hdrlog.Layout, counts: np.ndarray, path: str):
+    # x is 1 / (1 - percentile) on a log scale so that the tail gets as much room as the median
+    qs = 100 - 100 / np.logspace(0, 5, 200)
+
+    def draw(ax: plt.Axes) -> None:
+      for run in sorted(series, key=lambda e: int(e) if e.isdigit() else e):
+        if "hdr counts" in series[run]:
+          ax.plot(100 / (100 - qs), hdrlog.percentiles(layout, series[run]["hdr counts"], list(qs)), linewidth=0.6, alpha=0.6, label=run)
+      ax.plot(100 / (100 - qs), hdrlog.percentiles(layout, counts, list(qs)), color="black", linewidth=1.5, label="merged")
+      ax.set_xscale("log")
+      ticks = [0.0, 90.0, 99.0, 99.9, 99.99, 99.999]
+      ax.set_xticks([100 / (100 - e) for e in ticks])
+      ax.set_xticklabels(["{:g}%".format(e) for e in ticks])
+      ax.set_xlabel("Percentile")
+      ax.set_ylabel("Latency (ms)")
+      if len(series) <= 10:
+        ax.legend(title="Run", fontsize="small")
+    return save_plot(path, "Latency by percentile", draw)
+
+def describe_distribution(layout: hdrlog.Layout, counts: np.ndarray) -> pd.DataFrame:
+  values = hdrlog.percentiles(layout, counts, ReportVars.HDR_AGGREGATE_PERCENTILES)
+  names = [("max" if e == 100.0 else "p" + "{:g}".format(e)) for e in ReportVars.HDR_AGGREGATE_PERCENTILES]
+  df = pd.DataFrame([["{:.3f}".format(e) for e in values] + ["{:.3f}".format(hdrlog.mean(layout, counts)), "{:.0f}".format(np.sum(counts))]],
+                    columns=names + ["mean", "count"], index=["Latency (ms)"])
+  return df
+
+def describe_nodes(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+  nodes = sorted(set(int(e.split(" ")[1]) for e in df.columns if e.startswith("Node ")))
+  if len(nodes) == 0:
+    return None
+  rows = [[df["Node " + str(i) + " " + e].median() if "Node " + str(i) + " " + e in df.columns else float("nan")
+           for e in ReportVars.NODE_GC] for i in nodes]
+  return format_float_columns(pd.DataFrame(rows, columns=ReportVars.NODE_GC, index=["node" + str(i) for i in nodes]))
+
+def describe_table(df: pd.DataFrame, columns: List[str], formatter=format_columns) -> str:
+  return markdown.markdown(formatter(df[columns].describe()).to_markdown(), extensions=['markdown.extensions.tables'])
+
+def render_tag(tag: str, path: str, df: pd.DataFrame, threads: str, duration: str, workload_name: str, series: Dict[str, Dict[str, np.ndarray]],
+               profile: str) -> List[str]:
+  files = list()
+  for e in [[ReportVars.LATENCY_MEAN, ReportVars.LATENCY_MEDIAN],[ReportVars.LATENCY_95, ReportVars.LATENCY_99, ReportVars.LATENCY_999], [ReportVars.LATENCY_MAX], [ReportVars.OP_RATE], [ReportVars.ROW_RATE]]:
+    if df[e].notna().any().any():
+      files.append(produce_violin_plot(df, e, path))
+  for e in [[ReportVars.SERVER_PERF[0]], [c for c in ReportVars.SERVER_PERF[1:] if df[c].notna().any()]]:
+    if len(e) > 0 and df[e].notna().any().any():
+      files.append(produce_violin_plot(df, e, path))
+  for side in ["Server ", "Client "]:
+    for e in [[side + "pause p50 (ms)", side + "pause p99 (ms)", side + "pause max (ms)"], [side + "heap after GC mean (MB)", side + "heap before GC max (MB)"]]:
+      if df[e].notna().any().any():
+        files.append(produce_violin_plot(df, e, path))
+  if any("op/s" in e for e in series.values()):
+    files.append(produce_timeseries_plot(series, "op/s", ReportVars.OP_RATE, path))
+    files.append(produce_timeseries_plot(series, ".99", ReportVars.LATENCY_99, path))
+  (hdr_layout, hdr_counts) = merge_hdr(series)
+  if hdr_layout is not None:
+    files.append(produce_percentile_plot(series, hdr_layout, hdr_counts, path))
+    files.append(produce_timeseries_plot(series, "hdr 99", "Interval p99 latency (HDR, ms)", path, "hdr time"))
+  if any(len(e.get("perf IPC", [])) > 0 for e in series.values()):
+    files.append(produce_timeseries_plot(series, "perf IPC", "Server IPC", path, "perf time"))
+  searched = df[ReportVars.SEARCH_SLO_P99].notna().any()
+  if searched:
+    files.append(produce_search_plot(series, float(df[ReportVars.SEARCH_SLO_P99].max()), path))
+  timelines = [produce_gc_timeline(run, series[run], path) for run in sorted(series, key=lambda e: int(e) if e.isdigit() else e)
+               if len(series[run].get("gc interval start", [])) > 0]
+  with open(os.path.join(path, "summary.html"), "w") as writeFile:
+    writeFile.write("<h2>"+tag+"</h2>")
+    writeFile.write(describe_table(df, ReportVars.workload_columns))
+    if hdr_layout is not None:
+      writeFile.write("<h2>"+"Latency distribution"+"</h2>")
+      writeFile.write("Percentiles of the HDR histograms of all runs merged into one distribution (" +
+                      ("response time" if any(e.get("hdr layout", [0, 0, 0])[2] == 1 for e in series.values()) else "service time") + ")<br/>")
+      writeFile.write(markdown.markdown(describe_distribution(hdr_layout, hdr_counts).to_markdown(), extensions=['markdown.extensions.tables']))
+      writeFile.write("Per run<br/>")
+      writeFile.write(describe_table(df, ReportVars.HDR, format_float_columns))
+    if df[ReportVars.SERVER_PERF].notna().any().any():
+      writeFile.write("<h2>"+"Server perf counters"+"</h2>")
+      writeFile.write(describe_table(df, [e for e in ReportVars.SERVER_PERF if df[e].notna().any()], format_float_columns))
+    writeFile.write("<h2>"+"Stability"+"</h2>")
+    writeFile.write("Coefficient of variation of the per-interval values, ignoring the first " + str(int(ReportVars.steady_state_skip * 100)) + "% of each run<br/>")
+    writeFile.write(describe_table(df, ReportVars.STABILITY, format_float_columns))
+    if df[ReportVars.WARMUP].notna().any().any():
+      writeFile.write("<h2>"+"Warmup"+"</h2>")
+      writeFile.write("Workload run before the measured one, its client logs are in warmup/ and it is left out of every other table<br/>")
+      writeFile.write(describe_table(df, ReportVars.WARMUP, format_float_columns))
+    if df[ReportVars.CONVERGENCE].notna().any().any():
+      writeFile.write("<h2>"+"Convergence"+"</h2>")
+      writeFile.write("Time measured until the 95% confidence intervals (batch means) of op rate and p99 latency were narrow enough, and their final half-width<br/>")
+      writeFile.write(describe_table(df, ReportVars.CONVERGENCE, format_float_columns))
+    if searched:
+      writeFile.write("<h2>"+"Saturation search"+"</h2>")
+      writeFile.write("Highest achieved op rate among probes whose p99 latency met the SLO<br/>")
+      writeFile.write(describe_table(df, ReportVars.SEARCH, format_float_columns))
+    writeFile.write("<hr/>")
+    writeFile.write("<h2>"+"Server GC"+"</h2>")
+    writeFile.write(describe_table(df, ReportVars.SERVER_GC, format_float_columns))
+    writeFile.write("<h2>"+"Client GC"+"</h2>")
+    writeFile.write(describe_table(df, ReportVars.CLIENT_GC, format_float_columns))
+    node_table = describe_nodes(df)
+    if node_table is not None:
+      writeFile.write("<h2>"+"Per-node server GC"+"</h2>")
+      writeFile.write("Median over runs, the Server GC tables above cover all nodes together<br/>")
+      writeFile.write(markdown.markdown(node_table.to_markdown(), extensions=['markdown.extensions.tables']))
+    if df[ReportVars.GC_CORRELATION].notna().any().any():
+      writeFile.write("<h2>"+"GC and latency spikes"+"</h2>")
+      writeFile.write("Client intervals whose p99 or max latency is more than " + "{:g}".format(gccorrelation.SPIKE_FACTOR) +
+                      " times the median interval of the run, and how many of them overlap a GC pause by wall clock time<br/>")
+      writeFile.write(describe_table(df, ReportVars.GC_CORRELATION, format_float_columns))
+      for e in timelines:
+        writeFile.write("<img src=\"" + e + "\" />")
+    if df[ReportVars.SERVER_RESOURCES + ReportVars.CLIENT_RESOURCES].notna().any().any():
+      writeFile.write("<hr/>")
+      writeFile.write("<h2>"+"Server resources"+"</h2>")
+      writeFile.write(describe_table(df, ReportVars.SERVER_RESOURCES, format_float_columns))
+      writeFile.write("<h2>"+"Client resources"+"</h2>")
+      writeFile.write(describe_table(df, ReportVars.CLIENT_RESOURCES, format_float_columns))
+    if df[ReportVars.SERVER_JFR].notna().any().any():
+      writeFile.write("<hr/>")
+      writeFile.write("<h2>"+"Server flight recordings"+"</h2>")
+      writeFile.write("Java Flight Recorder over the measured window, execution samples and allocation are sampled<br/>")
+      writeFile.write(describe_table(df, ReportVars.SERVER_JFR, format_float_columns))
+      writeFile.write(profile)
+    if df[ReportVars.ORCHESTRATOR].notna().any().any():
+      writeFile.write("<h2>"+"Orchestrator overhead"+"</h2>")
+      writeFile.write("CPU time of benchmark.py, nodetool, the sampler and log timestamping while the workload ran<br/>")
+      writeFile.write(describe_table(df, ReportVars.ORCHESTRATOR, format_float_columns))
+    writeFile.write("<hr/>")
+    writeFile.write("<h2>"+"Configuration"+"</h2>")
+    writeFile.write("Client threads: " + threads + "<br/>")
+    writeFile.write("Duration: " + duration + " minutes" +"<br/>")
+    writeFile.write("Workload: " + workload_name + "<br/>")
+    writeFile.write("<hr/>")
+    writeFile.write("<h2>"+"Plots"+"</h2>")
+    for e in files:
+      writeFile.write("<img src=\"" + e + "\" />")
+  return files + timelines
+
+
+def init():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--query", help="run SQL against the results warehouse instead of generating reports (e.g. \"SELECT tag, name, avg(value) FROM run_metrics GROUP BY tag, name\")")
+  parser.add_argument("--rebuild", help="discard the results warehouse and parse every run again", action='store_true')
+  parser.add_argument("--jobs", help="parse runs and render tags using N worker processes (default 1)", type=int, default=1)
+  parser.add_argument("--baseline", help="compare --candidates against this tag instead of generating reports, exits with 1 on regressions")
+  parser.add_argument("--candidates", help="tags to compare against --baseline", nargs="+")
+  parser.add_argument("--threshold", help="relative change in percent of a median that counts as a regression (default 5)", type=float, default=5.0)
+  parser.add_argument("--alpha", help="significance level of the Mann-Whitney U test (default 0.05)", type=float, default=0.05)
+  parser.add_argument("--resamples", help="bootstrap resamples for confidence intervals (default 10000)", type=int, default=10000)
+  return parser.parse_args()
+
+def query(sql: str) -> pd.DataFrame:
+  conn = warehouse.open_warehouse(ReportVars.base_dir, ReportVars.parser_version)
+  columns, rows = warehouse.query(conn, sql)
+  conn.close()
+  return pd.DataFrame.from_records(rows, columns=columns)
+
+def format_comparison(rows: List[Dict]) -> pd.DataFrame:
+  def interval(e) -> str:
+    return "[{:.2f}, {:.2f}]".format(*e)
+  df = pd.DataFrame.from_records(rows, columns=compare.COLUMNS)
+  for e in ["baseline median", "candidate median", "difference (%)"]:
+    df[e] = df[e].map("{: .2f}".format)
+  for e in ["baseline CI", "candidate CI", "difference CI (%)"]:
+    df[e] = df[e].map(interval)
+  df["p-value"] = df["p-value"].map("{:.4f}".format)
+  return df.set_index("metric")
+
+def compare_tags(conn, baseline: str, candidates: List[str], threshold: float, alpha: float, resamples: int) -> bool:
+  # returns True if any candidate regressed
+  tag_runs: Dict[str, List[str]] = dict()
+  for tag in [baseline] + candidates:
+    tag_runs[tag] = find_runs(tag) if os.path.isdir(os.path.join(ReportVars.base_dir, tag)) else []
+    if len(tag_runs[tag]) == 0:
+      print("No runs found for tag " + tag)
+      exit(2)
+  sync_tags(conn, tag_runs, 1)
+  frames = {tag: load_tag(conn, tag, runs) for (tag, runs) in tag_runs.items()}
+  workloads = {tag: workload_groups(tag, runs) for (tag, runs) in tag_runs.items()}
+  for (tag, groups) in workloads.items():
+    if len(groups) > 1:
+      print(tag + " mixes workloads (" + ", ".join(name for (name, _) in groups.values()) + "), refusing to compare")
+      exit(2)
+    if list(groups) != list(workloads[baseline]):
+      print(tag + " ran workload " + next(iter(groups.values()))[0] + " but " + baseline + " ran " +
+            next(iter(workloads[baseline].values()))[0] + ", refusing to compare")
+      exit(2)
+  base = {e: frames[baseline][e].to_numpy(dtype=np.float64) for e in ReportVars.column_names}
+  unranked = compare.undeclared(ReportVars.column_names)
+  if len(unranked) > 0:
+    print("No direction declared in shared/compare.py, shown but not ranked: " + ", ".join(unranked))
+
+  regressed = False
+  with open(os.path.join(ReportVars.base_dir, "comparison.html"), "w") as writeFile:
+    for tag in candidates:
+      candidate = {e: frames[tag][e].to_numpy(dtype=np.float64) for e in ReportVars.column_names}
+      rows = compare.compare(base, candidate, ReportVars.column_names, threshold, alpha, resamples=resamples)
+      regressions = [e["metric"] for e in rows if e["verdict"] == "REGRESSION"]
+      regressed = regressed or len(regressions) > 0
+      df = format_comparison(rows)
+      title = tag + " vs " + baseline + " (" + str(len(tag_runs[tag])) + " vs " + str(len(tag_runs[baseline])) + " runs)"
+      print("== " + title + " ==")
+      print(df.to_markdown())
+      print(("Regressions: " + ", ".join(regressions)) if len(regressions) > 0 else "No regressions", flush=True)
+      writeFile.write("<h2>" + title + "</h2>")
+      writeFile.write("Medians with " + str(resamples) + " bootstrap resamples for 95% confidence intervals, two-sided Mann-Whitney U test. "
+                      "A regression is a significant change (p &lt; " + str(alpha) + ") of more than " + str(threshold) + "% in the wrong direction.<br/>")
+      writeFile.write(markdown.markdown(df.to_markdown(), extensions=['markdown.extensions.tables']))
+  return regressed
 
 def main() -> None:
+  args = init()
+  if args.query is not None:
+    print(query(args.query).to_markdown())
+    return
+  if args.baseline is not None:
+    if args.candidates is None:
+      print("Must specify candidates when using baseline")
+      exit(2)
+    conn = warehouse.open_warehouse(ReportVars.base_dir, ReportVars.parser_version)
+    regressed = compare_tags(conn, args.baseline, args.candidates, args.threshold, args.alpha, args.resamples)
+    conn.close()
+    exit(1 if regressed else 0)
   tags = find_tags()
   if len(tags) == 0:
     print("No data to process")
     exit(1)
+  conn = warehouse.open_warehouse(ReportVars.base_dir, ReportVars.parser_version)
+  if args.rebuild:
+    warehouse.clear(conn)
+  tag_runs: Dict[str, List[str]] = dict()
   for tag in tags:
     runs = find_runs(tag)
     if len(runs) == 0:
       print(tag + " has no runs, skipping...")
       continue
-    for run in runs:
-      process_run(tag, os.path.join(ReportVars.base_dir, tag, run))
-
-    df = get_dataframe(tag)
-
-    files = list()
-    for e in [[ReportVars.LATENCY_MEAN, ReportVars.LATENCY_MEDIAN],[ReportVars.LATENCY_95, ReportVars.LATENCY_99, ReportVars.LATENCY_999], [ReportVars.LATENCY_MAX], [ReportVars.OP_RATE], [ReportVars.ROW_RATE]]:
-      files.append(produce_violin_plot(df, e, os.path.join(ReportVars.base_dir, tag)))
-    print(files)
-    with open(os.path.join(ReportVars.base_dir, tag, "summary.html"), "w") as writeFile:
-      x = markdown.markdown(format_columns(df.describe()).to_markdown(), extensions=['markdown.extensions.tables'])
-      writeFile.write("<h2>"+tag+"</h2>")
-      writeFile.write(x)
-      writeFile.write("<hr/>")
-      writeFile.write("<h2>"+"Configuration"+"</h2>")
-      writeFile.write("Client threads: " + str(ReportVars.threads) + "<br/>")
-      writeFile.write("Duration: " + str(ReportVars.duration) + " minutes" +"<br/>")
-      writeFile.write("<hr/>")
-      writeFile.write("<h2>"+"Plots"+"</h2>")
-      for e in files:
-        writeFile.write("<img src=\"" + e + "\" />")
+    tag_runs[tag] = runs
+  sync_tags(conn, tag_runs, args.jobs)
+
+  jobs = list()
+  for (tag, runs) in tag_runs.items():
+    load_tag(conn, tag, runs)
+    groups = workload_groups(tag, runs)
+    if len(groups) > 1:
+      print(tag + " mixes " + str(len(groups)) + " workloads, reporting them separately")
+      write_workload_index(tag, groups)
+    for (key, (name, group)) in groups.items():
+      path = os.path.join(ReportVars.base_dir, tag)
+      if len(groups) > 1:
+        path = os.path.join(path, workload_dir(name, key))
+        pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+      df = build_dataframe(tag, [ReportVars.metrics[tag].get(run, dict()) for run in group])
+      threads = tag_attribute(tag, group, ReportVars.THREADS)
+      duration = tag_attribute(tag, group, ReportVars.DURATION)
+      jobs.append((tag, path, df, threads, duration, name, {run: ReportVars.series[tag][run] for run in group if run in ReportVars.series[tag]},
+                   describe_profile(tag, group)))
+  if args.jobs > 1 and len(jobs) > 1:
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+      for files in executor.map(render_tag, *zip(*jobs)):
+        print(files)
+  else:
+    for job in jobs:
+      print(render_tag(*job))
+  conn.close()
 
 if __name__=="__main__":
   main()
@@ -0,0 +1,124 @@
+import os
+import re
+import shutil
+from typing import Dict, Final, List, NamedTuple
+
+# every node listens on its own loopback address (127.0.0.0/8 is routed to lo on Linux), so the storage and CQL
+# ports can stay the same and only the JMX port, which is bound to 127.0.0.1, differs
+JMX_PORT_BASE: Final[int] = 7100
+JMX_PORT_STEP: Final[int] = 100
+CLUSTER_NAME: Final[str] = "Benchmark Cluster"
+NODE_PREFIX: Final[str] = "node"
+# subdirectories of a node's data directory, the same layout Cassandra uses below $CASSANDRA_HOME/data
+DATA_DIRS: Final[Dict[str, str]] = {
+  "data_file_directories": "data",
+  "commitlog_directory": "commitlog",
+  "saved_caches_directory": "saved_caches",
+  "hints_directory": "hints",
+  "cdc_raw_directory": "cdc_raw",
+}
+
+
+class Node(NamedTuple):
+  number: int
+  address: str
+  jmx_port: int
+  # per node conf/, data/ and logs/ below the cluster directory
+  home: str
+  cpus: List[int]
+
+
+def node_name(number: int) -> str:
+  return NODE_PREFIX + str(number)
+
+
+def make_nodes(count: int, cluster_dir: str, cpus: List[List[int]]) -> List[Node]:
+  return [Node(i, "127.0.0." + str(i), JMX_PORT_BASE + (i - 1) * JMX_PORT_STEP, os.path.join(cluster_dir, node_name(i)), cpus[i - 1])
+          for i in range(1, count + 1)]
+
+
+def split_cpus(cpus: List[int], parts: int) -> List[List[int]]:
+  # contiguous slices, the last one takes the remainder
+  if len(cpus) < parts:
+    raise Exception(str(parts) + " nodes need at least as many server CPUs, only " + str(len(cpus)) + " available")
+  size = len(cpus) // parts
+  return [cpus[i * size:(i + 1) * size] for i in range(parts - 1)] + [cpus[(parts - 1) * size:]]
+
+
+def data_dir(node: Node) -> str:
+  return os.path.join(node.home, "data")
+
+
+def conf_dir(node: Node) -> str:
+  return os.path.join(node.home, "conf")
+
+
+def log_dir(node: Node) -> str:
+  return os.path.join(node.home, "logs")
+
+
+def replace_keys(text: str, overrides: Dict[str, str]) -> str:
+  # drops the uncommented top-level keys (with their indented or list continuation lines) and appends the overrides,
+  # the commented defaults are left alone
+  lines: List[str] = list()
+  skipping = False
+  for line in text.splitlines():
+    key = line.split(":", 1)[0] if re.match(r"^[A-Za-z_]\w*:", line) else None
+    if key is not None:
+      skipping = key in overrides
+    elif skipping and (len(line.strip()) == 0 or line.startswith((" ", "\t", "-"))):
+      continue
+    else:
+      skipping = False
+    if not skipping:
+      lines.append(line)
+  lines.append("")
+  lines.append("# generated by benchmark.py --nodes")
+  for (key, value) in overrides.items():
+    lines.append(key + ":" + ("\n" + value if value.startswith(" ") else " " + value))
+  return "\n".join(lines) + "\n"
+
+
+def render_yaml(text: str, node: Node, seed: Node) -> str:
+  overrides = {
+    "cluster_name": "'" + CLUSTER_NAME + "'",
+    "listen_address": node.address,
+    "rpc_address": node.address,
+    "seed_provider": "  - class_name: org.apache.cassandra.locator.SimpleSeedProvider\n"
+                     "    parameters:\n"
+                     "      - seeds: \"" + seed.address + "\"",
+  }
+  for (key, name) in DATA_DIRS.items():
+    path = os.path.join(data_dir(node), name)
+    overrides[key] = "  - " + path if key == "data_file_directories" else path
+  return replace_keys(text, overrides)
+
+
+def render_env(text: str, node: Node) -> str:
+  return re.sub(r'^JMX_PORT="\d+"', 'JMX_PORT="' + str(node.jmx_port) + '"', text, flags=re.MULTILINE)
+
+
+def write_node_conf(source: str, node: Node, seed: Node) -> None:
+  # a copy of conf/ per node, only cassandra.yaml and the JMX port of cassandra-env.sh differ
+  target = conf_dir(node)
+  shutil.rmtree(target, ignore_errors=True)
+  shutil.copytree(source, target)
+  with open(os.path.join(source, "cassandra.yaml"), "r") as readFile:
+    text = readFile.read()
+  with open(os.path.join(target, "cassandra.yaml"), "w") as writeFile:
+    writeFile.write(render_yaml(text, node, seed))
+  with open(os.path.join(source, "cassandra-env.sh"), "r") as readFile:
+    text = readFile.read()
+  with open(os.path.join(target, "cassandra-env.sh"), "w") as writeFile:
+    writeFile.write(render_env(text, node))
+  os.makedirs(log_dir(node), exist_ok=True)
+
+
+def render_profile(text: str, replication_factor: int) -> str:
+  # the cassandra-stress profile creates its keyspace with replication_factor 1
+  return re.sub(r"('replication_factor'\s*:\s*)'?\d+'?", r"\g<1>" + str(replication_factor), text)
+
+
+def count_up(status: str) -> int:
+  # "UN  127.0.0.1  ..." lines of nodetool status
+  return len([e for e in status.splitlines() if e.startswith("UN ")])
@@ -0,0 +1,183 @@
+import math
+from typing import Dict, Final, List, Tuple
+import numpy as np
+
+HIGHER_IS_BETTER: Final[int] = 1
+LOWER_IS_BETTER: Final[int] = -1
+NEUTRAL: Final[int] = 0
+# Metrics are matched by substring and the first match wins. A metric that matches nothing is shown but never ranked,
+# so a new column cannot turn a faster or busier candidate into a regression, see undeclared
+DIRECTIONS: Final[List[Tuple[str, int]]] = [
+  ("CI half-width", LOWER_IS_BETTER),
+  (" CV ", LOWER_IS_BETTER),
+  ("Op rate", HIGHER_IS_BETTER),
+  ("Warmup op rate", HIGHER_IS_BETTER),
+  ("Row rate", HIGHER_IS_BETTER),
+  ("Max sustainable", HIGHER_IS_BETTER),
+  ("IPC", HIGHER_IS_BETTER),
+  ("SLO", NEUTRAL),
+  # shares of spikes and intervals, before the pause metrics they name
+  ("overlapping", NEUTRAL),
+  ("Latency", LOWER_IS_BETTER),
+  ("latency", LOWER_IS_BETTER),
+  ("spike intervals", LOWER_IS_BETTER),
+  ("Warmup time", LOWER_IS_BETTER),
+  ("miss rate", LOWER_IS_BETTER),
+  ("stalled", LOWER_IS_BETTER),
+  ("GC count", LOWER_IS_BETTER),
+  ("pause", LOWER_IS_BETTER),
+  ("concurrent total", LOWER_IS_BETTER),
+  ("heap after GC", LOWER_IS_BETTER),
+  ("heap before GC", LOWER_IS_BETTER),
+  ("RSS max", LOWER_IS_BETTER),
+  ("run queue delay", LOWER_IS_BETTER),
+  ("safepoint", LOWER_IS_BETTER),
+  ("monitor enter", LOWER_IS_BETTER),
+  ("thread park", LOWER_IS_BETTER),
+  ("threads max", NEUTRAL),
+  ("heap capacity", NEUTRAL),
+  ("allocation rate", NEUTRAL),
+  ("CPU user share", NEUTRAL),
+  # scale with the work done, a faster candidate does more of it
+  ("CPU mean (cores)", NEUTRAL),
+  ("context switches", NEUTRAL),
+  ("faults", NEUTRAL),
+  ("disk read", NEUTRAL),
+  ("disk write", NEUTRAL),
+  ("JFR execution samples", NEUTRAL),
+  ("JFR allocation sampled", NEUTRAL),
+  # overhead of benchmark.py, not of the system under test
+  ("Orchestrator", NEUTRAL),
+  ("Helper CPU", NEUTRAL),
+  # set by --converge and --minDuration
+  ("Measured time", NEUTRAL),
+]
+# exact null distribution of U is used for small samples without ties, normal approximation otherwise
+EXACT_LIMIT: Final[int] = 30
+
+
+def direction(metric: str) -> int:
+  for (pattern, value) in DIRECTIONS:
+    if pattern in metric:
+      return value
+  return NEUTRAL
+
+
+def undeclared(metrics: List[str]) -> List[str]:
+  # metrics without an entry in DIRECTIONS, compared as NEUTRAL until one is added
+  return [e for e in metrics if not any(pattern in e for (pattern, _) in DIRECTIONS)]
+
+
+def bootstrap_medians(values: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+  # all resamples at once as a (resamples, n) index matrix
+  index = rng.integers(0, len(values), size=(resamples, len(values)))
+  return np.median(values[index], axis=1)
+
+
+def interval(samples: np.ndarray, confidence: float) -> Tuple[float, float]:
+  samples = samples[np.isfinite(samples)]
+  if len(samples) == 0:
+    return float("nan"), float("nan")
+  tail = (1 - confidence) / 2 * 100
+  return float(np.percentile(samples, tail)), float(np.percentile(samples, 100 - tail))
+
+
+def rank(values: np.ndarray) -> np.ndarray:
+  # ranks starting at 1, ties get the average of the ranks they span
+  order = np.argsort(values, kind="mergesort")
+  ordered = values[order]
+  starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+  ends = np.r_[starts[1:], len(values)]
+  ranks = np.empty(len(values))
+  ranks[order] = np.repeat((starts + ends + 1) / 2, ends - starts)
+  return ranks
+
+
+def exact_u_cdf(n1: int, n2: int) -> np.ndarray:
+  # counts[u] of arrangements with U == u, built up one observation at a time: f(i, j, u) = f(i - 1, j, u - j) + f(i, j - 1, u)
+  counts = [np.zeros(n1 * n2 + 1) for _ in range(n2 + 1)]
+  for j in range(n2 + 1):
+    counts[j][0] = 1
+  for _ in range(n1):
+    previous = counts
+    counts = [np.zeros(n1 * n2 + 1) for _ in range(n2 + 1)]
+    counts[0] = previous[0].copy()
+    for j in range(1, n2 + 1):
+      counts[j] = counts[j - 1].copy()
+      counts[j][j:] += previous[j][:len(previous[j]) - j]
+  return np.cumsum(counts[n2]) / math.comb(n1 + n2, n1)
+
+
+def mann_whitney_u(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+  # two-sided test, returns (U of a, p-value)
+  a = a[np.isfinite(a)]
+  b = b[np.isfinite(b)]
+  n1, n2 = len(a), len(b)
+  if n1 == 0 or n2 == 0:
+    return float("nan"), float("nan")
+  values = np.concatenate([a, b])
+  ranks = rank(values)
+  u = float(np.sum(ranks[:n1]) - n1 * (n1 + 1) / 2)
+  ties = len(np.unique(values)) != len(values)
+  if not ties and n1 <= EXACT_LIMIT and n2 <= EXACT_LIMIT:
+    cdf = exact_u_cdf(n1, n2)
+    low = min(u, n1 * n2 - u)
+    return u, float(min(1.0, 2 * cdf[int(low)]))
+  _, counts = np.unique(values, return_counts=True)
+  n = n1 + n2
+  variance = n1 * n2 / 12 * ((n + 1) - float(np.sum(counts ** 3 - counts)) / (n * (n - 1)))
+  if variance <= 0:
+    return u, 1.0
+  z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+  return u, float(min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2))))
+
+
+COLUMNS: Final[List[str]] = [
+  "metric", "baseline median", "baseline CI", "candidate median", "candidate CI",
+  "difference (%)", "difference CI (%)", "p-value", "verdict",
+]
+
+
+def compare(baseline: Dict[str, np.ndarray], candidate: Dict[str, np.ndarray], metrics: List[str], threshold: float,
+            alpha: float = 0.05, confidence: float = 0.95, resamples: int = 10000, seed: int = 0) -> List[Dict]:
+  # one row per metric, a regression is a significant change in the wrong direction beyond threshold percent
+  rng = np.random.default_rng(seed)
+  rows: List[Dict] = list()
+  for metric in metrics:
+    a = baseline[metric][np.isfinite(baseline[metric])]
+    b = candidate[metric][np.isfinite(candidate[metric])]
+    if len(a) == 0 or len(b) == 0:
+      continue
+    medians_a = bootstrap_medians(a, resamples, rng)
+    medians_b = bootstrap_medians(b, resamples, rng)
+    median_a, median_b = float(np.median(a)), float(np.median(b))
+    with np.errstate(divide="ignore", invalid="ignore"):
+      difference = (median_b - median_a) / abs(median_a) * 100 if median_a != 0 else float("nan")
+      differences = (medians_b - medians_a) / np.abs(medians_a) * 100
+    (lo, hi) = interval(differences, confidence)
+    (_, p) = mann_whitney_u(a, b)
+    significant = p < alpha and not (lo <= 0 <= hi)
+    verdict = "="
+    sign = direction(metric)
+    if significant and sign != NEUTRAL and difference == difference:
+      better = difference * sign > 0
+      if not better and abs(difference) > threshold:
+        verdict = "REGRESSION"
+      elif better and abs(difference) > threshold:
+        verdict = "improvement"
+      else:
+        verdict = "better" if better else "worse"
+    elif significant:
+      verdict = "changed"
+    rows.append({
+      "metric": metric,
+      "baseline median": median_a,
+      "baseline CI": interval(medians_a, confidence),
+      "candidate median": median_b,
+      "candidate CI": interval(medians_b, confidence),
+      "difference (%)": difference,
+      "difference CI (%)": (lo, hi),
+      "p-value": p,
+      "verdict": verdict,
+    })
+  return rows
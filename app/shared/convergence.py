@@ -0,0 +1,54 @@
+import math
+import statistics
+from typing import Dict, Final, List, Tuple
+
+# batch means: consecutive intervals are correlated, the means of a few long batches of them are close to independent
+BATCHES: Final[int] = 10
+# intervals per batch before a confidence interval is computed at all
+MIN_BATCH_SIZE: Final[int] = 5
+# Student t quantile of a two-sided 95% interval with BATCHES - 1 degrees of freedom
+T_QUANTILE: Final[float] = 2.262
+# interval columns of cassandra-stress that have to converge, and their names in convergence.csv
+METRICS: Final[Dict[str, str]] = {"op/s": "Op rate", ".99": "Latency 99th percentile"}
+COLUMNS: Final[List[str]] = ["time", "intervals"] + [e + s for e in METRICS.values() for s in [" mean", " CI (%)"]] + ["converged"]
+
+
+def batch_means(values: List[float]) -> Tuple[float, float]:
+  # mean and half width of its 95% confidence interval relative to the mean in %, over the most recent intervals
+  size = len(values) // BATCHES
+  if size < MIN_BATCH_SIZE:
+    return float("nan"), float("nan")
+  recent = values[len(values) - size * BATCHES:]
+  means = [statistics.fmean(recent[i * size:(i + 1) * size]) for i in range(BATCHES)]
+  mean = statistics.fmean(means)
+  if mean == 0:
+    return mean, float("inf")
+  return mean, T_QUANTILE * statistics.stdev(means) / math.sqrt(BATCHES) / abs(mean) * 100
+
+
+class Tracker:
+  def __init__(self, path: str, target: float, min_seconds: float) -> None:
+    # every interval appends a row to path, so that the history is kept even if the run is aborted
+    self.path = path
+    self.target = target
+    self.min_seconds = min_seconds
+    self.values: Dict[str, List[float]] = {e: list() for e in METRICS}
+    self.converged = False
+    with open(path, "w") as writeFile:
+      writeFile.write(",".join(COLUMNS) + "\n")
+
+  def add(self, interval: Dict[str, float]) -> bool:
+    for (e, values) in self.values.items():
+      values.append(interval.get(e, float("nan")))
+    row = [interval.get("time", float("nan")), len(self.values["op/s"])]
+    widths = list()
+    for values in self.values.values():
+      (mean, width) = batch_means(values)
+      row += [mean, width]
+      widths.append(width)
+    # NaN widths (too few intervals) never compare below the target
+    self.converged = row[0] >= self.min_seconds and all(e < self.target for e in widths)
+    row.append(int(self.converged))
+    with open(self.path, "a") as writeFile:
+      writeFile.write(",".join(str(e) for e in row) + "\n")
+    return self.converged
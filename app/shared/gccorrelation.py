@@ -0,0 +1,73 @@
+from typing import Dict, Final, List, Tuple
+import numpy as np
+
+# an interval is a latency spike when its value is more than SPIKE_FACTOR times the median interval of the run
+SPIKE_FACTOR: Final[float] = 2.0
+# interval columns of cassandra-stress that spikes are looked for in, and their names
+LATENCIES: Final[Dict[str, str]] = {".99": "p99", "max": "max"}
+SIDES: Final[List[str]] = ["server", "client"]
+
+SUMMARY_NAMES: Final[List[str]] = \
+  [e + " spike intervals" for e in LATENCIES.values()] + \
+  [e + " spikes overlapping " + side + " pause (%)" for e in LATENCIES.values() for side in SIDES] + \
+  ["p99 spikes overlapping server concurrent phase (%)"] + \
+  ["intervals overlapping " + side + " pause (%)" for side in SIDES]
+
+
+def events(end_time: np.ndarray, ms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  # unified logging writes a pause or phase when it is over, so its time decoration is the end
+  valid = ~np.isnan(end_time)
+  return end_time[valid] - ms[valid] / 1000, end_time[valid]
+
+
+def interval_bounds(time: np.ndarray, wall: np.ndarray, end: float) -> Tuple[np.ndarray, np.ndarray]:
+  # wall is when each interval line was logged (benchmark.py --timestampOutput). Without it the last interval is
+  # assumed to end at end, the end of the measured phase, which is late by the shutdown of the client JVM
+  if len(time) == 0:
+    return np.empty(0), np.empty(0)
+  if not np.isnan(wall).any():
+    ends = wall
+  elif end == end:
+    ends = end - (time[-1] - time)
+  else:
+    return np.empty(0), np.empty(0)
+  return ends - np.diff(time, prepend=0.0), ends
+
+
+def overlapping(start: np.ndarray, end: np.ndarray, event_start: np.ndarray, event_end: np.ndarray) -> np.ndarray:
+  # per interval: events that began before it ended, minus those that were over before it started
+  began = np.searchsorted(np.sort(event_start), end, side="left")
+  ended = np.searchsorted(np.sort(event_end), start, side="right")
+  return began - ended > 0
+
+
+def spikes(values: np.ndarray) -> np.ndarray:
+  if len(values) == 0 or np.isnan(values).all():
+    return np.zeros(len(values), dtype=bool)
+  return values > SPIKE_FACTOR * np.nanmedian(values)
+
+
+def share(selected: np.ndarray, hit: np.ndarray) -> float:
+  if selected.sum() == 0:
+    return float("nan")
+  return float((selected & hit).sum() / selected.sum() * 100)
+
+
+def correlate(start: np.ndarray, end: np.ndarray, latencies: Dict[str, np.ndarray], pauses: Dict[str, Tuple[np.ndarray, np.ndarray]],
+              concurrent: Tuple[np.ndarray, np.ndarray]) -> Dict[str, float]:
+  # pauses has an entry per side whose GC log has wall clock times, the other side is left NaN
+  summary = {e: float("nan") for e in SUMMARY_NAMES}
+  if len(start) == 0:
+    return summary
+  hits = {side: overlapping(start, end, *pauses[side]) for side in SIDES if side in pauses}
+  for (column, name) in LATENCIES.items():
+    spiked = spikes(latencies[column])
+    summary[name + " spike intervals"] = float(spiked.sum())
+    for (side, hit) in hits.items():
+      summary[name + " spikes overlapping " + side + " pause (%)"] = share(spiked, hit)
+  if "server" in pauses:
+    summary["p99 spikes overlapping server concurrent phase (%)"] = share(spikes(latencies[".99"]), overlapping(start, end, *concurrent))
+  everything = np.ones(len(start), dtype=bool)
+  for (side, hit) in hits.items():
+    summary["intervals overlapping " + side + " pause (%)"] = share(everything, hit)
+  return summary
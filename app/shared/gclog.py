@@ -0,0 +1,334 @@
+import re
+from array import array
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Final, List, Optional, Tuple
+import numpy as np
+
+# Decorations as produced by -Xlog, e.g. "[2023-01-05T10:00:00.123+0100][1.234s][info][gc,start    ]"
+DECORATIONS: Final = re.compile(r"^((?:\[[^\]]*\])+)\s?(.*)$")
+UPTIME: Final = re.compile(r"^(\d+(?:\.\d+)?)(s|ms|ns)$")
+WALL_TIME: Final = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+EVENT: Final = re.compile(r"^GC\((\d+)\)\s+(?:[YO]:\s+)?(.*?)\s*$")
+DURATION: Final = re.compile(r"\s(\d+(?:\.\d+)?)(ms|s|us)$")
+HEAP_SIZED: Final = re.compile(r"(\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\)")
+HEAP_PERCENT: Final = re.compile(r"(\d+)([KMG])\((\d+)%\)->(\d+)([KMG])\((\d+)%\)")
+MAX_CAPACITY: Final = re.compile(r"Max Capacity:\s+(\d+)([KMG])")
+STATS_ROW: Final = re.compile(r"^\s*([A-Za-z ]+):\s+(.+?)\s+((?:[\d.]+ / [\d.]+\s+){3}([\d.]+) / ([\d.]+))\s+(\S+)\s*$")
+
+UNIT_MB: Final[Dict[str, float]] = {"K": 1.0 / 1024, "M": 1.0, "G": 1024.0}
+UNIT_MS: Final[Dict[str, float]] = {"us": 0.001, "ms": 1.0, "s": 1000.0}
+
+
+class GCLog:
+  def __init__(self) -> None:
+    # *_uptime is seconds since JVM start, *_time is seconds since epoch (NaN unless the log is decorated with time)
+    self.pause_uptime: np.ndarray = np.empty(0)
+    self.pause_time: np.ndarray = np.empty(0)
+    self.pause_ms: np.ndarray = np.empty(0)
+    self.pause_kind: np.ndarray = np.empty(0, dtype=np.int32)
+    self.concurrent_uptime: np.ndarray = np.empty(0)
+    self.concurrent_time: np.ndarray = np.empty(0)
+    self.concurrent_ms: np.ndarray = np.empty(0)
+    self.concurrent_kind: np.ndarray = np.empty(0, dtype=np.int32)
+    # phases within another phase of the same collection, e.g. G1's "Concurrent Mark From Roots" in "Concurrent Mark"
+    self.concurrent_nested: np.ndarray = np.empty(0, dtype=bool)
+    self.heap_uptime: np.ndarray = np.empty(0)
+    self.heap_time: np.ndarray = np.empty(0)
+    self.heap_before_mb: np.ndarray = np.empty(0)
+    self.heap_after_mb: np.ndarray = np.empty(0)
+    self.heap_capacity_mb: np.ndarray = np.empty(0)
+    self.kinds: List[str] = list()
+    # name -> (total avg, total max) from the last gc+stats block
+    self.stats: Dict[str, Tuple[float, float]] = dict()
+    self.minor_count: int = 0
+    self.major_count: int = 0
+
+  def allocation_rate(self) -> np.ndarray:
+    # MB/s allocated between the end of one collection and the start of the next
+    if len(self.heap_uptime) < 2:
+      return np.empty(0)
+    elapsed = np.diff(self.heap_uptime)
+    allocated = self.heap_before_mb[1:] - self.heap_after_mb[:-1]
+    valid = elapsed > 0
+    return allocated[valid] / elapsed[valid]
+
+
+def parse_uptime(value: str) -> Optional[float]:
+  m = UPTIME.match(value)
+  if m is None:
+    return None
+  if m.group(2) == "ms":
+    return float(m.group(1)) / 1000
+  if m.group(2) == "ns":
+    return float(m.group(1)) / 1e9
+  return float(m.group(1))
+
+
+@lru_cache(maxsize=1024)
+def parse_wall_second(second: str, zone: str) -> float:
+  return datetime.strptime(second + zone, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+
+
+def parse_wall_time(value: str) -> Optional[float]:
+  # e.g. "2023-01-05T10:00:00.123+0100", strptime is only paid once per second of log
+  if WALL_TIME.match(value) is None or len(value) < 24:
+    return None
+  try:
+    return parse_wall_second(value[:19], value[23:]) + int(value[20:23]) / 1000
+  except ValueError:
+    return None
+
+
+def decoration_times(decorations: List[str]) -> Tuple[float, float]:
+  uptime = float("nan")
+  wall = float("nan")
+  for decoration in decorations:
+    value = parse_uptime(decoration)
+    if value is not None:
+      uptime = value
+      continue
+    value = parse_wall_time(decoration)
+    if value is not None:
+      wall = value
+  return uptime, wall
+
+
+def parse_gc_log(path: str, stats_path: Optional[str] = None) -> GCLog:
+  log = GCLog()
+  kinds: Dict[str, int] = dict()
+  pause_uptime, pause_time, pause_ms, pause_kind = array("d"), array("d"), array("d"), array("i")
+  conc_uptime, conc_time, conc_ms, conc_kind = array("d"), array("d"), array("d"), array("i")
+  conc_gc: List[int] = list()
+  heap_uptime, heap_time, heap_before, heap_after, heap_capacity = array("d"), array("d"), array("d"), array("d"), array("d")
+  max_capacity = float("nan")
+
+  def kind(name: str) -> int:
+    if name not in kinds:
+      kinds[name] = len(kinds)
+      log.kinds.append(name)
+    return kinds[name]
+
+  with open(path, "r", errors="replace") as readFile:
+    for line in readFile:
+      m = DECORATIONS.match(line)
+      if m is None:
+        continue
+      decorations = [e.strip() for e in m.group(1)[1:-1].split("][")]
+      tags = decorations[-1]
+      message = m.group(2)
+
+      if tags.startswith("gc,stats"):
+        parse_stats_row(log, message)
+        continue
+      if tags.startswith("gc,init"):
+        c = MAX_CAPACITY.search(message)
+        if c is not None:
+          max_capacity = float(c.group(1)) * UNIT_MB[c.group(2)]
+        continue
+
+      if not message.startswith("GC("):
+        continue
+      e = EVENT.match(message)
+      if e is None:
+        continue
+      body = e.group(2)
+      if tags.startswith("gc,start"):
+        if "Major" in body:
+          log.major_count += 1
+        elif "Minor" in body:
+          log.minor_count += 1
+        continue
+
+      d = DURATION.search(body)
+      if d is not None and (body.startswith("Pause") or body.startswith("Concurrent")):
+        uptime, wall = decoration_times(decorations)
+        ms = float(d.group(1)) * UNIT_MS[d.group(2)]
+        # e.g. "Pause Remark 40M->40M(256M)", the heap transition is no part of the kind
+        name = HEAP_PERCENT.sub("", HEAP_SIZED.sub("", body[:d.start()]))
+        name = name.split(" (")[0].strip()
+        if body.startswith("Pause"):
+          pause_uptime.append(uptime)
+          pause_time.append(wall)
+          pause_ms.append(ms)
+          pause_kind.append(kind(name))
+        elif body.startswith("Concurrent"):
+          conc_uptime.append(uptime)
+          conc_time.append(wall)
+          conc_ms.append(ms)
+          conc_kind.append(kind(name))
+          conc_gc.append(int(e.group(1)))
+
+      if tags != "gc":
+        continue
+      h = HEAP_SIZED.search(body)
+      if h is not None:
+        uptime, wall = decoration_times(decorations)
+        heap_uptime.append(uptime)
+        heap_time.append(wall)
+        heap_before.append(float(h.group(1)) * UNIT_MB[h.group(2)])
+        heap_after.append(float(h.group(3)) * UNIT_MB[h.group(4)])
+        heap_capacity.append(float(h.group(5)) * UNIT_MB[h.group(6)])
+        continue
+      h = HEAP_PERCENT.search(body)
+      if h is not None:
+        uptime, wall = decoration_times(decorations)
+        before = float(h.group(1)) * UNIT_MB[h.group(2)]
+        after = float(h.group(4)) * UNIT_MB[h.group(5)]
+        capacity = max_capacity
+        if capacity != capacity and int(h.group(3)) > 0:
+          capacity = before * 100 / int(h.group(3))
+        heap_uptime.append(uptime)
+        heap_time.append(wall)
+        heap_before.append(before)
+        heap_after.append(after)
+        heap_capacity.append(capacity)
+
+  if stats_path is not None:
+    with open(stats_path, "r", errors="replace") as readFile:
+      for line in readFile:
+        m = DECORATIONS.match(line)
+        if m is not None:
+          parse_stats_row(log, m.group(2))
+
+  log.pause_uptime = np.frombuffer(pause_uptime, dtype=np.float64)
+  log.pause_time = np.frombuffer(pause_time, dtype=np.float64)
+  log.pause_ms = np.frombuffer(pause_ms, dtype=np.float64)
+  log.pause_kind = np.frombuffer(pause_kind, dtype=np.int32)
+  log.concurrent_uptime = np.frombuffer(conc_uptime, dtype=np.float64)
+  log.concurrent_time = np.frombuffer(conc_time, dtype=np.float64)
+  log.concurrent_ms = np.frombuffer(conc_ms, dtype=np.float64)
+  log.concurrent_kind = np.frombuffer(conc_kind, dtype=np.int32)
+  log.concurrent_nested = nested_phases(conc_gc, [log.kinds[e] for e in conc_kind])
+  log.heap_uptime = np.frombuffer(heap_uptime, dtype=np.float64)
+  log.heap_time = np.frombuffer(heap_time, dtype=np.float64)
+  log.heap_before_mb = np.frombuffer(heap_before, dtype=np.float64)
+  log.heap_after_mb = np.frombuffer(heap_after, dtype=np.float64)
+  log.heap_capacity_mb = np.frombuffer(heap_capacity, dtype=np.float64)
+  return log
+
+
+def nested_phases(gc_ids: List[int], names: List[str]) -> np.ndarray:
+  # a phase is nested when its name extends the name of another phase of the same collection. The parent is logged
+  # when it ends, after its sub-phases
+  phases: Dict[int, List[str]] = dict()
+  for (gc_id, name) in zip(gc_ids, names):
+    phases.setdefault(gc_id, list()).append(name)
+  return np.array([any(name.startswith(e + " ") for e in phases[gc_id]) for (gc_id, name) in zip(gc_ids, names)], dtype=bool)
+
+
+def parse_stats_row(log: GCLog, message: str) -> None:
+  # e.g. "    Memory: Allocation Rate     12 / 20     11 / 25     0 / 0     11 / 25     MB/s"
+  m = STATS_ROW.match(message)
+  if m is None:
+    return
+  name = m.group(1).strip() + ": " + m.group(2).strip() + " (" + m.group(6) + ")"
+  log.stats[name] = (float(m.group(4)), float(m.group(5)))
+
+
+def percentile(values: np.ndarray, q: float) -> float:
+  if len(values) == 0:
+    return float("nan")
+  return float(np.percentile(values, q))
+
+
+SUMMARY_NAMES: Final[List[str]] = [
+  "pause count",
+  "pause total (ms)",
+  "pause p50 (ms)",
+  "pause p99 (ms)",
+  "pause p99.9 (ms)",
+  "pause max (ms)",
+  "concurrent total (ms)",
+  "heap after GC mean (MB)",
+  "heap after GC max (MB)",
+  "heap before GC max (MB)",
+  "heap capacity max (MB)",
+  "allocation rate mean (MB/s)",
+]
+
+
+def maximum(values: np.ndarray) -> float:
+  values = values[~np.isnan(values)]
+  if len(values) == 0:
+    return float("nan")
+  return float(np.max(values))
+
+
+def mean(values: np.ndarray) -> float:
+  if len(values) == 0:
+    return float("nan")
+  return float(np.mean(values))
+
+
+def summarize(log: GCLog) -> Dict[str, float]:
+  pauses = log.pause_ms
+  cycles = np.array([i for (i, name) in enumerate(log.kinds) if name.endswith("Cycle")], dtype=np.int32)
+  concurrent = log.concurrent_ms[~np.isin(log.concurrent_kind, cycles) & ~log.concurrent_nested]
+  allocation_rate = log.allocation_rate()
+  if "Memory: Allocation Rate (MB/s)" in log.stats:
+    allocation_rate_avg = log.stats["Memory: Allocation Rate (MB/s)"][0]
+  else:
+    allocation_rate_avg = mean(allocation_rate)
+  values = [
+    float(len(pauses)),
+    float(np.sum(pauses)),
+    percentile(pauses, 50),
+    percentile(pauses, 99),
+    percentile(pauses, 99.9),
+    maximum(pauses),
+    float(np.sum(concurrent)),
+    mean(log.heap_after_mb),
+    maximum(log.heap_after_mb),
+    maximum(log.heap_before_mb),
+    maximum(log.heap_capacity_mb),
+    allocation_rate_avg,
+  ]
+  return dict(zip(SUMMARY_NAMES, values))
+
+
+def trim(log: GCLog, start: float, end: float) -> GCLog:
+  # events between start and end (seconds since epoch), needs the time decoration; logs without it are kept whole
+  if len(log.pause_time) == 0 or np.isnan(log.pause_time).any():
+    return log
+  trimmed = GCLog()
+  trimmed.kinds = log.kinds
+  for (prefix, names) in [("pause", ["uptime", "time", "ms", "kind"]), ("concurrent", ["uptime", "time", "ms", "kind", "nested"]),
+                          ("heap", ["uptime", "time", "before_mb", "after_mb", "capacity_mb"])]:
+    time = getattr(log, prefix + "_time")
+    keep = (time >= start) & (time <= end)
+    for name in names:
+      setattr(trimmed, prefix + "_" + name, getattr(log, prefix + "_" + name)[keep])
+  # gc+stats and the collection counts cover the whole log and are dropped, the allocation rate is computed from the
+  # heap occupancy of the window instead
+  return trimmed
+
+
+def merge(logs: List[GCLog]) -> GCLog:
+  # one log for several JVMs, e.g. the nodes of a cluster: events are concatenated and counts added up
+  merged = GCLog()
+  for log in logs:
+    mapping = np.empty(len(log.kinds), dtype=np.int32)
+    for (i, name) in enumerate(log.kinds):
+      if name not in merged.kinds:
+        merged.kinds.append(name)
+      mapping[i] = merged.kinds.index(name)
+    for name in ["pause_uptime", "pause_time", "pause_ms", "concurrent_uptime", "concurrent_time", "concurrent_ms",
+                 "heap_uptime", "heap_time", "heap_before_mb", "heap_after_mb", "heap_capacity_mb"]:
+      setattr(merged, name, np.concatenate([getattr(merged, name), getattr(log, name)]))
+    merged.pause_kind = np.concatenate([merged.pause_kind, mapping[log.pause_kind]])
+    merged.concurrent_kind = np.concatenate([merged.concurrent_kind, mapping[log.concurrent_kind]])
+    merged.concurrent_nested = np.concatenate([merged.concurrent_nested, log.concurrent_nested])
+    merged.minor_count += log.minor_count
+    merged.major_count += log.major_count
+  return merged
+
+
+def summarize_all(logs: List[GCLog]) -> Dict[str, float]:
+  # pauses and heap occupancy over all JVMs, their allocation rates add up
+  if len(logs) == 1:
+    return summarize(logs[0])
+  summary = summarize(merge(logs))
+  rates = np.asarray([summarize(e)["allocation rate mean (MB/s)"] for e in logs])
+  summary["allocation rate mean (MB/s)"] = float(np.nansum(rates)) if np.isfinite(rates).any() else float("nan")
+  return summary
@@ -0,0 +1,188 @@
+import base64
+import math
+import struct
+import zlib
+from typing import Dict, Final, List, Optional, Tuple
+import numpy as np
+
+# HdrHistogram V2 encoding, see HistogramLogWriter and AbstractHistogram.encodeIntoByteBuffer
+# bits 4-7 of a cookie hold the word size (0x10 for V2) and are masked off before comparing
+COOKIE_MASK: Final[int] = ~0xf0
+COMPRESSED_COOKIE: Final[int] = 0x1c849304
+ENCODING_COOKIE: Final[int] = 0x1c849303
+COMPRESSED_HEADER: Final = struct.Struct(">ii")
+ENCODING_HEADER: Final = struct.Struct(">iiiiqqd")
+# cassandra-stress records nanoseconds, the report uses ms
+VALUE_TO_MS: Final[float] = 1e-6
+# interval percentiles kept as time series
+INTERVAL_PERCENTILES: Final[List[float]] = [50.0, 99.0, 99.9, 100.0]
+# service time, and response time which includes the time spent waiting for a slot at a fixed rate
+SERVICE_TIME: Final[str] = "st"
+RESPONSE_TIME: Final[str] = "rt"
+
+
+class Layout:
+  def __init__(self, digits: int, lowest: int) -> None:
+    self.digits = digits
+    self.lowest = lowest
+    self.unit_magnitude = int(math.floor(math.log2(lowest)))
+    sub_bucket_count = 1 << int(math.ceil(math.log2(2 * 10 ** digits)))
+    self.sub_bucket_half_count = sub_bucket_count // 2
+    self.sub_bucket_half_count_magnitude = int(math.log2(sub_bucket_count)) - 1
+
+  def key(self) -> Tuple[int, int]:
+    return self.digits, self.lowest
+
+  def values(self, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    # lowest and highest value that is counted at each index
+    index = np.arange(length, dtype=np.int64)
+    bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+    sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+    first = bucket < 0
+    sub_bucket[first] -= self.sub_bucket_half_count
+    bucket[first] = 0
+    lowest = sub_bucket << (bucket + self.unit_magnitude)
+    return lowest, lowest + (np.int64(1) << (bucket + self.unit_magnitude).astype(np.int64)) - 1
+
+
+def decode_varints(data: bytes) -> np.ndarray:
+  # ZigZag LEB128, vectorized: every byte without the continuation bit ends a value
+  # (9 byte encodings only occur for counts above 2^56 and are not supported)
+  raw = np.frombuffer(data, dtype=np.uint8)
+  ends = np.flatnonzero(raw < 0x80)
+  if len(ends) == 0:
+    return np.empty(0, dtype=np.int64)
+  raw = raw[:ends[-1] + 1]
+  starts = np.r_[0, ends[:-1] + 1]
+  position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+  parts = (raw & 0x7f).astype(np.uint64) << (7 * position).astype(np.uint64)
+  unsigned = np.add.reduceat(parts, starts)
+  return (unsigned >> np.uint64(1)).astype(np.int64) ^ -(unsigned & np.uint64(1)).astype(np.int64)
+
+
+def decode(encoded: str) -> Tuple[Layout, np.ndarray]:
+  data = base64.b64decode(encoded)
+  (cookie, length) = COMPRESSED_HEADER.unpack_from(data)
+  if cookie & COOKIE_MASK != COMPRESSED_COOKIE:
+    raise Exception("Unsupported histogram encoding " + hex(cookie))
+  payload = zlib.decompress(data[COMPRESSED_HEADER.size:COMPRESSED_HEADER.size + length])
+  (cookie, counts_length, normalizing_offset, digits, lowest, _, _) = ENCODING_HEADER.unpack_from(payload)
+  if cookie & COOKIE_MASK != ENCODING_COOKIE:
+    raise Exception("Unsupported histogram payload " + hex(cookie))
+  if normalizing_offset != 0:
+    raise Exception("Shifted histograms are not supported")
+  entries = decode_varints(payload[ENCODING_HEADER.size:ENCODING_HEADER.size + counts_length])
+  # negative entries are runs of zero counts
+  widths = np.where(entries < 0, -entries, 1)
+  offsets = np.cumsum(widths) - widths
+  counts = np.zeros(int(np.sum(widths)), dtype=np.int64)
+  positive = entries > 0
+  counts[offsets[positive]] = entries[positive]
+  return Layout(digits, lowest), counts
+
+
+def add(total: np.ndarray, counts: np.ndarray) -> np.ndarray:
+  if len(counts) > len(total):
+    total = np.concatenate([total, np.zeros(len(counts) - len(total), dtype=total.dtype)])
+  total[:len(counts)] += counts
+  return total
+
+
+def percentiles(layout: Layout, counts: np.ndarray, qs: List[float]) -> np.ndarray:
+  # same definition as AbstractHistogram.getValueAtPercentile, in ms
+  total = float(np.sum(counts))
+  if total == 0:
+    return np.full(len(qs), np.nan)
+  cumulative = np.cumsum(counts)
+  wanted = np.maximum(1, np.floor(np.asarray(qs, dtype=np.float64) / 100 * total + 0.5))
+  index = np.minimum(np.searchsorted(cumulative, wanted), len(counts) - 1)
+  (lowest, highest) = layout.values(len(counts))
+  # the 0th percentile is the lowest equivalent value of the smallest recorded value
+  return np.where(np.asarray(qs) == 0, lowest[index], highest[index]) * VALUE_TO_MS
+
+
+def mean(layout: Layout, counts: np.ndarray) -> float:
+  total = float(np.sum(counts))
+  if total == 0:
+    return float("nan")
+  (lowest, highest) = layout.values(len(counts))
+  # median equivalent value of each bucket, as in AbstractHistogram.getMean
+  return float(np.sum(counts * (lowest + (highest - lowest + 1) // 2)) / total) * VALUE_TO_MS
+
+
+class HdrLog:
+  def __init__(self) -> None:
+    self.layout: Optional[Layout] = None
+    self.kind: str = SERVICE_TIME
+    self.counts: np.ndarray = np.empty(0, dtype=np.int64)
+    # interval start in seconds since the first interval, and the percentiles of each interval
+    self.time: np.ndarray = np.empty(0)
+    self.intervals: Dict[float, np.ndarray] = dict()
+
+
+def kind(tag: str) -> Optional[str]:
+  # cassandra-stress tags histograms with the operation and "-st", "-rt" or "-wt"
+  if tag.endswith("-wt"):
+    return None
+  return RESPONSE_TIME if tag.endswith("-rt") else SERVICE_TIME
+
+
+def read_log(path: str) -> HdrLog:
+  # streams the log, only the running total per kind and a few floats per interval are kept
+  layout: Optional[Layout] = None
+  totals: Dict[str, np.ndarray] = dict()
+  current: Dict[str, np.ndarray] = dict()
+  current_start = float("nan")
+  times: Dict[str, List[float]] = dict()
+  rows: Dict[str, List[np.ndarray]] = dict()
+  first_start = float("nan")
+
+  def finish() -> None:
+    if layout is None:
+      # nothing decoded yet, so nothing to finish
+      return
+    for (k, counts) in current.items():
+      times.setdefault(k, list()).append(current_start - first_start)
+      rows.setdefault(k, list()).append(percentiles(layout, counts, INTERVAL_PERCENTILES))
+    current.clear()
+
+  with open(path, "r", errors="replace") as readFile:
+    for line in readFile:
+      if line.startswith("#") or line.startswith("\"") or len(line.strip()) == 0:
+        continue
+      fields = line.strip().split(",")
+      tag = ""
+      if fields[0].startswith("Tag="):
+        tag = fields[0][len("Tag="):]
+        fields = fields[1:]
+      if len(fields) != 4:
+        continue
+      k = kind(tag)
+      if k is None:
+        continue
+      (decoded_layout, counts) = decode(fields[3])
+      if layout is None:
+        layout = decoded_layout
+      elif layout.key() != decoded_layout.key():
+        raise Exception(path + " mixes histograms with different precision")
+      start = float(fields[0])
+      if first_start != first_start:
+        first_start = start
+      # operations of one interval share the start time and are merged
+      if start != current_start:
+        finish()
+        current_start = start
+      current[k] = add(current.get(k, np.zeros(0, dtype=np.int64)), counts)
+      totals[k] = add(totals.get(k, np.zeros(0, dtype=np.int64)), counts)
+  finish()
+
+  log = HdrLog()
+  if layout is None:
+    return log
+  log.layout = layout
+  log.kind = RESPONSE_TIME if RESPONSE_TIME in totals else SERVICE_TIME
+  log.counts = totals.get(log.kind, np.zeros(0, dtype=np.int64))
+  log.time = np.asarray(times.get(log.kind, []), dtype=np.float64)
+  values = np.asarray(rows.get(log.kind, []), dtype=np.float64).reshape(-1, len(INTERVAL_PERCENTILES))
+  log.intervals = {q: values[:, i] for (i, q) in enumerate(INTERVAL_PERCENTILES)}
+  return log
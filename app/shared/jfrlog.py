@@ -0,0 +1,201 @@
+import os
+import re
+import shutil
+import subprocess
+from typing import Dict, Final, Iterator, List, Optional, Tuple
+
+# events read from a recording, allocation is sampled by jdk.ObjectAllocationSample since JDK 16 and by the TLAB
+# events before (only enabled by the profile settings there)
+EXECUTION_SAMPLE: Final[str] = "jdk.ExecutionSample"
+ALLOCATION_SAMPLE: Final[str] = "jdk.ObjectAllocationSample"
+ALLOCATION_IN_TLAB: Final[str] = "jdk.ObjectAllocationInNewTLAB"
+ALLOCATION_OUTSIDE_TLAB: Final[str] = "jdk.ObjectAllocationOutsideTLAB"
+SAFEPOINT: Final[str] = "jdk.SafepointBegin"
+MONITOR_ENTER: Final[str] = "jdk.JavaMonitorEnter"
+THREAD_PARK: Final[str] = "jdk.ThreadPark"
+EVENTS: Final[List[str]] = [EXECUTION_SAMPLE, ALLOCATION_SAMPLE, ALLOCATION_IN_TLAB, ALLOCATION_OUTSIDE_TLAB, SAFEPOINT, MONITOR_ENTER, THREAD_PARK]
+# frames that make up a hot stack, the first one is the hot method
+STACK_DEPTH: Final[int] = 3
+# entries of each table kept per run
+TOP: Final[int] = 50
+DURATION: Final = re.compile(r"^([\d.,]+)\s*(ns|us|ms|s|min|h)$")
+SIZE: Final = re.compile(r"^([\d.,]+)\s*(bytes?|kB|MB|GB|TB)$")
+DURATION_MS: Final[Dict[str, float]] = {"ns": 1e-6, "us": 1e-3, "ms": 1.0, "s": 1000.0, "min": 60000.0, "h": 3600000.0}
+SIZE_MB: Final[Dict[str, float]] = {"byte": 1.0 / 1024 ** 2, "bytes": 1.0 / 1024 ** 2, "kB": 1.0 / 1024, "MB": 1.0, "GB": 1024.0, "TB": 1024.0 ** 2}
+
+SUMMARY_NAMES: Final[List[str]] = [
+  "execution samples",
+  "allocation sampled (MB)",
+  "safepoints",
+  "safepoint total (ms)",
+  "safepoint max (ms)",
+  "contended monitor enters",
+  "monitor enter total (ms)",
+  "thread park total (ms)",
+]
+TABLES: Final[List[str]] = ["hot methods", "hot stacks", "allocation by class (MB)", "lock contention by class (ms)"]
+# summary values that each table is a breakdown of
+TABLE_TOTALS: Final[Dict[str, List[str]]] = {
+  "hot methods": ["execution samples"],
+  "hot stacks": ["execution samples"],
+  "allocation by class (MB)": ["allocation sampled (MB)"],
+  "lock contention by class (ms)": ["monitor enter total (ms)", "thread park total (ms)"],
+}
+
+
+def find_tool(jdk: str) -> Optional[str]:
+  # the JDK that recorded is preferred, recordings of newer JDKs may not be readable by older jfr tools
+  for home in [jdk, os.environ.get("JAVA_HOME", "")]:
+    if len(home) > 0 and os.path.isfile(os.path.join(home, "bin", "jfr")):
+      return os.path.join(home, "bin", "jfr")
+  return shutil.which("jfr")
+
+
+def parse_duration(value: str) -> float:
+  m = DURATION.match(value)
+  if m is None:
+    return float("nan")
+  return float(m.group(1).replace(",", "")) * DURATION_MS[m.group(2)]
+
+
+def parse_size(value: str) -> float:
+  m = SIZE.match(value)
+  if m is None:
+    return float("nan")
+  return float(m.group(1).replace(",", "")) * SIZE_MB[m.group(2)]
+
+
+def class_name(value: str) -> str:
+  # e.g. "java.lang.String (classLoader = bootstrap)"
+  return value.split(" (")[0].strip().strip("\"")
+
+
+def frame_name(value: str) -> str:
+  # e.g. "java.lang.String.hashCode() line: 123"
+  return value.split(" line:")[0].strip()
+
+
+def read_events(tool: str, path: str) -> Iterator[Tuple[str, Dict[str, str], List[str]]]:
+  # streams the text output of jfr print, (event name, top level fields, stack frames) per event
+  app = subprocess.Popen([tool, "print", "--stack-depth", str(STACK_DEPTH), "--events", ",".join(EVENTS), path],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, errors="replace")
+  name: Optional[str] = None
+  fields: Dict[str, str] = dict()
+  stack: List[str] = list()
+  depth = 0
+  in_stack = False
+  assert app.stdout is not None
+  finished = False
+  try:
+    for line in app.stdout:
+      stripped = line.strip()
+      if name is None:
+        if stripped.endswith("{") and "=" not in stripped:
+          (name, fields, stack, depth, in_stack) = (stripped[:-1].strip(), dict(), list(), 1, False)
+        continue
+      if in_stack:
+        if stripped == "]":
+          in_stack = False
+        elif stripped != "...":
+          stack.append(frame_name(stripped))
+        continue
+      if stripped == "}":
+        depth -= 1
+        if depth == 0:
+          yield name, fields, stack
+          name = None
+        continue
+      if stripped.endswith("{"):
+        depth += 1
+        continue
+      if depth > 1:
+        continue
+      (key, _, value) = stripped.partition(" = ")
+      if key == "stackTrace" and value == "[":
+        in_stack = True
+        continue
+      fields[key] = value
+    finished = True
+  finally:
+    if not finished:
+      # the consumer stopped early, jfr print would block on a full pipe forever
+      app.kill()
+    app.wait()
+    app.stdout.close()
+  if app.returncode != 0:
+    raise Exception("jfr print failed for " + path)
+
+
+class Profile:
+  def __init__(self) -> None:
+    self.values: Dict[str, float] = {e: 0.0 for e in SUMMARY_NAMES}
+    self.values["safepoint max (ms)"] = float("nan")
+    self.tables: Dict[str, Dict[str, float]] = {e: dict() for e in TABLES}
+
+  def count(self, table: str, key: str, value: float) -> None:
+    if value == value:
+      self.tables[table][key] = self.tables[table].get(key, 0.0) + value
+
+  def top(self) -> Dict[str, Dict[str, float]]:
+    return {e: dict(sorted(values.items(), key=lambda x: -x[1])[:TOP]) for (e, values) in self.tables.items()}
+
+
+def read_profile(tool: str, path: str) -> Profile:
+  profile = Profile()
+  values = profile.values
+  # TLAB events are only used when the recording has no allocation samples
+  tlab: Dict[str, float] = dict()
+  for (name, fields, stack) in read_events(tool, path):
+    if name == EXECUTION_SAMPLE:
+      values["execution samples"] += 1
+      if len(stack) > 0:
+        profile.count("hot methods", stack[0], 1)
+        profile.count("hot stacks", " <- ".join(stack), 1)
+    elif name == ALLOCATION_SAMPLE:
+      size = parse_size(fields.get("weight", ""))
+      values["allocation sampled (MB)"] += size if size == size else 0.0
+      profile.count("allocation by class (MB)", class_name(fields.get("objectClass", "")), size)
+    elif name in (ALLOCATION_IN_TLAB, ALLOCATION_OUTSIDE_TLAB):
+      size = parse_size(fields.get("tlabSize" if name == ALLOCATION_IN_TLAB else "allocationSize", ""))
+      if size == size:
+        key = class_name(fields.get("objectClass", ""))
+        tlab[key] = tlab.get(key, 0.0) + size
+    elif name == SAFEPOINT:
+      duration = parse_duration(fields.get("duration", ""))
+      values["safepoints"] += 1
+      if duration == duration:
+        values["safepoint total (ms)"] += duration
+        values["safepoint max (ms)"] = duration if values["safepoint max (ms)"] != values["safepoint max (ms)"] else \
+          max(values["safepoint max (ms)"], duration)
+    elif name == MONITOR_ENTER:
+      duration = parse_duration(fields.get("duration", ""))
+      values["contended monitor enters"] += 1
+      values["monitor enter total (ms)"] += duration if duration == duration else 0.0
+      profile.count("lock contention by class (ms)", class_name(fields.get("monitorClass", "")), duration)
+    elif name == THREAD_PARK:
+      duration = parse_duration(fields.get("duration", ""))
+      values["thread park total (ms)"] += duration if duration == duration else 0.0
+      parked = class_name(fields.get("parkedClass", "null"))
+      if parked not in ("null", "N/A", ""):
+        profile.count("lock contention by class (ms)", parked, duration)
+  if len(profile.tables["allocation by class (MB)"]) == 0 and len(tlab) > 0:
+    profile.tables["allocation by class (MB)"] = tlab
+    values["allocation sampled (MB)"] = sum(tlab.values())
+  return profile
+
+
+def merge(profiles: List[Profile]) -> Profile:
+  # the nodes of a cluster, counts and totals add up
+  merged = Profile()
+  for profile in profiles:
+    for (name, value) in profile.values.items():
+      if name == "safepoint max (ms)":
+        if value == value:
+          current = merged.values[name]
+          merged.values[name] = value if current != current else max(current, value)
+      else:
+        merged.values[name] += value
+    for (table, entries) in profile.tables.items():
+      for (key, value) in entries.items():
+        merged.count(table, key, value)
+  return merged
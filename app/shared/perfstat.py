@@ -0,0 +1,126 @@
+from typing import Dict, Final, List, Optional, Tuple
+import numpy as np
+
+# Ratios derived from perf stat counters: name -> (numerator, denominator, scale)
+DERIVED: Final[Dict[str, Tuple[str, str, float]]] = {
+  "IPC": ("instructions", "cycles", 1.0),
+  "cache miss rate (%)": ("cache-misses", "cache-references", 100.0),
+  "branch miss rate (%)": ("branch-misses", "branches", 100.0),
+  "L1d miss rate (%)": ("L1-dcache-load-misses", "L1-dcache-loads", 100.0),
+  "LLC miss rate (%)": ("LLC-load-misses", "LLC-loads", 100.0),
+  "dTLB miss rate (%)": ("dTLB-load-misses", "dTLB-loads", 100.0),
+  "stalled frontend (%)": ("stalled-cycles-frontend", "cycles", 100.0),
+  "stalled backend (%)": ("stalled-cycles-backend", "cycles", 100.0),
+}
+SUMMARY_NAMES: Final[List[str]] = list(DERIVED)
+
+
+def event_name(name: str) -> str:
+  # "cpu_core/cycles/" on hybrid CPUs and "cycles:u" with modifiers are both counted as "cycles"
+  if "/" in name:
+    parts = [e for e in name.split("/") if len(e) > 0]
+    name = parts[1] if len(parts) > 1 else parts[0]
+  return name.split(":")[0].strip()
+
+
+def is_number(value: str) -> bool:
+  try:
+    float(value)
+  except ValueError:
+    return False
+  return True
+
+
+def parse_line(line: str, interval: bool) -> Optional[Tuple[float, str, float]]:
+  # "value,unit,event,run time,percent running,..." prefixed with the timestamp in interval mode (-I)
+  if line.startswith("#") or len(line.strip()) == 0:
+    return None
+  fields = line.rstrip("\n").split(",")
+  timestamp = float("nan")
+  if interval:
+    try:
+      timestamp = float(fields[0])
+    except ValueError:
+      return None
+    fields = fields[1:]
+  if len(fields) < 3 or len(fields[2]) == 0:
+    return None
+  try:
+    # "<not counted>" and "<not supported>" are kept as NaN so that ratios are not computed from them
+    value = float(fields[0])
+  except ValueError:
+    value = float("nan")
+  return timestamp, event_name(fields[2]), value
+
+
+class PerfStat:
+  def __init__(self) -> None:
+    self.totals: Dict[str, float] = dict()
+    # per interval counts, only filled in interval mode
+    self.time: np.ndarray = np.empty(0)
+    self.intervals: Dict[str, np.ndarray] = dict()
+
+
+def parse_perf_csv(path: str) -> PerfStat:
+  stat = PerfStat()
+  rows: List[Tuple[float, str, float]] = list()
+  with open(path, "r", errors="replace") as readFile:
+    lines = [e for e in readFile if not e.startswith("#") and len(e.strip()) > 0]
+  # interval output has a leading timestamp, the 4th column is then the event instead of the run time
+  interval = len(lines) > 0 and len(lines[0].split(",")) > 3 and not is_number(lines[0].split(",")[3])
+  for line in lines:
+    parsed = parse_line(line, interval)
+    if parsed is not None:
+      rows.append(parsed)
+
+  if not interval:
+    for (_, name, value) in rows:
+      stat.totals[name] = stat.totals.get(name, 0.0) + value
+    return stat
+
+  times = sorted(set(e[0] for e in rows))
+  index = {t: i for (i, t) in enumerate(times)}
+  stat.time = np.asarray(times, dtype=np.float64)
+  for (timestamp, name, value) in rows:
+    values = stat.intervals.setdefault(name, np.full(len(times), np.nan))
+    if values[index[timestamp]] != values[index[timestamp]]:
+      values[index[timestamp]] = 0.0
+    values[index[timestamp]] += value
+  # an event that was not counted in a few intervals (multiplexing) still has a total
+  stat.totals = {name: float(np.nansum(values)) if np.isfinite(values).any() else float("nan")
+                 for (name, values) in stat.intervals.items()}
+  return stat
+
+
+def ratio(numerator: float, denominator: float, scale: float) -> float:
+  if denominator != denominator or numerator != numerator or denominator == 0:
+    return float("nan")
+  return numerator / denominator * scale
+
+
+def summarize(stat: PerfStat) -> Dict[str, float]:
+  return {name: ratio(stat.totals.get(n, float("nan")), stat.totals.get(d, float("nan")), scale)
+          for (name, (n, d, scale)) in DERIVED.items()}
+
+
+def interval_ratio(stat: PerfStat, name: str) -> np.ndarray:
+  (n, d, scale) = DERIVED[name]
+  if n not in stat.intervals or d not in stat.intervals:
+    return np.empty(0)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    return np.where(stat.intervals[d] > 0, stat.intervals[n] / stat.intervals[d] * scale, np.nan)
+
+
+def merge(stats: List[PerfStat]) -> PerfStat:
+  # counters of several processes add up, interval series are only kept for the first one
+  merged = PerfStat()
+  merged.time = stats[0].time
+  merged.intervals = stats[0].intervals
+  for stat in stats:
+    for (name, value) in stat.totals.items():
+      previous = merged.totals.get(name, float("nan"))
+      if value == value:
+        merged.totals[name] = (previous if previous == previous else 0.0) + value
+      else:
+        merged.totals[name] = previous
+  return merged
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import random
+from typing import Dict, Final, List, Optional
+
+PENDING: Final[str] = "pending"
+RUNNING: Final[str] = "running"
+DONE: Final[str] = "done"
+FAILED: Final[str] = "failed"
+
+# Axes of the experiment matrix, each maps a short name to a value
+AXES: Final[List[str]] = ["jdk", "jvmArgs", "jvmServerArgs", "jvmClientArgs", "workload"]
+
+
+def load_plan(path: str) -> Dict:
+  with open(path, "r") as readFile:
+    text = readFile.read()
+  if path.endswith(".yaml") or path.endswith(".yml"):
+    try:
+      import yaml
+    except ImportError:
+      raise Exception("PyYAML is needed for YAML plans (pip3 install pyyaml), or use JSON")
+    plan = yaml.safe_load(text)
+  else:
+    plan = json.loads(text)
+  if not isinstance(plan, dict) or "jdk" not in plan:
+    raise Exception("Plan must be a mapping with at least a 'jdk' entry")
+  plan["fingerprint"] = hashlib.sha1(text.encode()).hexdigest()
+  return plan
+
+
+def axis(plan: Dict, name: str) -> Dict[str, object]:
+  value = plan.get(name, {"": ""})
+  if isinstance(value, str):
+    return {"": value}
+  if isinstance(value, list):
+    return {str(i): e for (i, e) in enumerate(value)}
+  return value
+
+
+def expand(plan: Dict) -> List[Dict]:
+  configurations: List[Dict] = [dict()]
+  for name in AXES:
+    configurations = [dict(c, **{name: key}) for c in configurations for key in axis(plan, name)]
+  threads = plan.get("threads", [1])
+  threads = threads if isinstance(threads, list) else [threads]
+  configurations = [dict(c, threads=int(t)) for c in configurations for t in threads]
+
+  for c in configurations:
+    jdk = axis(plan, "jdk")[c["jdk"]]
+    c["jdkServer"] = os.path.expanduser(jdk["server"] if isinstance(jdk, dict) else str(jdk))
+    c["jdkClient"] = os.path.expanduser(jdk["client"] if isinstance(jdk, dict) else str(jdk))
+    for name in AXES[1:]:
+      c[name + "Value"] = str(axis(plan, name)[c[name]])
+    names = [str(c[e]) for e in AXES if len(str(c[e])) > 0] + ["t" + str(c["threads"])]
+    c["tag"] = plan.get("tag", "{name}").format(name="-".join(names), threads=c["threads"], **{e: c[e] for e in AXES})
+    c["duration"] = str(plan.get("duration", 1))
+
+  # one repetition of every configuration per round so that machine drift is spread evenly
+  rng = random.Random(plan.get("seed", 0))
+  queue: List[Dict] = list()
+  for repetition in range(int(plan.get("repetitions", 1))):
+    order = list(range(len(configurations)))
+    if plan.get("shuffle", False):
+      rng.shuffle(order)
+    for i in order:
+      queue.append(dict(configurations[i], id=len(queue), repetition=repetition, status=PENDING, attempts=0))
+  return queue
+
+
+def queue_path(plan_path: str) -> str:
+  return plan_path + ".queue.json"
+
+
+def save_queue(path: str, fingerprint: str, queue: List[Dict]) -> None:
+  # written to a temporary file first so that a crash never leaves a truncated queue behind
+  tmp = path + ".tmp"
+  with open(tmp, "w") as writeFile:
+    json.dump({"fingerprint": fingerprint, "entries": queue}, writeFile, indent=1)
+    writeFile.flush()
+    os.fsync(writeFile.fileno())
+  os.replace(tmp, path)
+
+
+def load_queue(plan_path: str, plan: Dict) -> List[Dict]:
+  path = queue_path(plan_path)
+  if not os.path.exists(path):
+    queue = expand(plan)
+    save_queue(path, plan["fingerprint"], queue)
+    return queue
+  with open(path, "r") as readFile:
+    saved = json.load(readFile)
+  if saved["fingerprint"] != plan["fingerprint"]:
+    raise Exception("Plan has changed since " + path + " was created, remove it to start over")
+  queue = saved["entries"]
+  max_attempts = int(plan.get("maxAttempts", 2))
+  for entry in queue:
+    # interrupted while running, or failed but still allowed to retry
+    if entry["status"] == RUNNING or (entry["status"] == FAILED and entry["attempts"] < max_attempts):
+      entry["status"] = PENDING
+  return queue
+
+
+def next_entry(queue: List[Dict]) -> Optional[Dict]:
+  for entry in queue:
+    if entry["status"] == PENDING:
+      return entry
+  return None
+
+
+def progress(queue: List[Dict]) -> str:
+  counts = {e: 0 for e in [PENDING, RUNNING, DONE, FAILED]}
+  for entry in queue:
+    counts[entry["status"]] += 1
+  return ", ".join(str(v) + " " + k for (k, v) in counts.items())
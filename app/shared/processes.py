@@ -0,0 +1,109 @@
+import os
+import select
+import signal
+import time
+from typing import Final, List
+
+# set in the environment of every process group benchmark.py starts, to the directory it runs from. Leftovers of an
+# invocation that was killed itself are found by it, JVMs that benchmark.py did not start never carry it
+MARKER: Final[str] = "CASSANDRA_BENCHMARK_DIR"
+# seconds a process group gets to go away after SIGKILL
+KILL_TIMEOUT: Final[float] = 5.0
+POLL_INTERVAL: Final[float] = 0.05
+
+
+def read_stat(pid: int) -> List[str]:
+  # the fields after the command name, which may contain spaces and parentheses itself
+  try:
+    with open("/proc/" + str(pid) + "/stat", "r") as readFile:
+      stat = readFile.read()
+  except OSError:
+    return []
+  return stat[stat.rfind(")") + 2:].split()
+
+
+def is_alive(pid: int) -> bool:
+  # a zombie has exited and only waits to be reaped, which takes a while for orphans such as the server JVM
+  fields = read_stat(pid) if pid > 0 else []
+  return len(fields) > 0 and fields[0] not in ["Z", "X"]
+
+
+def group_members(pgid: int) -> List[int]:
+  members = list()
+  for entry in os.listdir("/proc"):
+    if entry.isdigit():
+      fields = read_stat(int(entry))
+      if len(fields) > 2 and int(fields[2]) == pgid and fields[0] not in ["Z", "X"]:
+        members.append(int(entry))
+  return members
+
+
+def marked(value: str) -> List[int]:
+  # process groups with a member started with MARKER=value, benchmark.py itself never carries it
+  marker = (MARKER + "=" + value).encode()
+  groups = set()
+  for entry in os.listdir("/proc"):
+    if not entry.isdigit() or int(entry) == os.getpid():
+      continue
+    try:
+      with open("/proc/" + entry + "/environ", "rb") as readFile:
+        environ = readFile.read().split(b"\0")
+    except OSError:
+      continue
+    fields = read_stat(int(entry))
+    if marker in environ and len(fields) > 2 and fields[0] not in ["Z", "X"]:
+      groups.add(int(fields[2]))
+  groups.discard(os.getpgrp())
+  return sorted(groups)
+
+
+def wait(pid: int, timeout: float) -> bool:
+  # a pidfd becomes readable once the process has exited, zombie or not. Without pidfds the state is polled
+  try:
+    fd = os.pidfd_open(pid)
+  except ProcessLookupError:
+    return True
+  except OSError:
+    deadline = time.monotonic() + timeout
+    while is_alive(pid):
+      if time.monotonic() >= deadline:
+        return False
+      time.sleep(POLL_INTERVAL)
+    return True
+  try:
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    return len(poller.poll(max(0.0, timeout) * 1000)) > 0
+  finally:
+    os.close(fd)
+
+
+def wait_group(pgid: int, timeout: float) -> bool:
+  # members are waited for one at a time, whatever they started in the meantime is picked up by the next scan
+  deadline = time.monotonic() + timeout
+  while True:
+    members = group_members(pgid)
+    if len(members) == 0:
+      return True
+    if time.monotonic() >= deadline or not wait(members[0], deadline - time.monotonic()):
+      return False
+
+
+def signal_group(pgid: int, sig: int) -> None:
+  try:
+    os.killpg(pgid, sig)
+  except (ProcessLookupError, PermissionError):
+    pass
+
+
+def terminate(groups: List[int], timeout: float) -> bool:
+  # SIGTERM to every group, SIGKILL to those still running after timeout seconds. True if SIGTERM was enough
+  for pgid in groups:
+    signal_group(pgid, signal.SIGTERM)
+  deadline = time.monotonic() + timeout
+  left = [pgid for pgid in groups if not wait_group(pgid, deadline - time.monotonic())]
+  for pgid in left:
+    signal_group(pgid, signal.SIGKILL)
+  for pgid in left:
+    wait_group(pgid, KILL_TIMEOUT)
+  return len(left) == 0
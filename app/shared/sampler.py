@@ -0,0 +1,224 @@
+import os
+import struct
+import time
+from typing import Dict, Final, List, Optional, Tuple
+
+# resources.bin: MAGIC, then HEADER (version, number of fields), then one RECORD per process and sample
+MAGIC: Final[bytes] = b"RSMP"
+VERSION: Final[int] = 1
+HEADER: Final = struct.Struct("<HH")
+SERVER: Final[int] = 0
+CLIENT: Final[int] = 1
+SIDES: Final[Dict[int, str]] = {SERVER: "Server", CLIENT: "Client"}
+# counters are cumulative per process, time is seconds since epoch
+FIELDS: Final[List[str]] = [
+  "time",
+  "utime",
+  "stime",
+  "rss",
+  "threads",
+  "voluntary_ctxt_switches",
+  "nonvoluntary_ctxt_switches",
+  "minor_faults",
+  "major_faults",
+  "read_bytes",
+  "write_bytes",
+  "run_delay",
+]
+RECORD: Final = struct.Struct("<BI" + "d" * len(FIELDS))
+
+CLOCK_TICKS: Final[int] = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE: Final[int] = os.sysconf("SC_PAGE_SIZE")
+NAN: Final[float] = float("nan")
+
+
+def read_text(path: str) -> Optional[str]:
+  try:
+    with open(path, "r") as readFile:
+      return readFile.read()
+  except OSError:
+    return None
+
+
+def read_key_values(text: Optional[str], keys: List[str]) -> List[float]:
+  values = {e: NAN for e in keys}
+  if text is None:
+    return list(values.values())
+  for line in text.splitlines():
+    (key, _, value) = line.partition(":")
+    if key in values:
+      values[key] = float(value.split()[0])
+  return [values[e] for e in keys]
+
+
+def sample(pid: int) -> Optional[Tuple[float, ...]]:
+  stat = read_text("/proc/" + str(pid) + "/stat")
+  if stat is None:
+    return None
+  # comm may contain spaces and parentheses, the fixed fields start after the last ')'
+  fields = stat[stat.rfind(")") + 2:].split()
+  minflt, majflt = float(fields[7]), float(fields[9])
+  utime, stime = float(fields[11]) / CLOCK_TICKS, float(fields[12]) / CLOCK_TICKS
+  threads, rss = float(fields[17]), float(fields[21]) * PAGE_SIZE
+  (voluntary, involuntary, run_delay) = sample_threads(pid)
+  (read_bytes, write_bytes) = read_key_values(read_text("/proc/" + str(pid) + "/io"), ["read_bytes", "write_bytes"])
+  return (utime, stime, rss, threads, voluntary, involuntary, minflt, majflt, read_bytes, write_bytes, run_delay)
+
+
+def sample_threads(pid: int) -> Tuple[float, float, float]:
+  # context switches and run queue delay in /proc/<pid>/status and schedstat are those of the main thread only, a JVM
+  # works on the others. Summed over /proc/<pid>/task, threads that have exited drop out of the sums
+  task = "/proc/" + str(pid) + "/task/"
+  try:
+    tids = os.listdir(task)
+  except OSError:
+    return NAN, NAN, NAN
+  voluntary = involuntary = run_delay = 0.0
+  for tid in tids:
+    (v, i) = read_key_values(read_text(task + tid + "/status"), ["voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"])
+    if v != v or i != i:
+      # gone since the listing
+      continue
+    voluntary += v
+    involuntary += i
+    # "time on cpu, time waiting on a runqueue, timeslices" in ns
+    schedstat = read_text(task + tid + "/schedstat")
+    if schedstat is not None and len(schedstat.split()) > 1:
+      run_delay += float(schedstat.split()[1]) / 1e9
+  return voluntary, involuntary, run_delay
+
+
+def read_pid(path: str) -> int:
+  try:
+    with open(path, "r") as readFile:
+      return int(readFile.read().strip())
+  except (OSError, ValueError):
+    return 0
+
+
+def is_alive(pid: int) -> bool:
+  return pid > 0 and os.path.exists("/proc/" + str(pid))
+
+
+def find_java(parent: int, exclude: List[int]) -> int:
+  # the client JVM is started through a shell and the cassandra-stress script, look for it among our descendants
+  children: Dict[int, List[int]] = dict()
+  names: Dict[int, str] = dict()
+  for entry in os.listdir("/proc"):
+    if not entry.isdigit():
+      continue
+    stat = read_text("/proc/" + entry + "/stat")
+    if stat is None:
+      continue
+    names[int(entry)] = stat[stat.find("(") + 1:stat.rfind(")")]
+    children.setdefault(int(stat[stat.rfind(")") + 2:].split()[1]), list()).append(int(entry))
+  pending = list(children.get(parent, []))
+  while len(pending) > 0:
+    pid = pending.pop(0)
+    if names.get(pid) == "java" and pid not in exclude:
+      return pid
+    pending.extend(children.get(pid, []))
+  return 0
+
+
+def resolve_java(pid: int) -> int:
+  # the pidfile names the process started by bin/cassandra, which is perf or time when those wrap the JVM
+  stat = read_text("/proc/" + str(pid) + "/stat") if pid > 0 else None
+  if stat is None:
+    return 0
+  if stat[stat.find("(") + 1:stat.rfind(")")] == "java":
+    return pid
+  return find_java(pid, [])
+
+
+def run(path: str, server_pid_file: str, parent: int, interval: float, cpus: List[int], stop) -> None:
+  # runs in its own process until stop (a multiprocessing.Event) is set
+  if len(cpus) > 0:
+    os.sched_setaffinity(0, cpus)
+  server = 0
+  client = 0
+  next_scan = 0.0
+  with open(path, "wb") as writeFile:
+    writeFile.write(MAGIC + HEADER.pack(VERSION, len(FIELDS)))
+    next_tick = time.monotonic()
+    while not stop.is_set():
+      now = time.time()
+      if server == 0:
+        server = resolve_java(read_pid(server_pid_file))
+      if not is_alive(client) and time.monotonic() >= next_scan:
+        client = find_java(parent, [server])
+        next_scan = time.monotonic() + 1
+      for (side, pid) in [(SERVER, server), (CLIENT, client)]:
+        values = sample(pid) if pid > 0 else None
+        if values is not None:
+          writeFile.write(RECORD.pack(side, pid, now, *values))
+      next_tick += interval
+      stop.wait(max(0.0, next_tick - time.monotonic()))
+
+
+SUMMARY_NAMES: Final[List[str]] = [
+  "CPU mean (cores)",
+  "CPU user share (%)",
+  "RSS max (MB)",
+  "threads max",
+  "voluntary context switches (/s)",
+  "involuntary context switches (/s)",
+  "minor faults (/s)",
+  "major faults count",
+  "disk read (MB)",
+  "disk write (MB)",
+  "run queue delay (ms/s)",
+]
+
+
+def read_samples(path: str):
+  # numpy is only needed by the report, benchmark.py only writes samples
+  import numpy as np
+  dtype = np.dtype([("side", "u1"), ("pid", "<u4")] + [(e, "<f8") for e in FIELDS])
+  with open(path, "rb") as readFile:
+    data = readFile.read()
+  offset = len(MAGIC) + HEADER.size
+  if len(data) < offset or data[:len(MAGIC)] != MAGIC:
+    raise Exception(path + " is not a resource sample file")
+  (version, fields) = HEADER.unpack_from(data, len(MAGIC))
+  if version != VERSION or fields != len(FIELDS):
+    raise Exception(path + " was written by an unsupported sampler version " + str(version))
+  # a sampler that was killed may have left a partial record at the end
+  count = (len(data) - offset) // dtype.itemsize
+  return np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+
+
+def summarize(samples, side: int) -> Dict[str, float]:
+  import numpy as np
+  samples = samples[samples["side"] == side]
+  if len(samples) < 2:
+    return {e: NAN for e in SUMMARY_NAMES}
+  # counters restart with every process, only differences within one pid are meaningful
+  elapsed = 0.0
+  deltas = {e: 0.0 for e in FIELDS}
+  for pid in np.unique(samples["pid"]):
+    process = samples[samples["pid"] == pid]
+    if len(process) < 2:
+      continue
+    elapsed += float(process["time"][-1] - process["time"][0])
+    for e in FIELDS:
+      deltas[e] += float(process[e][-1] - process[e][0])
+  cpu = deltas["utime"] + deltas["stime"]
+
+  def rate(value: float) -> float:
+    return value / elapsed if elapsed > 0 else NAN
+
+  values = [
+    rate(cpu),
+    deltas["utime"] / cpu * 100 if cpu > 0 else NAN,
+    float(np.nanmax(samples["rss"])) / (1024 * 1024),
+    float(np.nanmax(samples["threads"])),
+    rate(deltas["voluntary_ctxt_switches"]),
+    rate(deltas["nonvoluntary_ctxt_switches"]),
+    rate(deltas["minor_faults"]),
+    deltas["major_faults"],
+    deltas["read_bytes"] / (1024 * 1024),
+    deltas["write_bytes"] / (1024 * 1024),
+    rate(deltas["run_delay"] * 1000),
+  ]
+  return dict(zip(SUMMARY_NAMES, values))
@@ -0,0 +1,149 @@
+import errno
+import fcntl
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Final, List, Tuple
+
+# ioctl(dst, FICLONE, src) shares all extents of src with dst (btrfs, XFS with reflink=1)
+FICLONE: Final[int] = 0x40049409
+# SSTable components that Cassandra never rewrites in place, everything else is copied
+IMMUTABLE_SUFFIXES: Final[Tuple[str, ...]] = ("-Data.db", "-Index.db", "-CompressionInfo.db", "-Digest.crc32")
+METHODS: Final[List[str]] = ["auto", "reflink", "overlay", "hardlink", "copy"]
+UNSUPPORTED: Final[Tuple[int, ...]] = (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EPERM)
+
+
+def overlay_dir(target: str) -> str:
+  return target.rstrip("/") + ".overlay"
+
+
+def remove(target: str) -> None:
+  if os.path.ismount(target):
+    subprocess.run(["umount", target], check=True)
+  # whatever cannot be deleted has to fail here, a restore into leftovers would start from the wrong data
+  for path in [target, overlay_dir(target)]:
+    if os.path.lexists(path):
+      shutil.rmtree(path)
+
+
+def list_files(source: str) -> Tuple[List[str], List[str]]:
+  dirs: List[str] = list()
+  files: List[str] = list()
+  for (root, dirnames, filenames) in os.walk(source):
+    rel = os.path.relpath(root, source)
+    dirs.extend([os.path.normpath(os.path.join(rel, e)) for e in dirnames])
+    files.extend([os.path.normpath(os.path.join(rel, e)) for e in filenames])
+  return dirs, files
+
+
+def reflink(src: str, dst: str) -> None:
+  with open(src, "rb") as s, open(dst, "wb") as d:
+    try:
+      fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+      d.close()
+      os.unlink(dst)
+      raise
+  shutil.copystat(src, dst)
+
+
+def copy(src: str, dst: str) -> None:
+  # copyfile uses sendfile/copy_file_range, no data passes through user space
+  shutil.copyfile(src, dst)
+  shutil.copystat(src, dst)
+
+
+def is_immutable(name: str) -> bool:
+  return name.endswith(IMMUTABLE_SUFFIXES)
+
+
+def supports_reflink(source: str, target: str, files: List[str]) -> bool:
+  if len(files) == 0:
+    return False
+  probe = os.path.join(target, ".reflink_probe")
+  try:
+    reflink(os.path.join(source, files[0]), probe)
+  except OSError as e:
+    if e.errno in UNSUPPORTED:
+      return False
+    raise
+  os.unlink(probe)
+  return True
+
+
+def supports_hardlink(source: str, target: str) -> bool:
+  return os.stat(source).st_dev == os.stat(target).st_dev
+
+
+def mount_overlay(source: str, target: str) -> bool:
+  if os.geteuid() != 0:
+    return False
+  upper = os.path.join(overlay_dir(target), "upper")
+  work = os.path.join(overlay_dir(target), "work")
+  os.makedirs(upper, exist_ok=True)
+  os.makedirs(work, exist_ok=True)
+  options = "lowerdir=" + os.path.abspath(source) + ",upperdir=" + upper + ",workdir=" + work
+  mount = subprocess.run(["mount", "-t", "overlay", "overlay", "-o", options, target],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  if mount.returncode != 0:
+    shutil.rmtree(overlay_dir(target), ignore_errors=True)
+    return False
+  return True
+
+
+def restore(source: str, target: str, method: str = "auto", jobs: int = 8) -> Dict[str, str]:
+  # replaces target with the contents of source using the cheapest mechanism that works
+  start = time.monotonic()
+  remove(target)
+  os.makedirs(target)
+  dirs, files = list_files(source)
+
+  chosen = ""
+  for candidate in (["reflink", "overlay", "hardlink", "copy"] if method == "auto" else [method]):
+    if candidate == "reflink" and supports_reflink(source, target, files):
+      chosen = candidate
+    elif candidate == "overlay" and mount_overlay(source, target):
+      chosen = candidate
+    elif candidate == "hardlink" and supports_hardlink(source, target):
+      chosen = candidate
+    elif candidate == "copy":
+      chosen = candidate
+    if len(chosen) > 0:
+      break
+  if len(chosen) == 0:
+    raise Exception("Restore method '" + method + "' is not supported for " + target)
+
+  hardlinked = 0
+  written = 0
+  size = 0
+  if chosen != "overlay":
+    for d in dirs:
+      os.makedirs(os.path.join(target, d), exist_ok=True)
+    work: List[Tuple[str, str]] = list()
+    for f in files:
+      src = os.path.join(source, f)
+      dst = os.path.join(target, f)
+      size += os.path.getsize(src)
+      if chosen == "hardlink" and is_immutable(f):
+        os.link(src, dst)
+        hardlinked += 1
+      else:
+        work.append((src, dst))
+    operation = reflink if chosen == "reflink" else copy
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+      for _ in executor.map(lambda e: operation(*e), work):
+        written += 1
+  else:
+    size = sum(os.path.getsize(os.path.join(source, f)) for f in files)
+
+  return {
+    "method": chosen,
+    "files": str(len(files)),
+    "hardlinked": str(hardlinked),
+    "cloned": str(written if chosen == "reflink" else 0),
+    "copied": str(written if chosen != "reflink" else 0),
+    "bytes": str(size),
+    "seconds": "{:.3f}".format(time.monotonic() - start),
+  }
@@ -0,0 +1,109 @@
+import re
+import unicodedata
+from typing import Dict, Final, List, Optional, Tuple
+
+# Columns of the cassandra-stress interval table that are kept as time series
+INTERVAL_COLUMNS: Final[List[str]] = ["time", "op/s", "row/s", "mean", "med", ".95", ".99", ".999", "max", "errors"]
+# seconds since epoch at which an interval was logged, NaN unless the log is timestamped
+WALL: Final[str] = "wall"
+TOTAL: Final[str] = "total"
+# Lines of the final "Results:" block, mapped to the unit that ends the value
+SUMMARY_LINES: Final[Dict[str, str]] = {
+  "Op rate": "op/s",
+  "Row rate": "row/s",
+  "Latency mean": "ms",
+  "Latency median": "ms",
+  "Latency 95th percentile": "ms",
+  "Latency 99th percentile": "ms",
+  "Latency 99.9th percentile": "ms",
+  "Latency max": "ms",
+}
+# benchmark.py --timestampOutput prefixes every line with "[<epoch seconds>] "
+TIMESTAMP: Final = re.compile(r"^\[(\d+\.\d+)\] ")
+
+
+def strip_timestamp(line: str) -> str:
+  return TIMESTAMP.sub("", line, count=1)
+
+
+def read_timestamp(line: str) -> float:
+  m = TIMESTAMP.match(line)
+  return float(m.group(1)) if m is not None else float("nan")
+
+
+def parse_header(line: str) -> Optional[List[str]]:
+  # e.g. "type      total ops,    op/s,    pk/s,   row/s,    mean, ..."
+  if not line.startswith("type") or "total ops" not in line:
+    return None
+  return [e.strip() for e in line[len("type"):].split(",")]
+
+
+def parse_interval(line: str, header: List[str]) -> Optional[Tuple[str, Dict[str, float]]]:
+  # e.g. "total,      21337,   21337,   21337,   21337,     0.4,     0.3, ..."
+  fields = line.split(",")
+  if len(fields) != len(header) + 1:
+    return None
+  try:
+    values = [float(e) for e in fields[1:]]
+  except ValueError:
+    return None
+  return fields[0].strip(), dict(zip(header, values))
+
+
+class IntervalParser:
+  # line by line, so that a log can be followed while it is written
+  def __init__(self) -> None:
+    self.header: Optional[List[str]] = None
+    self.done = False
+    # timestamp of the last line fed
+    self.wall = float("nan")
+
+  def feed(self, line: str) -> Optional[Tuple[str, Dict[str, float]]]:
+    self.wall = read_timestamp(line)
+    line = strip_timestamp(line)
+    if self.done:
+      return None
+    if self.header is None:
+      self.header = parse_header(line)
+      return None
+    if line.startswith("Results:"):
+      self.done = True
+      return None
+    return parse_interval(line, self.header)
+
+
+def read_intervals(path: str) -> Dict[str, List[float]]:
+  parser = IntervalParser()
+  rows: Dict[str, Dict[str, List[float]]] = dict()
+  with open(path, "r", errors="replace") as readFile:
+    for line in readFile:
+      parsed = parser.feed(line)
+      if parser.done:
+        break
+      if parsed is None:
+        continue
+      (op, values) = parsed
+      columns = rows.setdefault(op, {e: list() for e in INTERVAL_COLUMNS + [WALL]})
+      for e in INTERVAL_COLUMNS:
+        columns[e].append(values.get(e, float("nan")))
+      columns[WALL].append(parser.wall)
+  # a single operation type is not followed by a total line
+  if TOTAL in rows:
+    return rows[TOTAL]
+  if len(rows) == 1:
+    return next(iter(rows.values()))
+  return {e: list() for e in INTERVAL_COLUMNS + [WALL]}
+
+
+def read_summary(path: str) -> Dict[str, float]:
+  summary: Dict[str, float] = dict()
+  with open(path, "r", errors="replace") as readFile:
+    for line in readFile:
+      line = unicodedata.normalize("NFKD", strip_timestamp(line))
+      name = line.split(":")[0].strip()
+      if name in SUMMARY_LINES and ":" in line:
+        try:
+          summary[name] = float(line.split(":")[1].split(SUMMARY_LINES[name])[0].replace(" ", "").replace(",", ""))
+        except ValueError:
+          continue
+  return summary
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from typing import Callable, Final, List, Optional, Set, TypeVar
+
+# written to a run directory that was aborted, generate_report.py skips such runs
+FAILED_FILE: Final[str] = "FAILED"
+# lines after which a JVM is gone or useless, whatever its exit status will be
+FATAL_PATTERNS: Final[List[str]] = [
+  "java.lang.OutOfMemoryError",
+  "java.lang.StackOverflowError",
+  "A fatal error has been detected by the Java Runtime Environment",
+]
+POLL_INTERVAL: Final[float] = 0.2
+
+T = TypeVar("T")
+
+
+class Failure(Exception):
+  def __init__(self, component: str, reason: str, phase: str = "") -> None:
+    super().__init__(component + " " + reason)
+    self.component = component
+    self.reason = reason
+    self.phase = phase
+
+
+class Component:
+  def __init__(self, name: str, alive: Optional[Callable[[], bool]], log: str = "", stall_timeout: float = 0.0,
+               observe: Optional[Callable[[str], None]] = None, offset: int = 0) -> None:
+    self.name = name
+    # None for the supervised process itself, its end is what is waited for
+    self.alive = alive
+    self.log = log
+    # seconds without new output after which the component counts as hung, 0 disables
+    self.stall_timeout = stall_timeout
+    # called with every complete line of the log
+    self.observe = observe
+    # where following the log starts, for logs that are appended to across runs
+    self.offset = offset
+
+
+async def watch(name: str, alive: Callable[[], bool]) -> None:
+  while alive():
+    await asyncio.sleep(POLL_INTERVAL)
+  raise Failure(name, "died")
+
+
+async def follow(component: Component) -> None:
+  # reads the log as it is written, carry keeps the tail of the previous read for patterns split across reads
+  offset = component.offset
+  carry = ""
+  partial = ""
+  keep = max(len(e) for e in FATAL_PATTERNS)
+  last = time.monotonic()
+  while True:
+    try:
+      with open(component.log, "r", errors="replace") as readFile:
+        readFile.seek(offset)
+        chunk = readFile.read()
+        offset = readFile.tell()
+    except OSError:
+      chunk = ""
+    if len(chunk) > 0:
+      last = time.monotonic()
+      text = carry + chunk
+      for pattern in FATAL_PATTERNS:
+        if pattern in text:
+          raise Failure(component.name, "logged " + pattern + " (" + component.log + ")")
+      carry = text[-keep:]
+      if component.observe is not None:
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+        for line in lines:
+          component.observe(line)
+    elif component.stall_timeout > 0 and time.monotonic() - last > component.stall_timeout:
+      raise Failure(component.name, "hung, no output for " + "{:.0f}".format(component.stall_timeout) + " s (" + component.log + ")")
+    await asyncio.sleep(POLL_INTERVAL)
+
+
+async def supervise(wait: Callable[[], T], abort: Callable[[], None], components: List[Component], timeout: float, name: str) -> T:
+  # wait blocks in a worker thread until the supervised process is done, everything else is watched next to it
+  waiter = asyncio.get_running_loop().run_in_executor(None, wait)
+  tasks = [asyncio.ensure_future(watch(e.name, e.alive)) for e in components if e.alive is not None] + \
+          [asyncio.ensure_future(follow(e)) for e in components if len(e.log) > 0]
+  pending: Set[asyncio.Future] = {waiter, *tasks}
+  finished = False
+  try:
+    (done, _) = await asyncio.wait(pending, timeout=timeout if timeout > 0 else None,
+                                   return_when=asyncio.FIRST_COMPLETED)
+    if waiter in done:
+      finished = True
+      return waiter.result()
+    if len(done) == 0:
+      raise Failure(name, "did not finish within " + "{:.0f}".format(timeout) + " s")
+    failures = [e.exception() for e in done]
+    raise next(e for e in failures if e is not None)
+  finally:
+    for e in tasks:
+      e.cancel()
+    if not finished:
+      # also on KeyboardInterrupt, the worker thread only returns once the process is gone
+      abort()
+
+
+def run(wait: Callable[[], T], abort: Callable[[], None], components: List[Component], timeout: float, name: str, phase: str) -> T:
+  try:
+    return asyncio.run(supervise(wait, abort, components, timeout, name))
+  except Failure as e:
+    e.phase = phase
+    raise
+
+
+def mark_failed(run_path: str, failure: Failure) -> None:
+  with open(os.path.join(run_path, FAILED_FILE), "w") as writeFile:
+    writeFile.write("Phase: " + failure.phase + "\n")
+    writeFile.write("Component: " + failure.component + "\n")
+    writeFile.write("Reason: " + failure.reason + "\n")
+    writeFile.write("Time: " + time.strftime("%Y-%m-%d %H:%M:%S") + "\n")
+
+
+def is_failed(run_path: str) -> bool:
+  return os.path.exists(os.path.join(run_path, FAILED_FILE))
@@ -0,0 +1,148 @@
+import os
+from typing import Dict, Final, List, NamedTuple, Tuple
+
+CPU_DIR: Final[str] = "/sys/devices/system/cpu"
+NODE_DIR: Final[str] = "/sys/devices/system/node"
+# split: contiguous halves of the allowed CPUs (the historical behaviour)
+# cores: halves of the physical cores, SMT siblings always stay on the same side
+# socket: one socket for the server and the next one for the client
+POLICIES: Final[List[str]] = ["split", "cores", "socket"]
+
+
+class Cpu(NamedTuple):
+  id: int
+  core: int
+  package: int
+  node: int
+
+
+class Layout(NamedTuple):
+  policy: str
+  server: List[int]
+  client: List[int]
+  housekeeping: List[int]
+  server_nodes: List[int]
+  client_nodes: List[int]
+
+
+def parse_cpulist(text: str) -> List[int]:
+  # e.g. "0-3,8-11" as found in sysfs and accepted by taskset -c and numactl
+  cpus: List[int] = list()
+  for part in text.strip().split(","):
+    if len(part) == 0:
+      continue
+    if "-" in part:
+      (lo, hi) = part.split("-")
+      cpus.extend(range(int(lo), int(hi) + 1))
+    else:
+      cpus.append(int(part))
+  return cpus
+
+
+def format_cpulist(cpus: List[int]) -> str:
+  ranges: List[str] = list()
+  ordered = sorted(set(cpus))
+  i = 0
+  while i < len(ordered):
+    j = i
+    while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+      j += 1
+    ranges.append(str(ordered[i]) if i == j else str(ordered[i]) + "-" + str(ordered[j]))
+    i = j + 1
+  return ",".join(ranges)
+
+
+def read_int(path: str, default: int) -> int:
+  try:
+    with open(path, "r") as readFile:
+      return int(readFile.read().strip())
+  except (OSError, ValueError):
+    return default
+
+
+def read_nodes(node_dir: str = NODE_DIR) -> Dict[int, int]:
+  # cpu -> NUMA node, empty when the kernel has no NUMA support
+  nodes: Dict[int, int] = dict()
+  if not os.path.isdir(node_dir):
+    return nodes
+  for name in os.listdir(node_dir):
+    if not name.startswith("node") or not name[len("node"):].isdigit():
+      continue
+    try:
+      with open(os.path.join(node_dir, name, "cpulist"), "r") as readFile:
+        for cpu in parse_cpulist(readFile.read()):
+          nodes[cpu] = int(name[len("node"):])
+    except OSError:
+      continue
+  return nodes
+
+
+def read_topology(cpu_dir: str = CPU_DIR, node_dir: str = NODE_DIR) -> List[Cpu]:
+  # only the CPUs we are allowed to run on (cgroup cpuset, taskset of the caller) are considered
+  nodes = read_nodes(node_dir)
+  cpus: List[Cpu] = list()
+  for cpu in sorted(os.sched_getaffinity(0)):
+    topology = os.path.join(cpu_dir, "cpu" + str(cpu), "topology")
+    package = read_int(os.path.join(topology, "physical_package_id"), 0)
+    # core ids are only unique within a package
+    core = read_int(os.path.join(topology, "core_id"), cpu)
+    cpus.append(Cpu(cpu, core, package, nodes.get(cpu, 0)))
+  return cpus
+
+
+def physical_cores(cpus: List[Cpu]) -> List[List[Cpu]]:
+  cores: Dict[Tuple[int, int], List[Cpu]] = dict()
+  for cpu in cpus:
+    cores.setdefault((cpu.package, cpu.core), list()).append(cpu)
+  return [cores[e] for e in sorted(cores, key=lambda e: (e, min(c.id for c in cores[e])))]
+
+
+def ids(cpus: List[Cpu]) -> List[int]:
+  return sorted(e.id for e in cpus)
+
+
+def partition(cpus: List[Cpu], policy: str, housekeeping: int = 0, skew: int = 0) -> Layout:
+  # housekeeping CPUs are taken as whole cores from the start, where the kernel prefers to put its own work
+  cores = physical_cores(cpus)
+  reserved: List[Cpu] = list()
+  while len(reserved) < housekeeping and len(cores) > 0:
+    reserved.extend(cores.pop(0))
+  if housekeeping > 0 and len(reserved) > housekeeping and policy == "split":
+    # split does not care about siblings, give the extra ones back
+    cores.insert(0, reserved[housekeeping:])
+    reserved = reserved[:housekeeping]
+  usable = [cpu for core in cores for cpu in core]
+
+  if policy == "split":
+    ordered = sorted(usable, key=lambda e: e.id)
+    half = len(ordered) // 2 - skew
+    server, client = ordered[:half], ordered[half:]
+  elif policy == "cores":
+    half = len(cores) // 2 - skew
+    server = [cpu for core in cores[:half] for cpu in core]
+    client = [cpu for core in cores[half:] for cpu in core]
+  elif policy == "socket":
+    packages = sorted(set(e.package for e in usable))
+    if len(packages) < 2:
+      raise Exception("CPU policy 'socket' needs at least two sockets, found " + str(len(packages)))
+    if skew != 0:
+      raise Exception("skew is not supported with CPU policy 'socket'")
+    server = [e for e in usable if e.package == packages[0]]
+    client = [e for e in usable if e.package == packages[1]]
+  else:
+    raise Exception("Unknown CPU policy '" + policy + "', expected one of " + ", ".join(POLICIES))
+
+  if len(server) == 0 or len(client) == 0:
+    raise Exception("CPU policy '" + policy + "' leaves no CPUs for " + ("server" if len(server) == 0 else "client") +
+                    " with " + str(len(cpus)) + " CPUs available, " + str(len(reserved)) + " for housekeeping and skew " + str(skew))
+  return Layout(policy, ids(server), ids(client), ids(reserved),
+                sorted(set(e.node for e in server)), sorted(set(e.node for e in client)))
+
+
+def describe(layout: Layout) -> List[str]:
+  return [
+    "CPU policy: " + layout.policy,
+    "Server CPUs: " + format_cpulist(layout.server) + " (NUMA nodes " + format_cpulist(layout.server_nodes) + ")",
+    "Client CPUs: " + format_cpulist(layout.client) + " (NUMA nodes " + format_cpulist(layout.client_nodes) + ")",
+    "Housekeeping CPUs: " + (format_cpulist(layout.housekeeping) if len(layout.housekeeping) > 0 else "none"),
+  ]
@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import sqlite3
+from typing import Dict, Final, List, Optional, Tuple
+
+WAREHOUSE_FILE: Final[str] = "warehouse.sqlite"
+NODE_DIR: Final = re.compile(r"node\d+")
+
+SCHEMA: Final[List[str]] = [
+  "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+  "CREATE TABLE IF NOT EXISTS runs (path TEXT PRIMARY KEY, tag TEXT NOT NULL, run TEXT NOT NULL, signature TEXT NOT NULL)",
+  "CREATE TABLE IF NOT EXISTS metrics (path TEXT NOT NULL, name TEXT NOT NULL, value REAL, PRIMARY KEY (path, name))",
+  "CREATE TABLE IF NOT EXISTS attributes (path TEXT NOT NULL, name TEXT NOT NULL, value TEXT, PRIMARY KEY (path, name))",
+  "CREATE TABLE IF NOT EXISTS series (path TEXT NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (path, name))",
+  "CREATE VIEW IF NOT EXISTS run_metrics AS SELECT runs.tag, runs.run, metrics.name, metrics.value FROM runs JOIN metrics ON runs.path = metrics.path",
+]
+
+# A parsed run: (tag, run, signature, metrics, attributes, series) where series are packed float64 arrays
+RunRecord = Tuple[str, str, str, Dict[str, float], Dict[str, str], Dict[str, bytes]]
+
+
+def open_warehouse(base_dir: str, version: int) -> sqlite3.Connection:
+  conn = sqlite3.connect(os.path.join(base_dir, WAREHOUSE_FILE))
+  for statement in SCHEMA:
+    conn.execute(statement)
+  found = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+  if found is None or int(found[0]) != version:
+    # parser changed, everything cached so far is stale
+    clear(conn)
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(version),))
+    conn.commit()
+  return conn
+
+
+def clear(conn: sqlite3.Connection) -> None:
+  for table in ["runs", "metrics", "attributes", "series"]:
+    conn.execute("DELETE FROM " + table)
+  conn.commit()
+
+
+def run_key(tag: str, run: str) -> str:
+  return tag + "/" + run
+
+
+def run_signature(run_path: str) -> str:
+  # files of the run and of the per node directories of a cluster run
+  files = list()
+  for (prefix, path) in [("", run_path)] + [(e + "/", os.path.join(run_path, e)) for e in node_dirs(run_path)]:
+    with os.scandir(path) as it:
+      for entry in it:
+        if entry.is_file():
+          stat = entry.stat()
+          files.append([prefix + entry.name, stat.st_size, stat.st_mtime_ns])
+  files.sort()
+  return json.dumps(files)
+
+
+def node_dirs(run_path: str) -> List[str]:
+  # node1, node2, ... as written by benchmark.py --nodes
+  names = [e for e in os.listdir(run_path) if NODE_DIR.fullmatch(e) and os.path.isdir(os.path.join(run_path, e))]
+  return sorted(names, key=lambda e: int(e[len("node"):]))
+
+
+def stale_runs(conn: sqlite3.Connection, tag: str, runs: List[str], base_dir: str) -> List[Tuple[str, str]]:
+  known = dict(conn.execute("SELECT run, signature FROM runs WHERE tag = ?", (tag,)).fetchall())
+  stale = list()
+  for run in runs:
+    signature = run_signature(os.path.join(base_dir, tag, run))
+    if known.get(run) != signature:
+      stale.append((run, signature))
+  for run in set(known) - set(runs):
+    delete_run(conn, tag, run)
+  return stale
+
+
+def delete_run(conn: sqlite3.Connection, tag: str, run: str) -> None:
+  key = run_key(tag, run)
+  for table in ["runs", "metrics", "attributes", "series"]:
+    conn.execute("DELETE FROM " + table + " WHERE path = ?", (key,))
+
+
+def store_runs(conn: sqlite3.Connection, records: List[RunRecord]) -> None:
+  for (tag, run, _, _, _, _) in records:
+    delete_run(conn, tag, run)
+  conn.executemany("INSERT INTO runs (path, tag, run, signature) VALUES (?, ?, ?, ?)",
+                   [(run_key(tag, run), tag, run, signature) for (tag, run, signature, _, _, _) in records])
+  conn.executemany("INSERT INTO metrics (path, name, value) VALUES (?, ?, ?)",
+                   [(run_key(tag, run), name, value) for (tag, run, _, metrics, _, _) in records
+                    for (name, value) in metrics.items()])
+  conn.executemany("INSERT INTO attributes (path, name, value) VALUES (?, ?, ?)",
+                   [(run_key(tag, run), name, value) for (tag, run, _, _, attributes, _) in records
+                    for (name, value) in attributes.items()])
+  conn.executemany("INSERT INTO series (path, name, data) VALUES (?, ?, ?)",
+                   [(run_key(tag, run), name, data) for (tag, run, _, _, _, series) in records
+                    for (name, data) in series.items()])
+  conn.commit()
+
+
+def load_metrics(conn: sqlite3.Connection, tag: str) -> Dict[str, Dict[str, float]]:
+  result: Dict[str, Dict[str, float]] = dict()
+  for (run, name, value) in conn.execute(
+      "SELECT runs.run, metrics.name, metrics.value FROM runs JOIN metrics ON runs.path = metrics.path WHERE runs.tag = ?", (tag,)):
+    result.setdefault(run, dict())[name] = value
+  return result
+
+
+def load_attributes(conn: sqlite3.Connection, tag: str) -> Dict[str, Dict[str, str]]:
+  result: Dict[str, Dict[str, str]] = dict()
+  for (run, name, value) in conn.execute(
+      "SELECT runs.run, attributes.name, attributes.value FROM runs JOIN attributes ON runs.path = attributes.path WHERE runs.tag = ?", (tag,)):
+    result.setdefault(run, dict())[name] = value
+  return result
+
+
+def load_series(conn: sqlite3.Connection, tag: str) -> Dict[str, Dict[str, bytes]]:
+  result: Dict[str, Dict[str, bytes]] = dict()
+  for (run, name, data) in conn.execute(
+      "SELECT runs.run, series.name, series.data FROM runs JOIN series ON runs.path = series.path WHERE runs.tag = ?", (tag,)):
+    result.setdefault(run, dict())[name] = data
+  return result
+
+
+def query(conn: sqlite3.Connection, sql: str, params: Optional[Tuple] = None) -> Tuple[List[str], List[Tuple]]:
+  cursor = conn.execute(sql, params or ())
+  columns = [e[0] for e in cursor.description] if cursor.description is not None else []
+  return columns, cursor.fetchall()
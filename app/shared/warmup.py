@@ -0,0 +1,58 @@
+import math
+import statistics
+from typing import Dict, Final, List, Tuple
+
+# "<phase> <start> <end>" per line, seconds since epoch, written by benchmark.py next to the client logs of a run
+PHASES_FILE: Final[str] = "phases"
+WARMUP: Final[str] = "warmup"
+MEASURED: Final[str] = "measured"
+# intervals (seconds) over which throughput and JIT activity have to be flat
+WINDOW: Final[int] = 30
+# coefficient of variation of the op rate in the window, in %
+MAX_CV: Final[float] = 5.0
+# compilations per second logged by -Xlog:jit+compilation, C1 and C2 keep recompiling a little forever
+MAX_COMPILATION_RATE: Final[float] = 1.0
+COLUMNS: Final[List[str]] = ["time", "op/s", "compilations", "op/s CV (%)", "compilation rate (/s)", "settled"]
+
+
+class Detector:
+  def __init__(self, path: str) -> None:
+    # every interval appends a row to path
+    self.path = path
+    self.throughput: List[float] = list()
+    self.compilations: List[int] = list()
+    self.settled = False
+    with open(path, "w") as writeFile:
+      writeFile.write(",".join(COLUMNS) + "\n")
+
+  def add(self, interval: Dict[str, float], compilations: int) -> bool:
+    # compilations is the number of compilations logged since the previous interval
+    self.throughput.append(interval.get("op/s", float("nan")))
+    self.compilations.append(compilations)
+    cv = float("nan")
+    rate = float("nan")
+    if len(self.throughput) >= WINDOW:
+      recent = self.throughput[-WINDOW:]
+      mean = statistics.fmean(recent)
+      cv = statistics.stdev(recent) / mean * 100 if mean > 0 else float("inf")
+      rate = sum(self.compilations[-WINDOW:]) / WINDOW
+    self.settled = not math.isnan(cv) and cv < MAX_CV and rate <= MAX_COMPILATION_RATE
+    row = [interval.get("time", float("nan")), self.throughput[-1], compilations, cv, rate, int(self.settled)]
+    with open(self.path, "a") as writeFile:
+      writeFile.write(",".join(str(e) for e in row) + "\n")
+    return self.settled
+
+
+def write_phase(path: str, name: str, start: float, end: float) -> None:
+  with open(path, "a") as writeFile:
+    writeFile.write(name + " " + "{:.3f}".format(start) + " " + "{:.3f}".format(end) + "\n")
+
+
+def read_phases(path: str) -> Dict[str, Tuple[float, float]]:
+  phases: Dict[str, Tuple[float, float]] = dict()
+  with open(path, "r") as readFile:
+    for line in readFile:
+      fields = line.split()
+      if len(fields) == 3:
+        phases[fields[0]] = (float(fields[1]), float(fields[2]))
+  return phases
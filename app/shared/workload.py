@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Final, List
+
+DEFAULT_PROFILE: Final[str] = "cqlstress-insanity-example.yaml"
+CONSISTENCY_LEVELS: Final[List[str]] = ["ANY", "ONE", "TWO", "THREE", "QUORUM", "ALL", "LOCAL_ONE", "LOCAL_QUORUM", "EACH_QUORUM"]
+# cassandra-stress -pop dist= specs, {skew} is the shape parameter. There is no zipf distribution in cassandra-stress,
+# EXTREME (Weibull) with a shape below 1 puts most accesses on the low keys. GAUSSIAN is centered on the middle of the
+# range with a standard deviation of half the range divided by {skew}, a large value makes a narrow hotspot.
+DISTRIBUTIONS: Final[Dict[str, str]] = {
+  "uniform": "UNIFORM({lo}..{hi})",
+  "zipf": "EXTREME({lo}..{hi},{skew})",
+  "gaussian": "GAUSSIAN({lo}..{hi},{skew})",
+  "hotspot": "GAUSSIAN({lo}..{hi},{skew})",
+}
+DEFAULT_SKEW: Final[Dict[str, float]] = {"uniform": 0, "zipf": 0.5, "gaussian": 3, "hotspot": 50}
+# every field of a workload, files and presets only need to give the ones that differ
+DEFAULTS: Final[Dict] = {
+  "profile": DEFAULT_PROFILE,
+  "ops": "insert=3,simple1=7",
+  "distribution": "uniform",
+  "skew": None,
+  "consistency": "ONE",
+  # keys are drawn from 1..population
+  "population": 100000000,
+  # bytes of every sized column of the profile, 0 keeps the sizes of the profile
+  "columnSize": 0,
+}
+PRESETS: Final[Dict[str, Dict]] = {
+  # what benchmark.py always ran before workloads could be chosen
+  "default": {},
+  "read-heavy": {"ops": "insert=1,simple1=9", "distribution": "zipf"},
+  "write-heavy": {"ops": "insert=9,simple1=1"},
+  "skewed": {"distribution": "zipf"},
+  "hotspot": {"distribution": "hotspot"},
+}
+
+
+def load_file(path: str) -> Dict:
+  with open(path, "r") as readFile:
+    text = readFile.read()
+  if path.endswith(".yaml") or path.endswith(".yml"):
+    try:
+      import yaml
+    except ImportError:
+      raise Exception("PyYAML is needed for YAML workloads (pip3 install pyyaml), or use JSON")
+    fields = yaml.safe_load(text)
+  else:
+    fields = json.loads(text)
+  if not isinstance(fields, dict):
+    raise Exception("Workload " + path + " must be a mapping")
+  return fields
+
+
+def load(spec: str) -> Dict:
+  # a preset name, or a JSON/YAML file whose fields override the preset named by "base" (default "default")
+  if spec in PRESETS:
+    return resolve(spec, dict(PRESETS[spec]))
+  if not os.path.isfile(spec):
+    raise Exception("Unknown workload '" + spec + "', expected a file or one of " + ", ".join(PRESETS))
+  fields = load_file(spec)
+  base = str(fields.pop("base", "default"))
+  if base not in PRESETS:
+    raise Exception("Unknown base workload '" + base + "' in " + spec)
+  name = str(fields.pop("name", os.path.splitext(os.path.basename(spec))[0]))
+  return resolve(name, dict(PRESETS[base], **fields))
+
+
+def resolve(name: str, fields: Dict) -> Dict:
+  unknown = [e for e in fields if e not in DEFAULTS]
+  if len(unknown) > 0:
+    raise Exception("Unknown workload fields: " + ", ".join(unknown))
+  workload = dict(DEFAULTS, **fields)
+  workload["name"] = name
+  if workload["distribution"] not in DISTRIBUTIONS:
+    raise Exception("Unknown key distribution '" + str(workload["distribution"]) + "', expected one of " + ", ".join(DISTRIBUTIONS))
+  if workload["skew"] is None:
+    workload["skew"] = DEFAULT_SKEW[workload["distribution"]]
+  workload["consistency"] = str(workload["consistency"]).upper()
+  if workload["consistency"] not in CONSISTENCY_LEVELS:
+    raise Exception("Unknown consistency level '" + workload["consistency"] + "'")
+  workload["population"] = int(workload["population"])
+  workload["columnSize"] = int(workload["columnSize"])
+  if workload["population"] < 1 or workload["columnSize"] < 0:
+    raise Exception("Workload population must be positive and columnSize must not be negative")
+  if not re.fullmatch(r"\w+=\d+(,\w+=\d+)*", str(workload["ops"])):
+    raise Exception("Workload ops must look like insert=3,simple1=7, got '" + str(workload["ops"]) + "'")
+  return workload
+
+
+def distribution(workload: Dict) -> str:
+  return DISTRIBUTIONS[workload["distribution"]].format(lo=1, hi=workload["population"], skew="{:g}".format(workload["skew"]))
+
+
+def fingerprint(workload: Dict) -> str:
+  # identifies what was run regardless of the name it was given
+  fields = {e: workload[e] for e in DEFAULTS}
+  return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def describe(workload: Dict) -> List[str]:
+  return [
+    "Workload: " + workload["name"],
+    "Profile: " + workload["profile"],
+    "Operations: " + workload["ops"],
+    "Key distribution: " + distribution(workload),
+    "Consistency: " + workload["consistency"],
+    "Column size: " + (str(workload["columnSize"]) + " bytes" if workload["columnSize"] > 0 else "profile default"),
+    "Workload fingerprint: " + fingerprint(workload),
+  ]
+
+
+def render_profile(text: str, column_size: int) -> str:
+  # every "size:" of the columnspec becomes fixed, the profile does not use the key anywhere else
+  return re.sub(r"^(\s*-?\s*size:\s*)\S+.*$", r"\g<1>fixed(" + str(column_size) + ")", text, flags=re.MULTILINE)
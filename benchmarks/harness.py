@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Runs main() of the benchmark.py copy in a sandbox built by lifecycle.py and writes how long each phase of it took.
+# One process per run, CassandraVars keeps its state for the lifetime of the interpreter.
+#   harness.py <sandbox> <timings.json> <benchmark.py arguments>
+
+import json
+import os
+import sys
+import time
+
+PHASES = ["init", "prepare_database", "boot_to_ready", "stress", "stress_overhead", "shutdown_to_dead", "total"]
+
+
+def main() -> None:
+    (sandbox, output, arguments) = (sys.argv[1], sys.argv[2], sys.argv[3:])
+    os.chdir(sandbox)
+    sys.path.insert(0, sandbox)
+    import benchmark
+
+    timings = {e: 0.0 for e in PHASES}
+    marks = dict()
+    nominal = [0.0]
+    scale = float(os.environ.get("STANDIN_TIME_SCALE", 1))
+
+    def timed(name: str, phase: str = "", start: str = "", end: str = "") -> None:
+        # phase adds up the time spent in name, start and end bracket a phase across two functions
+        original = getattr(benchmark, name)
+
+        def wrapper(*args, **kwargs):
+            now = time.monotonic()
+            if len(start) > 0:
+                marks[start] = now
+            try:
+                return original(*args, **kwargs)
+            finally:
+                if len(phase) > 0:
+                    timings[phase] += time.monotonic() - now
+                if len(end) > 0 and end in marks:
+                    timings[end] += time.monotonic() - marks.pop(end)
+        setattr(benchmark, name, wrapper)
+
+    timed("init", phase="init")
+    timed("prepare_database", phase="prepare_database")
+    timed("run_cassandra_server", start="boot_to_ready")
+    timed("block_until_ready", end="boot_to_ready")
+    timed("request_graceful_server_exit", start="shutdown_to_dead")
+    timed("block_until_dead", end="shutdown_to_dead")
+    timed("run_cassandra_stress", phase="stress")
+    get_duration_seconds = benchmark.get_duration_seconds
+
+    def workload_seconds(duration: str) -> int:
+        # called once per cassandra-stress run for its timeout, the stand-in client runs it time scaled
+        seconds = get_duration_seconds(duration)
+        nominal[0] += seconds / scale
+        return seconds
+    benchmark.get_duration_seconds = workload_seconds
+
+    sys.argv = ["benchmark.py"] + arguments
+    status = 0
+    start = time.monotonic()
+    try:
+        benchmark.main()
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    timings["total"] = time.monotonic() - start
+    timings["stress_overhead"] = timings["stress"] - nominal[0]
+    with open(output, "w") as writeFile:
+        json.dump({"status": status, "timings": timings}, writeFile)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# Measures the wall clock time benchmark.py spends per phase of a run, against stand-ins for bin/cassandra, nodetool,
+# cassandra-stress and a JDK (see standins/), so that changes to the orchestrator and the report can be measured on
+# any Linux box without Cassandra. Every invocation appends the median of each phase to a history file.
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+REPO = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+APP = os.path.join(REPO, "app")
+BENCHMARKS = os.path.join(REPO, "benchmarks")
+STANDINS = os.path.join(BENCHMARKS, "standins")
+sys.path.insert(0, APP)
+from shared import snapshot, workload  # noqa: E402
+
+TAG = "lifecycle"
+PHASES = ["init", "prepare_database", "boot_to_ready", "stress", "stress_overhead", "shutdown_to_dead", "total"]
+# what the stand-in client needs from the default profile
+PROFILE = "keyspace: stresscql\ntable: insanitytest\n"
+
+
+def init():
+    parser = argparse.ArgumentParser(description="Time the phases of benchmark.py runs against stand-in Cassandra binaries. "
+                                                 "Arguments after -- are passed on to benchmark.py.")
+    parser.add_argument("--runs", help="benchmark.py runs, medians are recorded (default 3)", type=int, default=3)
+    parser.add_argument("--duration", help="--duration of benchmark.py in minutes (default 1)", type=int, default=1)
+    parser.add_argument("--boot", help="seconds the stand-in server takes to listen for CQL clients (default 10)", type=float, default=10)
+    parser.add_argument("--shutdown", help="seconds the stand-in server takes to exit after stopdaemon (default 3)", type=float, default=3)
+    parser.add_argument("--jvm", help="seconds every stand-in JVM, nodetool included, takes to start (default 0.5)", type=float, default=0.5)
+    parser.add_argument("--timeScale", help="workload seconds the stand-in client runs per second, the stress phase takes duration / scale (default 10)",
+                        type=float, default=10)
+    parser.add_argument("--dataMB", help="size of the stand-in prepopulated data restored before every run (default 64)", type=int, default=64)
+    parser.add_argument("--history", help="CSV file the medians are appended to (default benchmarks/history.csv)",
+                        default=os.path.join(BENCHMARKS, "history.csv"))
+    parser.add_argument("--keep", help="keep the sandbox with the logs and results of all runs", action="store_true")
+    parser.add_argument("arguments", help="arguments to benchmark.py", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    if len(args.arguments) > 0 and args.arguments[0] == "--":
+        args.arguments = args.arguments[1:]
+    return args
+
+
+def install(source: str, target: str) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(source, target)
+    os.chmod(target, 0o755)
+
+
+def build_sandbox(path: str, data_mb: int) -> None:
+    # benchmark.py finds everything relative to itself, so the sandbox is laid out like app/ after install_cassandra.sh
+    for name in ["benchmark.py", "generate_report.py"]:
+        shutil.copy2(os.path.join(APP, name), os.path.join(path, name))
+    shutil.copytree(os.path.join(APP, "shared"), os.path.join(path, "shared"), ignore=shutil.ignore_patterns("__pycache__"))
+    install(os.path.join(STANDINS, "cassandra"), os.path.join(path, "bin", "cassandra"))
+    install(os.path.join(STANDINS, "nodetool"), os.path.join(path, "bin", "nodetool"))
+    install(os.path.join(STANDINS, "cassandra-stress"), os.path.join(path, "tools", "bin", "cassandra-stress"))
+    install(os.path.join(STANDINS, "java"), os.path.join(path, "jdk", "bin", "java"))
+    with open(os.path.join(path, "jdk", "release"), "w") as writeFile:
+        writeFile.write("JAVA_VERSION=\"17.0.0\"\nIMPLEMENTOR=\"stand-in\"\n")
+    with open(os.path.join(path, "tools", workload.DEFAULT_PROFILE), "w") as writeFile:
+        writeFile.write(PROFILE)
+    # sstables of a few MB each, restored like real prepopulated data
+    table = os.path.join(path, "pre_data", "stresscql", "insanitytest-00000000000000000000000000000000")
+    os.makedirs(table)
+    block = os.urandom(1024 * 1024)
+    for i in range(max(1, data_mb // 4)):
+        with open(os.path.join(table, "nb-" + str(i + 1) + "-big-Data.db"), "wb") as writeFile:
+            for _ in range(min(4, data_mb)):
+                writeFile.write(block)
+    os.makedirs(os.path.join(path, "standin"))
+
+
+def run(path: str, index: int, args) -> Dict[str, float]:
+    env = dict(os.environ)
+    env.update({
+        "STANDIN_STATE": os.path.join(path, "standin"),
+        "STANDIN_BOOT_SECONDS": str(args.boot),
+        "STANDIN_SHUTDOWN_SECONDS": str(args.shutdown),
+        "STANDIN_JVM_SECONDS": str(args.jvm),
+        "STANDIN_TIME_SCALE": str(args.timeScale),
+    })
+    output = os.path.join(path, "timings." + str(index) + ".json")
+    log = os.path.join(path, "lifecycle." + str(index) + ".log")
+    command = [sys.executable, os.path.join(BENCHMARKS, "harness.py"), path, output,
+               "--jdk", os.path.join(path, "jdk"), "--tag", TAG, "--duration", str(args.duration)] + args.arguments
+    with open(log, "w") as writeFile:
+        app = subprocess.run(command, stdout=writeFile, stderr=subprocess.STDOUT, env=env)
+    if app.returncode != 0 or not os.path.exists(output):
+        with open(log, "r", errors="replace") as readFile:
+            print("".join(readFile.readlines()[-30:]))
+        raise Exception("Run " + str(index + 1) + " failed, see " + log)
+    with open(output, "r") as readFile:
+        return json.load(readFile)["timings"]
+
+
+def run_report(path: str) -> float:
+    start = time.monotonic()
+    with open(os.path.join(path, "report.log"), "w") as writeFile:
+        app = subprocess.run([sys.executable, "generate_report.py", "--rebuild"], cwd=path, stdout=writeFile, stderr=subprocess.STDOUT)
+    if app.returncode != 0:
+        raise Exception("generate_report.py failed, see " + os.path.join(path, "report.log"))
+    return time.monotonic() - start
+
+
+def get_commit() -> str:
+    app = subprocess.run(["git", "-C", REPO, "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                         universal_newlines=True)
+    if app.returncode != 0:
+        return ""
+    dirty = subprocess.run(["git", "-C", REPO, "status", "--porcelain", "--", "app"], stdout=subprocess.PIPE,
+                           stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+    return app.stdout.strip() + ("-dirty" if len(dirty.strip()) > 0 else "")
+
+
+def read_previous(path: str, settings: Dict[str, str]) -> Dict[str, str]:
+    # the last entry measured with the same settings on this host
+    if not os.path.exists(path):
+        return dict()
+    previous = dict()
+    with open(path, "r", newline="") as readFile:
+        for row in csv.DictReader(readFile):
+            if row.get("host") == socket.gethostname() and all(row.get(e) == v for (e, v) in settings.items()):
+                previous = row
+    return previous
+
+
+def append_history(path: str, row: Dict[str, str]) -> None:
+    exists = os.path.exists(path)
+    with open(path, "a", newline="") as writeFile:
+        writer = csv.DictWriter(writeFile, fieldnames=list(row))
+        if not exists:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def print_table(timings: List[Dict[str, float]], medians: Dict[str, float], previous: Dict[str, str]) -> None:
+    header = ["phase (s)"] + ["run " + str(i + 1) for i in range(len(timings))] + ["median"] + (["previous"] if len(previous) > 0 else [])
+    print(" ".join(e.rjust(18) for e in header))
+    for phase in PHASES + ["report"]:
+        # the report is generated once over all runs
+        values = ["{:.2f}".format(e[phase]) for e in timings] if phase != "report" else [""] * len(timings)
+        line = [phase] + values + ["{:.2f}".format(medians[phase])]
+        if len(previous) > 0:
+            line.append(previous.get(phase, ""))
+        print(" ".join(e.rjust(18) for e in line))
+
+
+def main() -> None:
+    args = init()
+    path = tempfile.mkdtemp(prefix="cassandra-lifecycle-")
+    try:
+        print("Building sandbox in " + path, flush=True)
+        build_sandbox(path, args.dataMB)
+        timings = list()
+        for i in range(args.runs):
+            print("Run " + str(i + 1) + " of " + str(args.runs), flush=True)
+            timings.append(run(path, i, args))
+        print("Generating the report", flush=True)
+        report = run_report(path)
+    finally:
+        if not args.keep:
+            # the last restore may have mounted data on top of pre_data
+            snapshot.remove(os.path.join(path, "data"))
+            shutil.rmtree(path, ignore_errors=True)
+    medians = {e: statistics.median(t[e] for t in timings) for e in PHASES}
+    medians["report"] = report
+    settings = {"runs": str(args.runs), "duration": str(args.duration), "boot": str(args.boot), "shutdown": str(args.shutdown),
+                "jvm": str(args.jvm), "time_scale": str(args.timeScale), "data_mb": str(args.dataMB), "arguments": " ".join(args.arguments)}
+    previous = read_previous(args.history, settings)
+    print_table(timings, medians, previous)
+    row = {"date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "commit": get_commit(), "host": socket.gethostname(),
+           "cpus": str(os.cpu_count())}
+    row.update(settings)
+    row.update({e: "{:.3f}".format(v) for (e, v) in medians.items()})
+    append_history(args.history, row)
+    print("Appended to " + args.history + (", sandbox kept in " + path if args.keep else ""))
+
+
+if __name__ == "__main__":
+    main()